@@ -7,19 +7,49 @@ import customtkinter as ctk
 from PIL import Image, ImageSequence # Manteniamo ImageSequence per non avere dipendenze inter-file
 from pynput import mouse, keyboard
 from pynput.mouse import Button, Controller as MouseController, Listener as MouseListener
-from pynput.keyboard import Key, Listener as KeyboardListener
-import threading
+from pynput.keyboard import Key, KeyCode, Listener as KeyboardListener
 import time
-import random
 import json
+import threading
 import os
 import sys
 import ctypes
 
+from veto_recorder import MacroRecorder, MacroPlayer
+from veto_diagnostics import DELIVERY_TAGS, HistogramBars, TimingStats
+from veto_distributions import DISTRIBUTIONS
+from veto_eventlog import EV_TRIGGER_DOWN, EV_TRIGGER_UP, NO_SLOT
+from veto_api import VetoEngine, EVENT_TRANSITION, EVENT_CONFIG
+from veto_backends import KEY_PREFIX, is_key, key_id
+from veto_control import ControlServer
+from veto_macros import DEFAULT_MACROS, build_registry
+from veto_sched import DEFAULT_TUNING
+from veto_settings import RESTART_KEYS, SettingsWatcher, macro_setting
+from veto_state import KIND_CLICK, KIND_HOLD, CLICKING, ACTIVE, CMD_TOGGLE, CMD_PRESS, CMD_RELEASE
+from veto_timing import now_ns
+
 # Theme configuration
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("dark-blue")
 
+# Diagnostica: frame rate massimo del pannello e dimensioni dell'istogramma
+DIAG_FRAME_MS = 100
+DIAG_EXTRA_HEIGHT = 226
+HIST_WIDTH = 380
+HIST_HEIGHT = 60
+# Pannello su cui cadono i click di prova della misura di consegna
+DELIVERY_TARGET_WIDTH = 220
+DELIVERY_TARGET_HEIGHT = 70
+
+# Widget distrutti dalla modalità minima (riferimenti da rilasciare) e ricreati da create_ui
+UI_WIDGETS = (
+    "main_frame", "logo_image", "min_cps_entry", "min_slider", "max_cps_entry", "max_slider",
+    "record_button", "play_button", "recorder_status_label", "diagnostics_frame", "histogram",
+    "delivery_label",
+)
+MACRO_WIDGETS = ("content_frame", "content_widgets", "hotkey_button", "output_button", "status_label",
+                 "cps_frame", "cps_entry", "cps_slider")
+
 # Funzione per gestire i percorsi dei file (per PyInstaller)
 def resource_path(relative_path):
     """ Ottiene il percorso assoluto delle risorse, funziona per dev e per PyInstaller """
@@ -31,34 +61,84 @@ def resource_path(relative_path):
         base_path = os.path.abspath(".")
     return os.path.join(base_path, relative_path)
 
+def key_name(key):
+    """Nome mostrato di un tasto di pynput ("E", "F6", "SPACE")"""
+    try:
+        # Tasto carattere
+        return key.char.upper()
+    except AttributeError:
+        # Tasto speciale (F6, shift, ctrl...)
+        return str(key).replace("Key.", "").upper()
+
+
 class ClickMacro:
-    """Rappresenta una singola macro di click (sinistro o destro)"""
-    def __init__(self, name, button):
-        self.name = name  # "Left" or "Right"
-        self.button = button  # Button.left or Button.right
-        self.enabled = False
-        self.armed = False
-        self.clicking = False
+    """Rappresenta una macro di click generata dal registro (qualsiasi pulsante)"""
+    def __init__(self, spec, state):
+        self.spec = spec
+        self.key = spec.key  # nome della macro in VetoEngine
+        self.kind = KIND_CLICK
+        self.name = spec.label  # "Left", "Right", ...
+        self.button = getattr(Button, spec.trigger)  # pulsante fisico che fa partire i click
+        # OFF -> ARMED -> CLICKING: lo modifica solo il thread motore tramite comandi
+        self.state = state
         self.hotkey = None
-        self.hotkey_str = "None"
+        self.hotkey_str = spec.hotkey
         self.hotkey_is_mouse = False
+        self.output = spec.button  # pulsante o tasto iniettato ("key:..." modificabile dalla GUI)
         self.min_cps = 10
         self.max_cps = 15
-        self.mouse_held = False
+        self.distribution = "uniform"  # chiave di DISTRIBUTIONS
+        # Modalità burst: N click a spaziatura fissa a ogni pressione, poi cooldown
+        self.burst = False
+        self.burst_count = 5
+        self.burst_spacing_ms = 8.0
+        self.burst_cooldown_ms = 0
+
+    @property
+    def enabled(self):
+        return self.state.enabled
+
+    @property
+    def armed(self):
+        return self.state.armed
+
+    @property
+    def clicking(self):
+        return self.state.state == CLICKING
+
+    @property
+    def mouse_held(self):
+        return self.state.held
 
 
 class HoldMacro:
     """Rappresenta una macro per tenere premuto il tasto (singolo colpo o break continuo)"""
-    def __init__(self):
-        self.enabled = False
-        self.armed = False
-        self.active = False
+    def __init__(self, spec, state):
+        self.spec = spec
+        self.key = spec.key
+        self.kind = KIND_HOLD
+        self.name = spec.label
+        # OFF -> ACTIVE: lo modifica solo il thread motore tramite comandi
+        self.state = state
         self.hotkey = None
-        self.hotkey_str = "None"
+        self.hotkey_str = spec.hotkey
         self.hotkey_is_mouse = False
+        self.output = spec.button
         self.mode = "single"  # "single" o "break"
         self.cps = 5
 
+    @property
+    def enabled(self):
+        return self.state.enabled
+
+    @property
+    def armed(self):
+        return self.state.armed
+
+    @property
+    def active(self):
+        return self.state.state == ACTIVE
+
 
 class VetoClicker(ctk.CTk):
     def __init__(self):
@@ -88,24 +168,44 @@ class VetoClicker(ctk.CTk):
         #self.geometry("440x620")
         self.resizable(False, False)
         self.configure(fg_color="#0d0d0d")
-        self.center_window(440, 680)
+        self.center_window(440, 820)
         
         # Mouse controller
         self.mouse_controller = MouseController()
-        self.ignore_clicks = False
         
-        # Macros
-        self.left_macro = ClickMacro("Left", Button.left)
-        self.left_macro.enabled = True  # Left è abilitato di default
-        self.left_macro.hotkey = Key.f6
-        self.left_macro.hotkey_str = "F6"
-        
-        self.right_macro = ClickMacro("Right", Button.right)
-        self.right_macro.enabled = False
-        
-        # Hold Macro
-        self.hold_macro = HoldMacro()
-        self.hold_macro.enabled = False
+        # Affinità CPU, priorità e timer slack del thread motore (solo da settings.json)
+        self.engine_tuning = dict(DEFAULT_TUNING)
+        
+        # Registro delle macro: predefinite + "macro_definitions" di settings.json
+        settings = self.read_settings()
+        self.macro_specs = build_registry(settings.get("macro_definitions"))
+        
+        # Motore di click: la GUI è solo uno dei client di VetoEngine
+        self.engine = VetoEngine(tuning=self.engine_tuning, macros=self.macro_specs)
+        self.engine.add_listener(self.on_engine_event)
+        
+        # Macros (una per voce del registro, tutte servite dallo stesso scheduler)
+        self.macros = []
+        for spec in self.macro_specs:
+            macro_class = ClickMacro if spec.kind == KIND_CLICK else HoldMacro
+            macro = macro_class(spec, self.engine.machines[spec.key])
+            self.restore_hotkey(macro)
+            if not spec.optional:
+                self.engine.enable(spec.key)  # Left è sempre abilitato
+            self.macros.append(macro)
+        self.macros_by_key = {macro.key: macro for macro in self.macros}
+        # Indici per i listener: costo costante per evento qualunque sia il numero di macro
+        self.hotkey_index = {}
+        self.trigger_index = {}
+        self.rebuild_input_index()
+        
+        # Registratore / riproduttore di macro (la riproduzione passa dal motore)
+        recording_path = os.path.join(os.path.dirname(os.path.abspath(sys.argv[0])), "recording.vrec")
+        self.recorder = MacroRecorder(recording_path)
+        self.player = MacroPlayer(
+            recording_path, self.engine,
+            on_finish=lambda: self.after(0, self.update_recorder_status)
+        )
         
         # CPS settings (shared)
         self.min_cps = 10
@@ -115,17 +215,55 @@ class VetoClicker(ctk.CTk):
         # Listeners
         self.keyboard_listener = None
         self.mouse_listener = None
+        self.input_backend = "pynput"  # "pynput" o "evdev" (Linux, /dev/input diretto)
+        self.input_listener = "pynput"  # listener dei click effettivamente avviato
+        
+        # Server di controllo su socket UNIX (disattivato se il percorso è None)
+        self.control_socket = None
+        self.control_server = None
+        # Log binario degli eventi di click (cartella; disattivato se None)
+        self.event_log_dir = None
+        self.trigger_log = None
+        # Ricaricamento a caldo di settings.json (inotify o polling)
+        self.watch_settings = True
+        self.settings_watcher = None
         self.listening_for_hotkey = None
-        self.hotkey_cooldown = False
+        self.listening_for_output = None
+        # Vero mentre show_engine_cps copia nei campi valori già presenti nel motore
+        self.showing_engine_cps = False
+        # Debounce delle hotkey nel thread listener: finestra per binding (monotonic_ns)
+        self.hotkey_debounce_ns = 200 * 1_000_000
+        self.hotkey_last = {}
+        
+        # Diagnostica della temporizzazione (letta dal ring del motore solo se visibile)
+        self.diagnostics = {macro.key: TimingStats() for macro in self.macros}
+        self.diagnostics_job = None
+        # Misura della latenza di consegna: il listener dei click inoltra alla probe attiva
+        self.delivery_probe = None
+        self.delivery_running = False
+        self.delivery_text = "Delivery: not measured"
+        self.delivery_color = "#a1a1aa"
+        
+        # Modalità minima: albero dei widget distrutto, resta solo l'indicatore di stato
+        self.minimal = False
+        self.mini_frame = None
+        self.mini_label = None
         
         # Build UI
         self.create_ui()
         
+        # Load settings (prima dei listener: decide il backend di input)
+        self.load_settings(settings)
+        
         # Start input listeners
         self.start_input_listeners()
         
-        # Load settings
-        self.load_settings()
+        # Avvia il motore (dopo il caricamento, così il tuning è già quello salvato)
+        self.sync_engine()
+        self.engine.start()
+        self.start_control_server()
+        self.start_event_log()
+        self.start_settings_watch(settings)
         
         # Protocollo per una chiusura pulita
         self.protocol("WM_DELETE_WINDOW", self.on_close)
@@ -157,14 +295,25 @@ class VetoClicker(ctk.CTk):
         # CPS Section (shared)
         self.create_cps_section()
         
-        # Left Click Macro
-        self.create_macro_section(self.left_macro)
+        # Macro generate dal registro (scorrevoli se ce ne sono più di quelle predefinite)
+        parent = self.main_frame
+        if len(self.macros) > len(DEFAULT_MACROS):
+            parent = ctk.CTkScrollableFrame(self.main_frame, fg_color="transparent", height=420)
+            parent.pack(fill="both", expand=True)
+        for macro in self.macros:
+            self.create_macro_section(macro, parent)
+        
+        # Recorder
+        self.create_recorder_section()
         
-        # Right Click Macro (collapsible)
-        self.create_macro_section(self.right_macro)
+        # Diagnostica
+        self.create_diagnostics_section()
         
-        # Hold Macro
-        self.create_hold_section()
+        ctk.CTkButton(
+            self.main_frame, text="Minimal mode", height=28,
+            font=ctk.CTkFont(size=12), fg_color="#1a1a2e", hover_color="#2d2d44",
+            text_color="#a1a1aa", command=self.enter_minimal_mode
+        ).pack(fill="x")
         
     
     def create_header(self):
@@ -264,13 +413,68 @@ class VetoClicker(ctk.CTk):
             font=ctk.CTkFont(size=11), text_color="#a1a1aa",
             fg_color="#8b5cf6", hover_color="#7c3aed", border_color="#2d2d44"
         ).pack(anchor="w", pady=(5, 0))
+        
+        # Controllo del rate ad anello chiuso
+        self.rate_control_var = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(
+            section, text="Hold target CPS under load", variable=self.rate_control_var,
+            font=ctk.CTkFont(size=11), text_color="#a1a1aa",
+            fg_color="#8b5cf6", hover_color="#7c3aed", border_color="#2d2d44"
+        ).pack(anchor="w", pady=(5, 0))
+        
+        # Motore isolato
+        self.isolated_engine_var = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(
+            section, text="Run click engine in a separate process", variable=self.isolated_engine_var,
+            font=ctk.CTkFont(size=11), text_color="#a1a1aa",
+            fg_color="#8b5cf6", hover_color="#7c3aed", border_color="#2d2d44",
+            command=lambda: self.set_engine_isolated(self.isolated_engine_var.get())
+        ).pack(anchor="w", pady=(5, 0))
+        
+        # Allineamento ai tick del gioco: "Sync now" segna un confine di tick, la fase lo corregge
+        self.tick_var = ctk.BooleanVar(value=False)
+        tick_header = ctk.CTkFrame(section, fg_color="transparent")
+        tick_header.pack(fill="x", pady=(5, 0))
+        ctk.CTkCheckBox(
+            tick_header, text="Align clicks to game ticks", variable=self.tick_var,
+            font=ctk.CTkFont(size=11), text_color="#a1a1aa",
+            fg_color="#8b5cf6", hover_color="#7c3aed", border_color="#2d2d44"
+        ).pack(side="left")
+        ctk.CTkButton(
+            tick_header, text="Sync now", width=70, height=24,
+            font=ctk.CTkFont(size=11), fg_color="#1a1a2e", hover_color="#2d2d44",
+            border_color="#8b5cf6", border_width=1, text_color="#8b5cf6",
+            command=lambda: self.engine.sync_ticks()
+        ).pack(side="right")
+        
+        tick_frame = ctk.CTkFrame(section, fg_color="transparent")
+        tick_frame.pack(fill="x", pady=(3, 0))
+        self.tick_rate_var = ctk.StringVar(value="20")
+        self.tick_per_tick_var = ctk.StringVar(value="1")
+        self.tick_offset_var = ctk.StringVar(value="50")
+        self.tick_phase_var = ctk.StringVar(value="0")
+        for label, var in (("TPS", self.tick_rate_var), ("per tick", self.tick_per_tick_var),
+                           ("offset %", self.tick_offset_var), ("phase ms", self.tick_phase_var)):
+            ctk.CTkEntry(
+                tick_frame, textvariable=var, width=40, height=26,
+                fg_color="#1a1a2e", border_color="#2d2d44", text_color="#ffffff"
+            ).pack(side="left", padx=(0, 3))
+            ctk.CTkLabel(
+                tick_frame, text=label, font=ctk.CTkFont(size=10),
+                text_color="#52525b"
+            ).pack(side="left", padx=(0, 8))
+        
+        # Ogni modifica dei campi CPS viene propagata al motore isolato
+        for var in (self.min_cps_var, self.max_cps_var, self.randomize_var, self.rate_control_var, self.tick_var,
+                    self.tick_rate_var, self.tick_per_tick_var, self.tick_offset_var, self.tick_phase_var):
+            var.trace_add("write", lambda *_: self.sync_engine())
     
-    def create_macro_section(self, macro):
-        """Crea una sezione per una macro di click"""
+    def create_macro_section(self, macro, parent):
+        """Crea la sezione di una macro (click o hold) a partire dalla sua definizione"""
         
         # Main frame for macro
         frame = ctk.CTkFrame(
-            self.main_frame, fg_color="#141420",
+            parent, fg_color="#141420",
             corner_radius=10, border_width=1, border_color="#1e1e2e"
         )
         frame.pack(fill="x", pady=(0, 8))
@@ -291,8 +495,15 @@ class VetoClicker(ctk.CTk):
             text_color=title_color
         ).pack(side="left")
         
-        # Enable checkbox (solo per la macro destra)
-        if macro.name == "Right":
+        # Display X della macro, se diverso da quello della finestra
+        if macro.spec.display:
+            ctk.CTkLabel(
+                header_frame, text=f"@ {macro.spec.display}",
+                font=ctk.CTkFont(size=11), text_color="#71717a"
+            ).pack(side="left", padx=(6, 0))
+        
+        # Enable checkbox (non per le macro sempre attive, come Left)
+        if macro.spec.optional:
             macro.enabled_var = ctk.BooleanVar(value=False)
             enable_cb = ctk.CTkCheckBox(
                 header_frame, text="Enable", variable=macro.enabled_var,
@@ -307,7 +518,7 @@ class VetoClicker(ctk.CTk):
         content = ctk.CTkFrame(inner, fg_color="transparent")
         content.pack(fill="x")
         
-        if macro.name == "Right":
+        if macro.spec.optional:
             macro.content_widgets = content
             content.pack_forget()  # Nascosto di default
         
@@ -338,86 +549,116 @@ class VetoClicker(ctk.CTk):
         status_label.pack(side="right")
         macro.status_label = status_label
         
-        # Hint
-        ctk.CTkLabel(
-            content, text="Click button, then press key or Mouse 4/5",
-            font=ctk.CTkFont(size=10), text_color="#52525b"
-        ).pack(anchor="w", pady=(4, 0))
-    
-    def toggle_macro_enabled(self, macro):
-        """Attiva/Disattiva lo stato abilitato della macro"""
-        macro.enabled = macro.enabled_var.get()
-        if macro.enabled:
-            macro.content_widgets.pack(fill="x")
-        else:
-            macro.content_widgets.pack_forget()
-            macro.armed = False
-            macro.clicking = False
-            self.update_macro_status(macro)
-    
-    def create_hold_section(self):
-        """Crea la sezione Hold Macro"""
-        frame = ctk.CTkFrame(
-            self.main_frame, fg_color="#141420",
-            corner_radius=10, border_width=1, border_color="#1e1e2e"
-        )
-        frame.pack(fill="x", pady=(0, 8))
+        if is_key(macro.spec.button):
+            self.create_output_row(macro, content)
         
-        inner = ctk.CTkFrame(frame, fg_color="transparent")
-        inner.pack(padx=12, pady=10, fill="x")
+        if macro.kind == KIND_HOLD:
+            self.create_hold_rows(macro, content)
+            return
         
-        # Header with enable checkbox
-        header_frame = ctk.CTkFrame(inner, fg_color="transparent")
-        header_frame.pack(fill="x", pady=(0, 8))
+        # Distribuzione degli intervalli
+        dist_frame = ctk.CTkFrame(content, fg_color="transparent")
+        dist_frame.pack(fill="x", pady=(8, 2))
         
         ctk.CTkLabel(
-            header_frame,
-            text="Hold Click",
-            font=ctk.CTkFont(size=14, weight="bold"),
-            text_color="#e4e4e7"
+            dist_frame, text="Timing:", font=ctk.CTkFont(size=12),
+            text_color="#a1a1aa"
         ).pack(side="left")
         
-        self.hold_macro.enabled_var = ctk.BooleanVar(value=False)
-        enable_cb = ctk.CTkCheckBox(
-            header_frame, text="Enable", variable=self.hold_macro.enabled_var,
-            font=ctk.CTkFont(size=11), text_color="#a1a1aa",
-            fg_color="#8b5cf6", hover_color="#7c3aed", border_color="#2d2d44",
-            command=self.toggle_hold_enabled
-        )
-        enable_cb.pack(side="right")
+        macro.distribution_var = ctk.StringVar(value=DISTRIBUTIONS[macro.distribution])
+        ctk.CTkSegmentedButton(
+            dist_frame,
+            values=list(DISTRIBUTIONS.values()),
+            variable=macro.distribution_var,
+            command=lambda value, m=macro: self.on_distribution_change(m, value),
+            fg_color="#1a1a2e",
+            selected_color="#8b5cf6",
+            selected_hover_color="#7c3aed",
+            unselected_color="#1a1a2e",
+            unselected_hover_color="#2d2d44",
+            text_color="#a1a1aa",
+            font=ctk.CTkFont(size=11)
+        ).pack(side="left", padx=(10, 0), fill="x", expand=True)
         
-        # Content
-        content = ctk.CTkFrame(inner, fg_color="transparent")
-        self.hold_macro.content_widgets = content
-        content.pack_forget()  # Nascosto di default
+        self.create_burst_row(macro, content)
         
-        # Hotkey row
-        hotkey_frame = ctk.CTkFrame(content, fg_color="transparent")
-        hotkey_frame.pack(fill="x", pady=2)
+        # Hint
+        ctk.CTkLabel(
+            content, text="Click button, then press key or Mouse 4/5",
+            font=ctk.CTkFont(size=10), text_color="#52525b"
+        ).pack(anchor="w", pady=(4, 0))
+    
+    def create_output_row(self, macro, content):
+        """Riga del tasto ripetuto dalle macro da tastiera (selezione come per le hotkey)"""
+        output_frame = ctk.CTkFrame(content, fg_color="transparent")
+        output_frame.pack(fill="x", pady=2)
         
         ctk.CTkLabel(
-            hotkey_frame, text="Hotkey:", font=ctk.CTkFont(size=12),
+            output_frame, text="Output:", font=ctk.CTkFont(size=12),
             text_color="#a1a1aa"
         ).pack(side="left")
         
-        hotkey_btn = ctk.CTkButton(
-            hotkey_frame, text=self.hold_macro.hotkey_str, width=100, height=30,
+        macro.output_button = ctk.CTkButton(
+            output_frame, text=self.output_label(macro), width=100, height=30,
             font=ctk.CTkFont(size=12, weight="bold"),
             fg_color="#1a1a2e", hover_color="#2d2d44",
             border_color="#8b5cf6", border_width=2, text_color="#8b5cf6",
-            command=self.start_hold_hotkey_listen
+            command=lambda m=macro: self.start_output_listen(m)
         )
-        hotkey_btn.pack(side="left", padx=(10, 0))
-        self.hold_macro.hotkey_button = hotkey_btn
+        macro.output_button.pack(side="left", padx=(10, 0))
+    
+    @staticmethod
+    def output_label(macro):
+        return macro.output[len(KEY_PREFIX):].upper()
+    
+    def create_burst_row(self, macro, content):
+        """Riga burst: numero di click, spaziatura (ms) e cooldown (ms) per pressione"""
+        burst_frame = ctk.CTkFrame(content, fg_color="transparent")
+        burst_frame.pack(fill="x", pady=(6, 2))
         
-        # Status indicator
-        status_label = ctk.CTkLabel(
-            hotkey_frame, text="● OFF", font=ctk.CTkFont(size=11, weight="bold"),
-            text_color="#ef4444"
-        )
-        status_label.pack(side="right")
-        self.hold_macro.status_label = status_label
+        macro.burst_var = ctk.BooleanVar(value=macro.burst)
+        ctk.CTkCheckBox(
+            burst_frame, text="Burst", variable=macro.burst_var, width=60,
+            font=ctk.CTkFont(size=11), text_color="#a1a1aa",
+            fg_color="#8b5cf6", hover_color="#7c3aed", border_color="#2d2d44"
+        ).pack(side="left")
         
+        macro.burst_count_var = ctk.StringVar(value=str(macro.burst_count))
+        macro.burst_spacing_var = ctk.StringVar(value=str(macro.burst_spacing_ms))
+        macro.burst_cooldown_var = ctk.StringVar(value=str(macro.burst_cooldown_ms))
+        for label, var in (("x", macro.burst_count_var), ("every ms", macro.burst_spacing_var),
+                           ("cooldown ms", macro.burst_cooldown_var)):
+            ctk.CTkEntry(
+                burst_frame, textvariable=var, width=44, height=26,
+                fg_color="#1a1a2e", border_color="#2d2d44", text_color="#ffffff"
+            ).pack(side="left", padx=(6, 0))
+            ctk.CTkLabel(
+                burst_frame, text=label, font=ctk.CTkFont(size=10),
+                text_color="#52525b"
+            ).pack(side="left", padx=(3, 0))
+        
+        for var in (macro.burst_var, macro.burst_count_var, macro.burst_spacing_var, macro.burst_cooldown_var):
+            var.trace_add("write", lambda *_: self.sync_engine())
+    
+    def on_distribution_change(self, macro, value):
+        """Imposta la distribuzione degli intervalli per la macro"""
+        for key, label in DISTRIBUTIONS.items():
+            if label == value:
+                macro.distribution = key
+        self.sync_engine()
+    
+    def toggle_macro_enabled(self, macro):
+        """Attiva/Disattiva lo stato abilitato della macro"""
+        enabled = macro.enabled_var.get()
+        # La disabilitazione riporta la macro a OFF (transizione eseguita dal motore)
+        self.engine.enable(macro.key, enabled)
+        if enabled:
+            macro.content_widgets.pack(fill="x")
+        else:
+            macro.content_widgets.pack_forget()
+    
+    def create_hold_rows(self, macro, content):
+        """Righe specifiche delle macro hold: modalità e CPS"""
         # Mode selection
         mode_frame = ctk.CTkFrame(content, fg_color="transparent")
         mode_frame.pack(fill="x", pady=(8, 2))
@@ -427,12 +668,12 @@ class VetoClicker(ctk.CTk):
             text_color="#a1a1aa"
         ).pack(side="left")
         
-        self.hold_macro.mode_var = ctk.StringVar(value="single")
+        macro.mode_var = ctk.StringVar(value="single")
         mode_menu = ctk.CTkSegmentedButton(
             mode_frame,
             values=["Single Click", "Break"],
-            variable=self.hold_macro.mode_var,
-            command=self.on_hold_mode_change,
+            variable=macro.mode_var,
+            command=lambda value, m=macro: self.on_hold_mode_change(m, value),
             fg_color="#1a1a2e",
             selected_color="#8b5cf6",
             selected_hover_color="#7c3aed",
@@ -446,80 +687,291 @@ class VetoClicker(ctk.CTk):
         # CPS for single mode
         cps_frame = ctk.CTkFrame(content, fg_color="transparent")
         cps_frame.pack(fill="x", pady=3)
-        self.hold_macro.cps_frame = cps_frame
+        macro.cps_frame = cps_frame
         
         ctk.CTkLabel(
             cps_frame, text="CPS:", font=ctk.CTkFont(size=12),
             text_color="#a1a1aa", width=40, anchor="w"
         ).pack(side="left")
         
-        self.hold_macro.cps_var = ctk.StringVar(value="5")
-        self.hold_macro.cps_entry = ctk.CTkEntry(
-            cps_frame, textvariable=self.hold_macro.cps_var, width=50, height=28,
+        macro.cps_var = ctk.StringVar(value="5")
+        macro.cps_var.trace_add("write", lambda *_: self.sync_engine())
+        macro.cps_entry = ctk.CTkEntry(
+            cps_frame, textvariable=macro.cps_var, width=50, height=28,
             fg_color="#1a1a2e", border_color="#2d2d44", text_color="#ffffff"
         )
-        self.hold_macro.cps_entry.pack(side="left", padx=(0, 10))
+        macro.cps_entry.pack(side="left", padx=(0, 10))
         
-        self.hold_macro.cps_slider = ctk.CTkSlider(
+        macro.cps_slider = ctk.CTkSlider(
             cps_frame, from_=1, to=5, number_of_steps=4,
-            command=self.on_hold_cps_slider, height=16,
+            command=lambda value, m=macro: self.on_hold_cps_slider(m, value), height=16,
             fg_color="#1a1a2e", progress_color="#8b5cf6",
             button_color="#a78bfa", button_hover_color="#c4b5fd"
         )
-        self.hold_macro.cps_slider.set(5)
-        self.hold_macro.cps_slider.pack(side="left", fill="x", expand=True)
+        macro.cps_slider.set(5)
+        macro.cps_slider.pack(side="left", fill="x", expand=True)
         
         # Hint
         ctk.CTkLabel(
-            content, text="Single Click: clicks at set CPS (max 5) | Break: holds left button to break blocks",
+            content, text=f"Single Click: clicks at set CPS (max 5) | Break: holds {macro.spec.button} button to break blocks",
             font=ctk.CTkFont(size=10), text_color="#52525b"
         ).pack(anchor="w", pady=(4, 0))
     
-    def toggle_hold_enabled(self):
-        """Attiva/Disattiva lo stato abilitato della hold macro"""
-        self.hold_macro.enabled = self.hold_macro.enabled_var.get()
-        if self.hold_macro.enabled:
-            self.hold_macro.content_widgets.pack(fill="x")
-        else:
-            self.hold_macro.content_widgets.pack_forget()
-            self.hold_macro.armed = False
-            self.hold_macro.active = False
-            self.update_hold_status()
-    
-    def start_hold_hotkey_listen(self):
-        """Inizia l'ascolto per l'hotkey della hold macro"""
-        self.listening_for_hotkey = "hold"
-        self.hold_macro.hotkey_button.configure(text="Press...", text_color="#fbbf24")
-    
-    def on_hold_mode_change(self, value):
-        """Gestisce il cambio di modalità della hold macro"""
+    def on_hold_mode_change(self, macro, value):
+        """Gestisce il cambio di modalità di una hold macro"""
         if value == "Single Click":
-            self.hold_macro.mode = "single"
-            self.hold_macro.cps_frame.pack(fill="x", pady=3)
+            macro.mode = "single"
+            if not self.minimal:
+                macro.cps_frame.pack(fill="x", pady=3)
         else:
-            self.hold_macro.mode = "break"
-            self.hold_macro.cps_frame.pack_forget()
+            macro.mode = "break"
+            if not self.minimal:
+                macro.cps_frame.pack_forget()
+        self.sync_engine()
     
-    def on_hold_cps_slider(self, value):
+    def on_hold_cps_slider(self, macro, value):
         val = int(value)
-        self.hold_macro.cps_var.set(str(val))
-        self.hold_macro.cps = val
+        macro.cps_var.set(str(val))
+        macro.cps = val
+
+    def create_recorder_section(self):
+        """Crea la sezione del registratore di macro"""
+        section = self.create_section("Macro Recorder")
+
+        row = ctk.CTkFrame(section, fg_color="transparent")
+        row.pack(fill="x", pady=2)
+
+        self.record_button = ctk.CTkButton(
+            row, text="Record", width=80, height=30,
+            font=ctk.CTkFont(size=12, weight="bold"),
+            fg_color="#1a1a2e", hover_color="#2d2d44",
+            border_color="#8b5cf6", border_width=2, text_color="#8b5cf6",
+            command=self.toggle_recording
+        )
+        self.record_button.pack(side="left")
+
+        self.play_button = ctk.CTkButton(
+            row, text="Play", width=80, height=30,
+            font=ctk.CTkFont(size=12, weight="bold"),
+            fg_color="#1a1a2e", hover_color="#2d2d44",
+            border_color="#8b5cf6", border_width=2, text_color="#8b5cf6",
+            command=self.toggle_playback
+        )
+        self.play_button.pack(side="left", padx=(10, 0))
+
+        self.recorder_status_label = ctk.CTkLabel(
+            row, text="● IDLE", font=ctk.CTkFont(size=11, weight="bold"),
+            text_color="#52525b"
+        )
+        self.recorder_status_label.pack(side="right")
+
+        ctk.CTkLabel(
+            section, text="Records mouse and keyboard, appending to recording.vrec",
+            font=ctk.CTkFont(size=10), text_color="#52525b"
+        ).pack(anchor="w", pady=(4, 0))
+
+    def toggle_recording(self):
+        """Avvia/Ferma la registrazione degli eventi di input"""
+        if self.player.playing:
+            return
+        if self.recorder.recording:
+            self.recorder.stop()
+        else:
+            try:
+                self.recorder.start()
+            except (OSError, ValueError) as e:
+                print(f"Errore avvio registrazione: {e}")
+        self.update_recorder_status()
+
+    def toggle_playback(self):
+        """Avvia/Ferma la riproduzione della registrazione"""
+        if self.recorder.recording:
+            return
+        if self.player.playing:
+            self.player.stop()
+        elif os.path.exists(self.recorder.path):
+            self.player.start()
+        self.update_recorder_status()
+
+    def update_recorder_status(self):
+        if self.minimal:
+            return
+        if self.recorder.recording:
+            status, color = "RECORDING", "#ef4444"
+        elif self.player.playing:
+            status, color = "PLAYING", "#22c55e"
+        else:
+            status, color = "IDLE", "#52525b"
+        self.recorder_status_label.configure(text=f"● {status}", text_color=color)
+        self.record_button.configure(text="Stop" if self.recorder.recording else "Record")
+        self.play_button.configure(text="Stop" if self.player.playing else "Play")
+
+    def create_diagnostics_section(self):
+        """Sezione opzionale: CPS reali, jitter p99 e istogramma degli intervalli per macro"""
+        section = self.create_section("Timing Diagnostics")
+        
+        self.diagnostics_var = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(
+            section, text="Show live timing", variable=self.diagnostics_var,
+            font=ctk.CTkFont(size=11), text_color="#a1a1aa",
+            fg_color="#8b5cf6", hover_color="#7c3aed", border_color="#2d2d44",
+            command=self.toggle_diagnostics
+        ).pack(anchor="w")
+        
+        # Contenuto creato subito ma mostrato (e aggiornato) solo se abilitato
+        frame = ctk.CTkFrame(section, fg_color="transparent")
+        self.diagnostics_frame = frame
+        
+        self.diagnostics_labels = {}
+        self.diagnostics_texts = {}
+        for macro in self.macros:
+            label = ctk.CTkLabel(
+                frame, text=f"{macro.name}: -", font=ctk.CTkFont(size=11),
+                text_color="#a1a1aa", anchor="w"
+            )
+            label.pack(fill="x")
+            self.diagnostics_labels[macro.key] = label
+        
+        self.histogram_macro_var = ctk.StringVar(value=self.macros[0].name)
+        ctk.CTkSegmentedButton(
+            frame,
+            values=[macro.name for macro in self.macros],
+            variable=self.histogram_macro_var,
+            command=lambda _: self.select_histogram(),
+            fg_color="#1a1a2e",
+            selected_color="#8b5cf6",
+            selected_hover_color="#7c3aed",
+            unselected_color="#1a1a2e",
+            unselected_hover_color="#2d2d44",
+            text_color="#a1a1aa",
+            font=ctk.CTkFont(size=11)
+        ).pack(fill="x", pady=(6, 0))
+        
+        # Una barra per bin, creata una volta sola: i frame spostano solo le barre cambiate
+        self.histogram = ctk.CTkCanvas(
+            frame, width=HIST_WIDTH, height=HIST_HEIGHT, bg="#0d0d14", highlightthickness=0
+        )
+        self.histogram.pack(pady=(6, 0))
+        self.histogram_bars = HistogramBars(self.histogram, HIST_WIDTH, HIST_HEIGHT, "#8b5cf6")
+        self.histogram_key = self.macros[0].key
+        
+        ctk.CTkLabel(
+            frame, text="Click intervals, 1 ms - 1 s (log scale)",
+            font=ctk.CTkFont(size=10), text_color="#52525b"
+        ).pack(anchor="w", pady=(4, 0))
+        
+        # Latenza iniezione -> listener (click di prova col tasto centrale)
+        delivery_frame = ctk.CTkFrame(frame, fg_color="transparent")
+        delivery_frame.pack(fill="x", pady=(6, 0))
+        ctk.CTkButton(
+            delivery_frame, text="Measure delivery", width=120, height=26,
+            font=ctk.CTkFont(size=11), fg_color="#1a1a2e", hover_color="#2d2d44",
+            border_color="#8b5cf6", border_width=1, text_color="#8b5cf6",
+            command=self.measure_delivery
+        ).pack(side="left")
+        self.delivery_label = ctk.CTkLabel(
+            delivery_frame, text=self.delivery_text, font=ctk.CTkFont(size=11),
+            text_color=self.delivery_color, anchor="w"
+        )
+        self.delivery_label.pack(side="left", padx=(8, 0), fill="x", expand=True)
     
-    def update_hold_status(self, status=None):
-        if status is None:
-            if self.hold_macro.active:
-                status = "ACTIVE"
-            elif self.hold_macro.armed:
-                status = "ARMED"
+    def toggle_diagnostics(self):
+        """Mostra/Nasconde la diagnostica; il ciclo di aggiornamento gira solo se visibile"""
+        if self.diagnostics_var.get():
+            self.diagnostics_frame.pack(fill="x", pady=(6, 0))
+            self.geometry(f"440x{820 + DIAG_EXTRA_HEIGHT}")
+            if self.diagnostics_job is None:
+                self.update_diagnostics()
+        else:
+            self.diagnostics_frame.pack_forget()
+            self.geometry("440x820")
+            if self.diagnostics_job is not None:
+                self.after_cancel(self.diagnostics_job)
+                self.diagnostics_job = None
+    
+    def measure_delivery(self):
+        """Misura in background la latenza iniezione -> listener del backend in uso.
+        
+        I click di prova cadono su un pannello aperto apposta, mai sulla finestra
+        sotto il cursore, e li inietta un backend con connessione propria; il
+        cursore torna al suo posto dal thread Tk, a misura finita.
+        """
+        if self.delivery_running:
+            return
+        self.delivery_running = True
+        self.show_delivery("Measuring...", "#fbbf24")
+        pointer = self.mouse_controller.position
+        listener = self.input_listener
+        target = ctk.CTkToplevel(self)
+        target.title("Veto - Delivery")
+        target.geometry(f"{DELIVERY_TARGET_WIDTH}x{DELIVERY_TARGET_HEIGHT}+{self.winfo_rootx()}+{self.winfo_rooty()}")
+        target.attributes("-topmost", True)
+        ctk.CTkLabel(target, text="Measuring delivery...", font=ctk.CTkFont(size=12)).pack(expand=True, fill="both")
+        target.update()  # pannello mappato prima di leggerne la posizione
+        origin = (target.winfo_rootx() + (target.winfo_width() - DELIVERY_TAGS) // 2,
+                  target.winfo_rooty() + target.winfo_height() // 2)
+        
+        def attach(probe):
+            self.delivery_probe = probe
+        
+        def finish(text, color):
+            # Thread Tk: il controller condiviso non si usa dal thread della misura
+            self.mouse_controller.position = pointer
+            if target.winfo_exists():
+                target.destroy()
+            self.delivery_running = False
+            self.show_delivery(text, color)
+        
+        def run():
+            try:
+                # I listener evdev non riportano la posizione: i click si riconoscono dal solo pulsante
+                result = self.engine.measure_delivery(attach, listener, origin=origin,
+                                                      match_position=listener != "evdev")
+            except Exception as e:
+                text, color = f"Delivery: unavailable ({e})", "#ef4444"
             else:
-                status = "OFF"
-        
-        colors = {
-            "OFF": "#ef4444",
-            "ARMED": "#fbbf24",
-            "ACTIVE": "#22c55e"
-        }
-        self.hold_macro.status_label.configure(text=f"● {status}", text_color=colors.get(status, "#ef4444"))
+                if not result["delivered"]:
+                    text = f"Delivery: no clicks reached the {listener} listener"
+                else:
+                    text = (f"Delivery p50 {result['p50_us'] / 1000:.2f} ms  |  p99 {result['p99_us'] / 1000:.2f} ms"
+                            f"  |  lost {result['lost']}")
+                color = "#ef4444" if result["warning"] else "#22c55e"
+                if result["warning"]:
+                    print(f"Backend di iniezione lento con il listener {listener}: {result}")
+            self.after(0, lambda: finish(text, color))
+        
+        threading.Thread(target=run, name="VetoDelivery", daemon=True).start()
+    
+    def show_delivery(self, text, color):
+        self.delivery_text, self.delivery_color = text, color
+        if not self.minimal:
+            self.delivery_label.configure(text=text, text_color=color)
+    
+    def select_histogram(self):
+        for macro in self.macros:
+            if macro.name == self.histogram_macro_var.get():
+                self.histogram_key = macro.key
+        self.histogram_bars.reset()
+        self.draw_histogram()
+    
+    def update_diagnostics(self):
+        """Un frame della diagnostica: legge i click nuovi dal ring e aggiorna solo ciò che è cambiato"""
+        now = now_ns()
+        for macro in self.macros:
+            stats = self.diagnostics[macro.key]
+            stats.cursor, timestamps = self.engine.read_clicks(macro.key, stats.cursor)
+            stats.feed(timestamps)
+            if not timestamps and not stats.recent:
+                continue  # nessun click nell'ultimo secondo: niente da aggiornare
+            text = f"{macro.name}: {stats.cps(now)} CPS  |  p99 jitter {stats.jitter_p99_ms():.2f} ms"
+            if self.diagnostics_texts.get(macro.key) != text:
+                self.diagnostics_texts[macro.key] = text
+                self.diagnostics_labels[macro.key].configure(text=text)
+        self.draw_histogram()
+        self.diagnostics_job = self.after(DIAG_FRAME_MS, self.update_diagnostics)
+    
+    def draw_histogram(self):
+        self.histogram_bars.draw(self.diagnostics[self.histogram_key])
     
     def create_section(self, title):
         frame = ctk.CTkFrame(
@@ -558,9 +1010,29 @@ class VetoClicker(ctk.CTk):
     
     def start_hotkey_listen(self, macro):
         """Inizia l'ascolto per l'hotkey per una macro specifica"""
+        self.listening_for_output = None
         self.listening_for_hotkey = macro
         macro.hotkey_button.configure(text="Press...", text_color="#fbbf24")
     
+    def start_output_listen(self, macro):
+        """Il prossimo tasto premuto diventa il tasto ripetuto dalla macro"""
+        self.listening_for_hotkey = None
+        self.listening_for_output = macro
+        macro.output_button.configure(text="Press...", text_color="#fbbf24")
+    
+    def set_macro_output(self, macro, output):
+        """Pubblica al motore il tasto ripetuto (chiamabile da qualsiasi thread)"""
+        try:
+            macro.output = self.engine.set_output(macro.key, output)
+        except ValueError as e:
+            print(f"Tasto non valido per {macro.key}: {e}")
+        self.after(0, lambda: self.update_output_display(macro))
+    
+    def update_output_display(self, macro):
+        if self.minimal or macro.output_button is None:
+            return
+        macro.output_button.configure(text=self.output_label(macro), text_color="#8b5cf6")
+    
     def get_mouse_button_name(self, button):
         names = {
             Button.left: "Mouse Left",
@@ -572,417 +1044,622 @@ class VetoClicker(ctk.CTk):
         return names.get(button, str(button))
     
     def start_input_listeners(self):
-        def on_key_press(key):
+        injected_keys = self.engine.injected_keys
+        
+        def set_hotkey(macro, key, is_mouse):
+            macro.hotkey = key
+            macro.hotkey_is_mouse = is_mouse
+            if is_mouse:
+                macro.hotkey_str = self.get_mouse_button_name(key)
+            else:
+                macro.hotkey_str = key_name(key)
+            self.rebuild_input_index()
+            self.after(0, lambda: self.update_hotkey_display(macro))
+            self.listening_for_hotkey = None
+        
+        def trigger_hotkey(key):
+            """Arma/disarma la prima macro abilitata con questo hotkey (lookup O(1))"""
+            binding = key_id(key)
+            for macro in self.hotkey_index.get(binding, ()):
+                if macro.enabled:
+                    self.toggle_armed(macro, binding)
+                    return True
+            return False
+        
+        def on_key_press(key, injected=False):
+            # Eco dei tasti iniettati da macro e riproduzione: `injected` dove pynput
+            # lo rileva, altrimenti il filtro per tasto del motore (non un flag globale)
+            if injected or injected_keys.consume(key, True):
+                return
+            self.recorder.on_key_press(key)
+            
             # Modalità di selezione Hotkey
             if self.listening_for_hotkey:
-                if self.listening_for_hotkey == "hold":
-                    self.hold_macro.hotkey = key
-                    self.hold_macro.hotkey_is_mouse = False
-                    try:
-                        self.hold_macro.hotkey_str = key.char.upper()
-                    except AttributeError:
-                        self.hold_macro.hotkey_str = str(key).replace("Key.", "").upper()
-                    
-                    self.after(0, self.update_hold_hotkey_display)
-                    self.listening_for_hotkey = None
-                    return
-                else:
-                    macro = self.listening_for_hotkey
-                    macro.hotkey = key
-                    macro.hotkey_is_mouse = False
-                    try:
-                        # Tasto carattere
-                        macro.hotkey_str = key.char.upper()
-                    except AttributeError:
-                        # Tasto speciale (F6, shift, ctrl...)
-                        macro.hotkey_str = str(key).replace("Key.", "").upper()
-                    
-                    self.after(0, lambda: self.update_hotkey_display(macro))
-                    self.listening_for_hotkey = None
-                    return
+                set_hotkey(self.listening_for_hotkey, key, False)
+                return
             
-            # Controlla hold macro hotkey
-            if self.hold_macro.enabled and not self.hold_macro.hotkey_is_mouse and self.hold_macro.hotkey == key:
-                self.after(0, self.toggle_hold_armed)
+            # Modalità di selezione del tasto ripetuto (macro da tastiera)
+            if self.listening_for_output:
+                macro, self.listening_for_output = self.listening_for_output, None
+                self.set_macro_output(macro, KEY_PREFIX + key_name(key).lower())
                 return
             
             # Controlla se il tasto corrisponde a un hotkey di macro
-            for macro in [self.left_macro, self.right_macro]:
-                if macro.enabled and not macro.hotkey_is_mouse and macro.hotkey == key:
-                    self.after(0, lambda m=macro: self.toggle_armed(m))
+            trigger_hotkey(key)
         
-        def on_key_release(key):
-            pass
+        def on_key_release(key, injected=False):
+            if injected or injected_keys.consume(key, False):
+                return
+            self.recorder.on_key_release(key)
+        
+        def on_mouse_move(x, y):
+            if not self.player.playing:
+                self.recorder.on_move(x, y)
+        
+        def on_mouse_scroll(x, y, dx, dy):
+            if not self.player.playing:
+                self.recorder.on_scroll(x, y, dx, dy)
         
         def on_mouse_click(x, y, button, pressed):
-            if self.ignore_clicks:
+            probe = self.delivery_probe
+            if probe is not None and probe.on_click(x, y, button, pressed):
+                return  # click di prova della misura di consegna
+            if self.engine.injecting:
                 return
+            if self.recorder.recording:
+                if self.input_listener == "evdev":
+                    # evdev non conosce il puntatore (x = y = 0): si registra la posizione reale
+                    x, y = self.mouse_controller.position
+                self.recorder.on_click(x, y, button, pressed)
             
             # Modalità di selezione Hotkey (Mouse 4/5)
             if self.listening_for_hotkey and pressed and button in [Button.x1, Button.x2]:
-                if self.listening_for_hotkey == "hold":
-                    self.hold_macro.hotkey = button
-                    self.hold_macro.hotkey_is_mouse = True
-                    self.hold_macro.hotkey_str = self.get_mouse_button_name(button)
-                    
-                    self.after(0, self.update_hold_hotkey_display)
-                    self.listening_for_hotkey = None
-                    return
-                else:
-                    macro = self.listening_for_hotkey
-                    macro.hotkey = button
-                    macro.hotkey_is_mouse = True
-                    macro.hotkey_str = self.get_mouse_button_name(button)
-                    
-                    self.after(0, lambda: self.update_hotkey_display(macro))
-                    self.listening_for_hotkey = None
-                    return
-            
-            # Controlla hold macro hotkey (Mouse 4/5)
-            if self.hold_macro.enabled and self.hold_macro.hotkey_is_mouse and self.hold_macro.hotkey == button and pressed:
-                self.after(0, self.toggle_hold_armed)
+                set_hotkey(self.listening_for_hotkey, button, True)
                 return
             
             # Controlla se il pulsante è un hotkey di macro (Mouse 4/5)
-            for macro in [self.left_macro, self.right_macro]:
-                if macro.enabled and macro.hotkey_is_mouse and macro.hotkey == button and pressed:
-                    self.after(0, lambda m=macro: self.toggle_armed(m))
-                    return
-            
-            # Pulsante sinistro controlla la macro sinistra
-            if button == Button.left:
-                macro = self.left_macro
-                if macro.enabled and macro.armed:
-                    if pressed:
-                        macro.mouse_held = True
-                        self.after(0, lambda: self.start_clicking(macro))
-                    else:
-                        macro.mouse_held = False
-                        if macro.clicking:
-                            self.after(0, lambda: self.stop_clicking_keep_armed(macro))
+            if pressed and trigger_hotkey(button):
+                return
             
-            # Pulsante destro controlla la macro destra
-            elif button == Button.right:
-                macro = self.right_macro
-                if macro.enabled and macro.armed:
-                    if pressed:
-                        macro.mouse_held = True
-                        self.after(0, lambda: self.start_clicking(macro))
-                    else:
-                        macro.mouse_held = False
-                        if macro.clicking:
-                            self.after(0, lambda: self.stop_clicking_keep_armed(macro))
+            # Il pulsante fisico controlla le macro di click che lo usano come trigger.
+            # Il comando va direttamente al motore, senza passare dal mainloop di Tk
+            command = CMD_PRESS if pressed else CMD_RELEASE
+            keys = self.trigger_index.get(button, ())
+            for key in keys:
+                self.engine.post(key, command)
+            if keys and self.trigger_log is not None:
+                self.trigger_log.append(EV_TRIGGER_DOWN if pressed else EV_TRIGGER_UP, NO_SLOT,
+                                        button.name, now_ns())
+        
+        if self.input_backend == "evdev" and sys.platform.startswith("linux"):
+            # Tasti e pulsanti letti da /dev/input su un unico thread epoll;
+            # pynput resta solo per movimenti e rotella (usati dal registratore)
+            try:
+                # Import locale: il modulo usa fcntl/epoll, assenti su Windows
+                from veto_evdev import EvdevListener
+                self.keyboard_listener = EvdevListener(
+                    on_press=on_key_press, on_release=on_key_release, on_click=on_mouse_click
+                )
+                self.keyboard_listener.start()
+                self.mouse_listener = MouseListener(on_move=on_mouse_move, on_scroll=on_mouse_scroll)
+                self.mouse_listener.start()
+                self.input_listener = "evdev"
+                return
+            except OSError as e:
+                print(f"Listener evdev non disponibile ({e}), uso pynput")
+                self.keyboard_listener = None
         
         self.keyboard_listener = KeyboardListener(on_press=on_key_press, on_release=on_key_release)
         self.keyboard_listener.start()
         
-        self.mouse_listener = MouseListener(on_click=on_mouse_click)
+        self.mouse_listener = MouseListener(on_click=on_mouse_click, on_move=on_mouse_move, on_scroll=on_mouse_scroll)
         self.mouse_listener.start()
     
     def update_hotkey_display(self, macro):
+        if self.minimal:
+            return
         macro.hotkey_button.configure(text=macro.hotkey_str, text_color="#8b5cf6")
     
-    def update_hold_hotkey_display(self):
-        self.hold_macro.hotkey_button.configure(text=self.hold_macro.hotkey_str, text_color="#8b5cf6")
+    def rebuild_input_index(self):
+        """Ricostruisce hotkey -> macro e pulsante -> macro di click (sostituzione atomica)"""
+        hotkeys = {}
+        triggers = {}
+        for macro in self.macros:
+            if macro.hotkey is not None:
+                hotkeys.setdefault(key_id(macro.hotkey), []).append(macro)
+            if macro.kind == KIND_CLICK:
+                triggers.setdefault(macro.button, []).append(macro.key)
+        self.hotkey_index = hotkeys
+        self.trigger_index = triggers
     
-    def toggle_hold_armed(self):
-        """Attiva/Disattiva lo stato 'armed' per la hold macro, con cooldown."""
-        if self.hotkey_cooldown:
+    def toggle_armed(self, macro, binding):
+        """Attiva/Disattiva lo stato 'armed' per una macro, con debounce per binding.
+        
+        Chiamata dal thread listener: i rimbalzi dello stesso tasto entro la finestra
+        vengono scartati, mentre hotkey diverse restano indipendenti e il comando
+        va al motore senza passare dal mainloop di Tk.
+        """
+        now = time.monotonic_ns()
+        last = self.hotkey_last.get(binding)
+        if last is not None and now - last < self.hotkey_debounce_ns:
             return
+        self.hotkey_last[binding] = now
         
-        self.hotkey_cooldown = True
-        self.after(200, lambda: setattr(self, 'hotkey_cooldown', False))
-        
-        self.hold_macro.armed = not self.hold_macro.armed
-        
-        if self.hold_macro.armed:
-            self.update_hold_status("ARMED")
-            # Avvia l'azione della hold macro
-            self.start_hold_action()
-        else:
-            # Ferma l'azione
-            self.hold_macro.active = False
-            self.stop_hold_action()
-            self.update_hold_status("OFF")
-    
-    def start_hold_action(self):
-        """Avvia l'azione della hold macro"""
-        if self.hold_macro.active:
-            return
-        
-        self.hold_macro.active = True
-        self.update_hold_status("ACTIVE")
-        
-        if self.hold_macro.mode == "single":
-            # Modalità single click con CPS (max 5)
-            thread = threading.Thread(target=self.hold_single_loop, daemon=True)
-            thread.start()
-        else:
-            # Modalità break (tiene premuto il tasto sinistro)
-            thread = threading.Thread(target=self.hold_break_loop, daemon=True)
-            thread.start()
-    
-    def stop_hold_action(self):
-        """Ferma l'azione della hold macro"""
-        if self.hold_macro.armed:
-            self.update_hold_status("ARMED")
-        else:
-            self.update_hold_status("OFF")
-    
-    def hold_single_loop(self):
-        """Loop per la modalità single click (max 5 CPS)"""
-        while self.hold_macro.active and self.hold_macro.armed:
-            try:
-                cps = int(self.hold_macro.cps_var.get())
-                # Limita a massimo 5 CPS
-                if cps > 5:
-                    cps = 5
-            except ValueError:
-                cps = 5
-            
-            delay = 1.0 / cps
-            
-            # Click
-            self.ignore_clicks = True
-            self.mouse_controller.click(Button.left)
-            self.ignore_clicks = False
-            
-            time.sleep(delay)
-        
-        self.hold_macro.active = False
-        self.after(0, self.stop_hold_action)
-    
-    def hold_break_loop(self):
-        """Loop per la modalità break (tiene premuto il tasto sinistro come quando si rompe un blocco)"""
-        # Preme e tiene premuto il pulsante sinistro
-        self.ignore_clicks = True
-        self.mouse_controller.press(Button.left)
-        self.ignore_clicks = False
-        
-        # Attende finché la macro è attiva e armed
-        while self.hold_macro.active and self.hold_macro.armed:
-            time.sleep(0.1)
-        
-        # Rilascia il pulsante quando si disattiva
-        self.ignore_clicks = True
-        self.mouse_controller.release(Button.left)
-        self.ignore_clicks = False
-        
-        self.hold_macro.active = False
-        self.after(0, self.stop_hold_action)
+        # Logica di toggle standard (disarmare ferma anche il clicking; OFF <-> ACTIVE per la hold)
+        self.engine.post(macro.key, CMD_TOGGLE)
     
-    def toggle_armed(self, macro):
-        """Attiva/Disattiva lo stato 'armed' per una macro, con cooldown."""
-        
-        # Implementa il cooldown per prevenire il doppio toggle rapido
-        if self.hotkey_cooldown:
-            return # Blocca l'esecuzione se è in cooldown
-        
-        self.hotkey_cooldown = True
-        # Rimuovi il cooldown dopo 200ms 
-        self.after(200, lambda: setattr(self, 'hotkey_cooldown', False))
-        
-        # Logica di toggle standard
-        macro.armed = not macro.armed
-        if macro.armed:
-            self.update_macro_status(macro, "ARMED")
-        else:
-            # Assicurati che il clicking si fermi se disarmi
-            macro.clicking = False 
-            self.update_macro_status(macro, "OFF")
+    def on_engine_event(self, event):
+        """Chiamata dal thread motore: aggiorna lo stato mostrato nella GUI"""
+        if event.kind == EVENT_CONFIG:
+            # Solo i CPS cambiati da client esterni: quelli della GUI arrivano dal thread Tk
+            if self.macros_by_key[event.macro].kind != KIND_CLICK or threading.current_thread() is threading.main_thread():
+                return
+            # I campi CPS della GUI valgono per tutte le macro di click: si aggiornano
+            # solo quando tutte hanno gli stessi CPS (un set_cps per una macro resta suo)
+            cps = {self.engine.config(macro.key)[3:5] for macro in self.macros if macro.kind == KIND_CLICK}
+            if len(cps) != 1:
+                return
+            min_cps, max_cps = cps.pop()
+            self.after(0, lambda: self.show_engine_cps(min_cps, max_cps))
+            return
+        if event.kind != EVENT_TRANSITION:
+            return
+        macro = self.macros_by_key[event.macro]
+        self.after(0, lambda: self.update_macro_status(macro))
     
     def update_macro_status(self, macro, status=None):
         if status is None:
-            if macro.clicking:
-                status = "CLICKING"
-            elif macro.armed:
-                status = "ARMED"
-            else:
-                status = "OFF"
+            # OFF / ARMED / CLICKING per le macro di click, OFF / ACTIVE per le hold
+            status = macro.state.state
+        
+        if self.minimal:
+            self.update_minimal_status()
+            return
         
         colors = {
             "OFF": "#ef4444",
             "ARMED": "#fbbf24",
-            "CLICKING": "#22c55e"
+            "CLICKING": "#22c55e",
+            "ACTIVE": "#22c55e"
         }
         macro.status_label.configure(text=f"● {status}", text_color=colors.get(status, "#ef4444"))
     
-    def start_clicking(self, macro):
-        if macro.clicking:
-            return
+    def enter_minimal_mode(self):
+        """Distrugge l'albero dei widget: restano motore, listener e un piccolo indicatore di stato.
         
-        macro.clicking = True
-        self.update_macro_status(macro, "CLICKING")
-        
-        # Esegue il loop di click in un thread separato
-        thread = threading.Thread(target=lambda: self.click_loop(macro), daemon=True)
-        thread.start()
+        Le variabili Tk (CPS, distribuzioni, burst...) restano vive, così profili e
+        comandi dal socket continuano a funzionare; create_ui le ricrea al ripristino.
+        """
+        if self.minimal:
+            return
+        if self.diagnostics_job is not None:
+            self.after_cancel(self.diagnostics_job)
+            self.diagnostics_job = None
+        self.listening_for_hotkey = None
+        self.listening_for_output = None
+        self.minimal = True
+        self.main_frame.destroy()
+        # Rilascia i wrapper Python dei widget distrutti (e le immagini del logo)
+        for name in UI_WIDGETS:
+            setattr(self, name, None)
+        self.diagnostics_labels = {}
+        self.histogram_bars = None
+        for macro in self.macros:
+            for name in MACRO_WIDGETS:
+                if hasattr(macro, name):
+                    setattr(macro, name, None)
+        
+        self.mini_frame = ctk.CTkFrame(self, fg_color="transparent")
+        self.mini_frame.pack(fill="both", expand=True, padx=10, pady=8)
+        self.mini_label = ctk.CTkLabel(
+            self.mini_frame, text="", font=ctk.CTkFont(size=11, weight="bold"),
+            text_color="#a1a1aa", justify="left", anchor="w"
+        )
+        self.mini_label.pack(side="left", fill="x", expand=True)
+        ctk.CTkButton(
+            self.mini_frame, text="Show", width=60, height=26,
+            font=ctk.CTkFont(size=11), fg_color="#1a1a2e", hover_color="#2d2d44",
+            border_color="#8b5cf6", border_width=1, text_color="#8b5cf6",
+            command=self.exit_minimal_mode
+        ).pack(side="right")
+        self.update_minimal_status()
+        self.geometry(f"260x{24 + 18 * len(self.macros)}")
     
-    def stop_clicking_keep_armed(self, macro):
-
-        if macro.armed:
-            self.update_macro_status(macro, "ARMED")
+    def exit_minimal_mode(self):
+        """Ricostruisce la finestra completa dallo stato corrente delle impostazioni"""
+        if not self.minimal:
+            return
+        settings = self.collect_settings()
+        self.mini_frame.destroy()
+        self.mini_frame = None
+        self.mini_label = None
+        self.minimal = False
+        self.create_ui()
+        self.restore_ui(settings)
+        self.isolated_engine_var.set(self.engine.isolated)
+        for macro in self.macros:
+            self.update_macro_status(macro)
+        self.update_recorder_status()
+        self.geometry("440x820")
+    
+    def update_minimal_status(self):
+        lines = [f"{macro.name}  ● {macro.state.state}" for macro in self.macros if macro.enabled]
+        text = "\n".join(lines) or "● OFF"
+        # Nessun ridisegno se il testo non cambia
+        if self.mini_label.cget("text") != text:
+            self.mini_label.configure(text=text)
+    
+    def set_engine_isolated(self, isolated):
+        """Sposta l'iniezione dei click in un processo separato (o la riporta nel processo GUI)"""
+        try:
+            self.engine.set_isolated(isolated)
+        except Exception as e:
+            print(f"Errore avvio motore isolato: {e}")
+            self.isolated_engine_var.set(False)
+    
+    def show_engine_cps(self, min_cps, max_cps):
+        """Come show_cps per CPS impostati da client esterni: sono già nel motore, niente sync_engine"""
+        self.showing_engine_cps = True
+        try:
+            self.show_cps(min_cps, max_cps)
+        finally:
+            self.showing_engine_cps = False
+    
+    def show_cps(self, min_cps, max_cps):
+        """Allinea campi e slider ai CPS indicati (senza scritture se già uguali)"""
+        if self.min_cps_var.get() != str(min_cps):
+            self.min_cps_var.set(str(min_cps))
+            if not self.minimal:
+                self.min_slider.set(min_cps)
+        if self.max_cps_var.get() != str(max_cps):
+            self.max_cps_var.set(str(max_cps))
+            if not self.minimal:
+                self.max_slider.set(max_cps)
+    
+    def start_control_server(self):
+        if not self.control_socket:
+            return
+        server = ControlServer(
+            self.engine, os.path.expanduser(self.control_socket),
+            on_profile=lambda name: self.after(0, lambda: self.apply_profile(name))
+        )
+        try:
+            server.start()
+        except OSError as e:
+            print(f"Server di controllo non disponibile: {e}")
+            return
+        self.control_server = server
+    
+    def start_event_log(self):
+        if not self.event_log_dir:
+            return
+        try:
+            log = self.engine.start_event_log(os.path.expanduser(self.event_log_dir))
+        except OSError as e:
+            print(f"Log eventi non disponibile: {e}")
+            return
+        self.trigger_log = log.ring("input")
+    
+    def start_settings_watch(self, settings):
+        """Osserva settings.json: le modifiche esterne si applicano senza riavviare"""
+        if not self.watch_settings:
+            return
+        self.settings_watcher = SettingsWatcher(
+            self.settings_path(), lambda new, parts, detected: self.after(0, lambda: self.apply_reload(new, parts, detected)),
+            [macro.key for macro in self.macros], settings, RESTART_KEYS + tuple(DEFAULT_TUNING)
+        )
+        self.settings_watcher.start()
+    
+    def apply_reload(self, settings, parts, detected_ns):
+        """Applica le parti cambiate di settings.json (già validate dal watcher).
+        
+        Solo variabili, indici e comandi al motore: nessun widget ricreato e
+        listener intatti. I campi CPS e di timing passano dalle stesse trace
+        della GUI, quindi il motore riceve le nuove configurazioni subito.
+        """
+        if "timing" in parts:
+            self.apply_timing(settings)
+        if "hotkeys" in parts:
+            self.hotkey_debounce_ns = max(0, int(settings.get("hotkey_debounce_ms", 200))) * 1_000_000
+            for macro in self.macros:
+                macro.hotkey_str = self.macro_setting(settings, macro, "hotkey_str", macro.spec.hotkey)
+                macro.hotkey_is_mouse = self.macro_setting(settings, macro, "hotkey_is_mouse", False)
+                self.restore_hotkey(macro)
+                self.update_hotkey_display(macro)
+            self.rebuild_input_index()
+        if "enabled" in parts:
+            for macro in self.macros:
+                if macro.spec.optional:
+                    self.set_macro_enabled(macro, bool(self.macro_setting(settings, macro, "enabled", False)))
+        latency_ms = (now_ns() - detected_ns) / 1e6
+        print(f"settings.json ricaricato ({', '.join(sorted(parts))}) in {latency_ms:.1f} ms")
+    
+    def set_macro_enabled(self, macro, enabled):
+        if macro.enabled_var.get() == enabled:
+            return
+        macro.enabled_var.set(enabled)
+        if self.minimal:
+            self.engine.enable(macro.key, enabled)  # sezione distrutta: solo il motore
         else:
-            self.update_macro_status(macro, "OFF")
+            self.toggle_macro_enabled(macro)
+    
+    def apply_profile(self, name):
+        """Applica profiles/<name>.json: CPS, randomizzazione, distribuzioni e hold"""
+        profiles_dir = os.path.join(os.path.dirname(os.path.abspath(sys.argv[0])), "profiles")
+        try:
+            with open(os.path.join(profiles_dir, f"{os.path.basename(name)}.json"), "r") as f:
+                profile = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Profilo {name} non valido: {e}")
+            return
+        self.apply_timing(profile)
+    
+    def apply_timing(self, profile):
+        """CPS, randomizzazione, tick, distribuzioni, burst e hold presenti in profile (profilo o settings.json)"""
+        if "min_cps" in profile or "max_cps" in profile:
+            self.show_cps(int(profile.get("min_cps", self.min_cps_var.get())),
+                          int(profile.get("max_cps", self.max_cps_var.get())))
+        if "randomize" in profile:
+            self.randomize_var.set(bool(profile["randomize"]))
+        if "rate_control" in profile:
+            self.rate_control_var.set(bool(profile["rate_control"]))
+        self.restore_tick_sync(profile.get("tick_sync"))
+        for macro in self.macros:
+            if macro.kind == KIND_CLICK:
+                self.restore_distribution(macro, self.macro_setting(profile, macro, "distribution", macro.distribution))
+                self.restore_burst(macro, self.macro_setting(profile, macro, "burst", None))
+            else:
+                self.restore_hold_timing(macro, self.macro_setting(profile, macro, "mode", macro.mode),
+                                         self.macro_setting(profile, macro, "cps", macro.cps_var.get()))
+        self.sync_engine()
     
-    def click_loop(self, macro):
-        while macro.clicking and macro.mouse_held:
+    def sync_engine(self):
+        """Pubblica la configurazione delle macro (CPS, distribuzione, modalità) al motore"""
+        if self.showing_engine_cps:
+            return
+        try:
+            min_cps = int(self.min_cps_var.get())
+            max_cps = int(self.max_cps_var.get())
+        except ValueError:
+            min_cps, max_cps = 10, 15
+        randomize = self.randomize_var.get()
+        rate_control = self.rate_control_var.get()
+        for macro in self.macros:
+            if macro.kind == KIND_HOLD:
+                # La sezione hold può non esistere ancora durante la creazione della UI
+                cps_var = getattr(macro, "cps_var", None)
+                try:
+                    # Limita a massimo 5 CPS
+                    hold_cps = max(1, min(int(cps_var.get()), 5)) if cps_var else 5
+                except ValueError:
+                    hold_cps = 5
+                self.engine.set_hold(macro.mode, hold_cps, macro.key)
+                continue
             try:
-                min_cps = int(self.min_cps_var.get())
-                max_cps = int(self.max_cps_var.get())
+                self.engine.configure(macro.key, randomize, macro.distribution, min_cps=min_cps, max_cps=max_cps,
+                                      rate_control=rate_control)
             except ValueError:
-                min_cps, max_cps = 10, 15
-            
-            if self.randomize_var.get():
-                cps = random.uniform(min_cps, max_cps)
-            else:
-                cps = (min_cps + max_cps) / 2
-            
-            delay = 1.0 / cps
-            
-            if self.randomize_var.get():
-                # Aggiunge una leggera randomizzazione al ritardo
-                delay *= random.uniform(0.85, 1.15)
-            
-            # Click
-            self.ignore_clicks = True
-            self.mouse_controller.click(macro.button)
-            self.ignore_clicks = False
-            
-            time.sleep(delay)
-        
-        macro.clicking = False
-        self.after(0, lambda: self.stop_clicking_keep_armed(macro))
+                pass  # valori intermedi mentre l'utente modifica i campi
+            self.sync_burst(macro)
+        self.sync_ticks()
+    
+    def sync_ticks(self):
+        """Pubblica l'allineamento ai tick (comune a tutte le macro)"""
+        if not hasattr(self, "tick_phase_var"):
+            return  # sezione CPS non ancora completa
+        try:
+            rate = int(self.tick_rate_var.get()) if self.tick_var.get() else 0
+            self.engine.set_ticks(rate, float(self.tick_phase_var.get()), int(self.tick_per_tick_var.get()),
+                                  int(self.tick_offset_var.get()))
+        except ValueError:
+            pass  # valori intermedi mentre l'utente modifica i campi
+    
+    def sync_burst(self, macro):
+        """Legge la riga burst di una macro di click e la pubblica al motore"""
+        if not hasattr(macro, "burst_cooldown_var"):
+            return  # riga burst non ancora creata
+        try:
+            count = int(macro.burst_count_var.get())
+            spacing_ms = float(macro.burst_spacing_var.get())
+            cooldown_ms = int(macro.burst_cooldown_var.get())
+            self.engine.set_burst(macro.key, count, spacing_ms, cooldown_ms, macro.burst_var.get())
+        except ValueError:
+            return  # valori intermedi mentre l'utente modifica i campi
+        macro.burst = macro.burst_var.get()
+        macro.burst_count, macro.burst_spacing_ms, macro.burst_cooldown_ms = count, spacing_ms, cooldown_ms
     
     def save_settings(self):
-        settings = {
-            "min_cps": self.min_cps_var.get(),
-            "max_cps": self.max_cps_var.get(),
-            "randomize": self.randomize_var.get(),
-            "left_hotkey_str": self.left_macro.hotkey_str,
-            "left_hotkey_is_mouse": self.left_macro.hotkey_is_mouse,
-            "right_enabled": self.right_macro.enabled,
-            "right_hotkey_str": self.right_macro.hotkey_str,
-            "right_hotkey_is_mouse": self.right_macro.hotkey_is_mouse,
-            "hold_enabled": self.hold_macro.enabled,
-            "hold_hotkey_str": self.hold_macro.hotkey_str,
-            "hold_hotkey_is_mouse": self.hold_macro.hotkey_is_mouse,
-            "hold_mode": self.hold_macro.mode,
-            "hold_cps": self.hold_macro.cps_var.get(),
-        }
+        settings = self.collect_settings()
         
-        config_path = os.path.join(os.path.dirname(os.path.abspath(sys.argv[0])), "settings.json")
         try:
-            with open(config_path, "w") as f:
+            with open(self.settings_path(), "w") as f:
                 json.dump(settings, f, indent=2)
         except Exception as e:
             # Qui non stampa l'errore, ma è più sicuro per un'applicazione compilata
             pass
     
-    def load_settings(self):
+    def collect_settings(self):
+        """Stato corrente nel formato di settings.json (usato anche per ricostruire la UI)"""
+        settings = {
+            "min_cps": self.min_cps_var.get(),
+            "max_cps": self.max_cps_var.get(),
+            "randomize": self.randomize_var.get(),
+            "rate_control": self.rate_control_var.get(),
+            "tick_sync": {
+                "enabled": self.tick_var.get(),
+                "rate": self.tick_rate_var.get(),
+                "per_tick": self.tick_per_tick_var.get(),
+                "offset_pct": self.tick_offset_var.get(),
+                "phase_ms": self.tick_phase_var.get(),
+            },
+            # Solo le macro aggiuntive: quelle predefinite sono sempre presenti
+            "macro_definitions": [spec.to_dict() for spec in self.macro_specs[len(DEFAULT_MACROS):]],
+            "macros": {macro.key: self.macro_settings(macro) for macro in self.macros},
+            "engine_mode": "process" if self.engine.isolated else "thread",
+            "input_backend": self.input_backend,
+            "control_socket": self.control_socket,
+            "event_log": self.event_log_dir,
+            "hotkey_debounce_ms": self.hotkey_debounce_ns // 1_000_000,
+            "watch_settings": self.watch_settings,
+        }
+        settings.update(self.engine_tuning)
+        return settings
+    
+    def macro_settings(self, macro):
+        """Impostazioni salvate di una macro (sezione "macros" di settings.json)"""
+        data = {
+            "enabled": macro.enabled,
+            "hotkey_str": macro.hotkey_str,
+            "hotkey_is_mouse": macro.hotkey_is_mouse,
+        }
+        if is_key(macro.spec.button):
+            data["output"] = macro.output
+        if macro.kind == KIND_CLICK:
+            data["distribution"] = macro.distribution
+            data["burst"] = {
+                "enabled": macro.burst,
+                "count": macro.burst_count,
+                "spacing_ms": macro.burst_spacing_ms,
+                "cooldown_ms": macro.burst_cooldown_ms,
+            }
+        else:
+            data["mode"] = macro.mode
+            data["cps"] = macro.cps_var.get()
+        return data
+    
+    @staticmethod
+    def macro_setting(settings, macro, name, default):
+        """Legge un'impostazione di macro; ricade sulle chiavi piatte delle versioni precedenti (es. "hold_mode")"""
+        return macro_setting(settings, macro.key, name, default)
+    
+    @staticmethod
+    def settings_path():
+        return os.path.join(os.path.dirname(os.path.abspath(sys.argv[0])), "settings.json")
+    
+    @staticmethod
+    def read_settings():
         # Tenta di caricare da settings.json
-        config_path = os.path.join(os.path.dirname(os.path.abspath(sys.argv[0])), "settings.json")
         try:
-            with open(config_path, "r") as f:
+            with open(VetoClicker.settings_path(), "r") as f:
                 settings = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return settings if isinstance(settings, dict) else {}
+    
+    def load_settings(self, settings):
+        try:
+            self.restore_ui(settings)
+            self.rebuild_input_index()
             
-            self.min_cps_var.set(settings.get("min_cps", "10"))
-            self.max_cps_var.set(settings.get("max_cps", "15"))
-            self.min_slider.set(int(settings.get("min_cps", 10)))
-            self.max_slider.set(int(settings.get("max_cps", 15)))
-            self.randomize_var.set(settings.get("randomize", True))
-            
-            # Left macro
-            self.left_macro.hotkey_str = settings.get("left_hotkey_str", "F6")
-            self.left_macro.hotkey_is_mouse = settings.get("left_hotkey_is_mouse", False)
-            self.left_macro.hotkey_button.configure(text=self.left_macro.hotkey_str)
-            self.restore_hotkey(self.left_macro)
-            
-            # Right macro
-            if settings.get("right_enabled", False):
-                self.right_macro.enabled_var.set(True)
-                self.toggle_macro_enabled(self.right_macro)
-            self.right_macro.hotkey_str = settings.get("right_hotkey_str", "None")
-            self.right_macro.hotkey_is_mouse = settings.get("right_hotkey_is_mouse", False)
-            self.right_macro.hotkey_button.configure(text=self.right_macro.hotkey_str)
-            self.restore_hotkey(self.right_macro)
-            
-            # Hold macro - PRIMA imposta tutte le variabili
-            self.hold_macro.hotkey_str = settings.get("hold_hotkey_str", "None")
-            self.hold_macro.hotkey_is_mouse = settings.get("hold_hotkey_is_mouse", False)
-            self.hold_macro.mode = settings.get("hold_mode", "single")
-            
-            hold_cps = settings.get("hold_cps", "5")
-            # Assicurati che il CPS non superi 5
-            try:
-                cps_val = int(hold_cps)
-                if cps_val > 5:
-                    cps_val = 5
-                hold_cps = str(cps_val)
-            except:
-                hold_cps = "5"
-            self.hold_macro.cps_var.set(hold_cps)
-            self.hold_macro.cps_slider.set(int(hold_cps))
-            
-            # POI ripristina l'hotkey
-            self.restore_hold_hotkey()
+            self.input_backend = settings.get("input_backend", "pynput")
+            self.control_socket = settings.get("control_socket")
+            self.event_log_dir = settings.get("event_log")
+            self.watch_settings = bool(settings.get("watch_settings", True))
+            self.hotkey_debounce_ns = max(0, int(settings.get("hotkey_debounce_ms", 200))) * 1_000_000
             
-            # POI configura il bottone e l'interfaccia
-            self.hold_macro.hotkey_button.configure(text=self.hold_macro.hotkey_str)
-            self.hold_macro.mode_var.set("Single Click" if self.hold_macro.mode == "single" else "Break")
-            self.on_hold_mode_change("Single Click" if self.hold_macro.mode == "single" else "Break")
+            # Tuning del thread motore (va letto prima di avviare il motore isolato)
+            for key, default in DEFAULT_TUNING.items():
+                self.engine_tuning[key] = settings.get(key, default)
             
-            # INFINE abilita la macro se era abilitata
-            if settings.get("hold_enabled", False):
-                self.hold_macro.enabled_var.set(True)
-                self.toggle_hold_enabled()
+            # Motore isolato
+            if settings.get("engine_mode", "thread") == "process":
+                self.isolated_engine_var.set(True)
+                self.set_engine_isolated(True)
         except:
             pass
     
+    def restore_ui(self, settings):
+        """Porta campi, hotkey e sezioni delle macro ai valori di settings"""
+        self.min_cps_var.set(settings.get("min_cps", "10"))
+        self.max_cps_var.set(settings.get("max_cps", "15"))
+        self.min_slider.set(int(settings.get("min_cps", 10)))
+        self.max_slider.set(int(settings.get("max_cps", 15)))
+        self.randomize_var.set(settings.get("randomize", True))
+        self.rate_control_var.set(settings.get("rate_control", False))
+        self.restore_tick_sync(settings.get("tick_sync"))
+        
+        for macro in self.macros:
+            # PRIMA hotkey e parametri, POI l'interfaccia, INFINE l'abilitazione
+            macro.hotkey_str = self.macro_setting(settings, macro, "hotkey_str", macro.spec.hotkey)
+            macro.hotkey_is_mouse = self.macro_setting(settings, macro, "hotkey_is_mouse", False)
+            self.restore_hotkey(macro)
+            macro.hotkey_button.configure(text=macro.hotkey_str)
+            output = self.macro_setting(settings, macro, "output", None)
+            if is_key(macro.spec.button) and output and output != macro.output:
+                self.set_macro_output(macro, output)
+            
+            if macro.kind == KIND_CLICK:
+                self.restore_distribution(macro, self.macro_setting(settings, macro, "distribution", "uniform"))
+                self.restore_burst(macro, self.macro_setting(settings, macro, "burst", None))
+            else:
+                self.restore_hold_timing(macro, self.macro_setting(settings, macro, "mode", "single"),
+                                         self.macro_setting(settings, macro, "cps", "5"))
+            
+            if macro.spec.optional and self.macro_setting(settings, macro, "enabled", False):
+                macro.enabled_var.set(True)
+                self.toggle_macro_enabled(macro)
+    
     def restore_hotkey(self, macro):
+        macro.hotkey = None
         if macro.hotkey_is_mouse:
             buttons = {"Mouse 4": Button.x1, "Mouse 5": Button.x2}
             macro.hotkey = buttons.get(macro.hotkey_str)
+        elif len(macro.hotkey_str) == 1:
+            # Carattere normale
+            macro.hotkey = KeyCode.from_char(macro.hotkey_str.lower())
         else:
-            if len(macro.hotkey_str) == 1:
-                try:
-                    # Carattere normale
-                    macro.hotkey = Key.from_char(macro.hotkey_str.lower())
-                except:
-                    # Fallback
-                    pass
-            else:
-                try:
-                    # Tasto speciale
-                    macro.hotkey = getattr(Key, macro.hotkey_str.lower())
-                except:
-                    # Fallback, usa F6 se non valido
-                    macro.hotkey = Key.f6
-    
-    def restore_hold_hotkey(self):
-        if self.hold_macro.hotkey_is_mouse:
-            buttons = {"Mouse 4": Button.x1, "Mouse 5": Button.x2}
-            self.hold_macro.hotkey = buttons.get(self.hold_macro.hotkey_str)
-        else:
-            if len(self.hold_macro.hotkey_str) == 1:
-                try:
-                    self.hold_macro.hotkey = Key.from_char(self.hold_macro.hotkey_str.lower())
-                except:
-                    pass
-            else:
-                try:
-                    self.hold_macro.hotkey = getattr(Key, self.hold_macro.hotkey_str.lower())
-                except:
-                    pass
+            # Tasto speciale ("None" o nomi non validi restano senza hotkey)
+            macro.hotkey = getattr(Key, macro.hotkey_str.lower(), None)
+    
+    def restore_distribution(self, macro, kind):
+        if kind in DISTRIBUTIONS:
+            macro.distribution = kind
+            macro.distribution_var.set(DISTRIBUTIONS[kind])
+    
+    def restore_tick_sync(self, tick_sync):
+        if not isinstance(tick_sync, dict):
+            return
+        self.tick_rate_var.set(str(tick_sync.get("rate", self.tick_rate_var.get())))
+        self.tick_per_tick_var.set(str(tick_sync.get("per_tick", self.tick_per_tick_var.get())))
+        self.tick_offset_var.set(str(tick_sync.get("offset_pct", self.tick_offset_var.get())))
+        self.tick_phase_var.set(str(tick_sync.get("phase_ms", self.tick_phase_var.get())))
+        self.tick_var.set(bool(tick_sync.get("enabled", self.tick_var.get())))
+    
+    def restore_burst(self, macro, burst):
+        if not isinstance(burst, dict):
+            return
+        macro.burst_count_var.set(str(burst.get("count", macro.burst_count)))
+        macro.burst_spacing_var.set(str(burst.get("spacing_ms", macro.burst_spacing_ms)))
+        macro.burst_cooldown_var.set(str(burst.get("cooldown_ms", macro.burst_cooldown_ms)))
+        macro.burst_var.set(bool(burst.get("enabled", macro.burst)))
+    
+    def restore_hold_timing(self, macro, mode, cps):
+        # Assicurati che il CPS non superi 5
+        try:
+            cps = str(max(1, min(int(cps), 5)))
+        except (TypeError, ValueError):
+            cps = "5"
+        macro.cps_var.set(cps)
+        if not self.minimal:
+            macro.cps_slider.set(int(cps))
+        label = "Break" if mode == "break" else "Single Click"
+        macro.mode_var.set(label)
+        self.on_hold_mode_change(macro, label)
     
     def on_close(self):
+        # Prima il watcher: il salvataggio qui sotto non deve tornare come ricarica
+        if self.settings_watcher:
+            self.settings_watcher.stop()
         self.save_settings()
-        # Blocca i thread di click
-        for macro in [self.left_macro, self.right_macro]:
-            macro.clicking = False
-            macro.armed = False
-        self.hold_macro.active = False
-        self.hold_macro.armed = False
+        if self.diagnostics_job is not None:
+            self.after_cancel(self.diagnostics_job)
+        # Chiude registrazione/riproduzione in corso
+        self.recorder.stop()
+        self.player.stop()
+        # Ferma il motore (rilascia eventuali tasti tenuti premuti)
+        if self.control_server:
+            self.control_server.stop()
+        self.engine.close()
         # Ferma i listener di input
         if self.keyboard_listener:
             self.keyboard_listener.stop()
@@ -1,4 +1,5 @@
 import customtkinter as ctk
+import multiprocessing
 from PIL import Image, ImageSequence
 import threading
 import time
@@ -99,6 +100,8 @@ def launch_main_app():
 
 
 if __name__ == "__main__":
+    # Necessario per il motore isolato (multiprocessing) negli eseguibili PyInstaller
+    multiprocessing.freeze_support()
 
     splash = SplashScreen()
     splash.mainloop()
\ No newline at end of file
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Veto - Test della modalità burst e delle raffiche (tempo virtuale)
+Author: MyLuxy
+"""
+from veto_engine import HOLD_BURST
+from veto_sim import Simulation
+from veto_state import CMD_ENABLE, CMD_TOGGLE, CMD_PRESS, CMD_RELEASE
+
+MS = 1_000_000
+
+
+def burst_sim(count=5, spacing_us=8000, cooldown_ms=100):
+    sim = Simulation(seed=11)
+    sim.engine.configure(0, False, "uniform", HOLD_BURST, 10, 10, count, spacing_us, cooldown_ms)
+    sim.at(0, sim.engine.submit, 0, CMD_ENABLE)
+    sim.at(0, sim.engine.submit, 0, CMD_TOGGLE)
+    return sim
+
+
+def trigger(sim, t_ns):
+    sim.at(t_ns, sim.engine.submit, 0, CMD_PRESS)
+    sim.at(t_ns + MS, sim.engine.submit, 0, CMD_RELEASE)
+
+
+def clicks(sim):
+    return [t for t, action, _ in sim.backend.events if action == "click"]
+
+
+def test_each_trigger_fires_count_clicks_at_fixed_spacing():
+    sim = burst_sim()
+    starts = [i * 500 * MS for i in range(1, 11)]
+    for t in starts:
+        trigger(sim, t)
+    sim.run(6000 * MS)
+    times = clicks(sim)
+    assert len(times) == 5 * len(starts)
+    for start, burst in zip(starts, (times[i:i + 5] for i in range(0, len(times), 5))):
+        # Deadline assolute: spaziatura esatta dal primo click della raffica
+        assert burst == [start + i * 8 * MS for i in range(5)]
+    assert not sim.backend.errors
+
+
+def test_presses_during_the_cooldown_are_ignored():
+    sim = burst_sim()
+    trigger(sim, 100 * MS)
+    # La raffica finisce a 132 ms: cooldown fino a 232 ms
+    for t in (140 * MS, 180 * MS, 225 * MS):
+        trigger(sim, t)
+    trigger(sim, 240 * MS)
+    sim.run(1000 * MS)
+    times = clicks(sim)
+    assert times == [100 * MS + i * 8 * MS for i in range(5)] + [240 * MS + i * 8 * MS for i in range(5)]
+
+
+def test_zero_spacing_fires_the_burst_in_one_instant():
+    sim = burst_sim(count=6, spacing_us=0, cooldown_ms=0)
+    trigger(sim, 50 * MS)
+    sim.run(500 * MS)
+    assert clicks(sim) == [50 * MS] * 6
+
+
+def test_engine_burst_runs_without_an_active_macro():
+    done = []
+    sim = Simulation(seed=11)
+    sim.engine.configure(0, False, "uniform", 0, 20, 20)
+    sim.at(10 * MS, sim.engine.burst, 0, 7, lambda: done.append(sim.clock.t))
+    sim.run(2000 * MS)
+    times = clicks(sim)
+    assert len(times) == 7 and times[0] == 10 * MS
+    assert all(b - a == 50 * MS for a, b in zip(times, times[1:]))
+    assert done == [times[-1]]
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Veto - Test del server di controllo (socket UNIX temporaneo, JSON-lines)
+Author: MyLuxy
+"""
+import json
+import os
+import socket
+
+import pytest
+
+from veto_api import VetoEngine
+from veto_backends import NullBackend
+from veto_control import MAX_LINE, ControlServer
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="socket UNIX non disponibili")
+
+
+@pytest.fixture
+def control(tmp_path):
+    engine = VetoEngine(NullBackend)
+    engine.start()
+    engine.enable("left")
+    profiles = []
+    server = ControlServer(engine, str(tmp_path / "veto.sock"), on_profile=profiles.append)
+    server.start()
+    yield engine, server, profiles
+    server.stop()
+    engine.close()
+
+
+class Client:
+    def __init__(self, path):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(5)
+        self.sock.connect(path)
+        self.stream = self.sock.makefile("rwb")
+
+    def send(self, line):
+        self.stream.write(line if isinstance(line, bytes) else line.encode())
+        self.stream.flush()
+        response = self.stream.readline()
+        return json.loads(response) if response else None
+
+    def call(self, **request):
+        return self.send(json.dumps(request) + "\n")
+
+    def close(self):
+        self.stream.close()
+        self.sock.close()
+
+
+def test_round_trip(control):
+    engine, server, profiles = control
+    client = Client(server.path)
+    try:
+        assert client.call(id=1, cmd="ping") == {"id": 1, "ok": True}
+        assert client.call(id=2, cmd="arm", macro="left") == {"id": 2, "ok": True, "state": "ARMED"}
+        assert client.call(cmd="toggle")["state"] == "OFF"
+        assert client.call(cmd="set_cps", macro="left", min=12, max=18)["ok"]
+        assert engine.config("left")[3:5] == (12, 18)
+        assert client.call(cmd="set_cps", min=9)["ok"]
+        assert all(engine.config(name)[3:5] == (9, 9) for name in engine.click_macros)
+        assert client.call(cmd="sync_ticks")["anchor_ns"] == engine.tick_anchor_ns
+        assert client.call(cmd="profile", name="pvp") == {"ok": True, "profile": "pvp"} and profiles == ["pvp"]
+        stats = client.call(cmd="stats")
+        assert stats["clients"] == 1 and stats["macros"]["left"]["min_cps"] == 9
+        assert client.call(cmd="disarm", macro="left")["state"] == "OFF"
+    finally:
+        client.close()
+
+
+@pytest.mark.parametrize("line, error", [
+    ("{not json\n", "JSON non valido"),
+    ("[1, 2]\n", "JSON non valido"),
+    ('{"id": 7, "cmd": "explode"}\n', "comando sconosciuto"),
+    ('{"cmd": "arm", "macro": "nope"}\n', "macro sconosciuta"),
+    ('{"cmd": "set_cps"}\n', "min"),
+    ('{"cmd": "set_cps", "min": 20, "max": 10}\n', "CPS non validi"),
+    ('{"cmd": "set_cps", "min": "fast"}\n', "invalid literal"),
+])
+def test_bad_commands_get_an_error_and_keep_the_connection(control, line, error):
+    _, server, _ = control
+    client = Client(server.path)
+    try:
+        response = client.send(line)
+        assert response["ok"] is False and error in response["error"]
+        if '"id": 7' in line:
+            assert response["id"] == 7
+        # La connessione resta utilizzabile dopo un errore
+        assert client.call(cmd="ping")["ok"]
+    finally:
+        client.close()
+
+
+def test_overlong_line_closes_only_that_client(control):
+    _, server, _ = control
+    client, other = Client(server.path), Client(server.path)
+    try:
+        assert client.send(b"x" * (MAX_LINE + 1) + b"\n") is None
+        assert other.call(cmd="ping")["ok"]
+    finally:
+        client.close()
+        other.close()
+
+
+def test_stop_removes_the_socket(tmp_path):
+    engine = VetoEngine(NullBackend)
+    path = str(tmp_path / "veto.sock")
+    (tmp_path / "veto.sock").write_text("")  # socket rimasto da un'esecuzione precedente
+    server = ControlServer(engine, path)
+    server.start()
+    client = Client(path)
+    assert client.call(cmd="ping")["ok"]
+    client.close()
+    server.stop()
+    engine.close()
+    assert not os.path.exists(path)
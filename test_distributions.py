@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Veto - Test delle distribuzioni degli intervalli
+Author: MyLuxy
+
+Le tabelle compilate devono riprodurre media e deviazione standard
+richieste (la uniforme storica le proprie); i costi sono in benchmark.py.
+"""
+import random
+import statistics
+
+import pytest
+
+from veto_distributions import DISTRIBUTIONS, MIN_INTERVAL, TABLE_BITS, compile_distribution, interval_moments
+
+SAMPLES = 200_000
+
+
+@pytest.mark.parametrize("kind", list(DISTRIBUTIONS))
+@pytest.mark.parametrize("min_cps, max_cps", [(10, 15), (5, 20)])
+def test_table_moments(kind, min_cps, max_cps):
+    table = compile_distribution(kind, min_cps, max_cps)
+    getrandbits = random.Random(1).getrandbits
+    drawn = [table.values[getrandbits(TABLE_BITS)] for _ in range(SAMPLES)]
+    # La uniforme è la distribuzione storica: i suoi momenti non derivano da interval_moments
+    want_mean, want_std = (table.mean, table.std) if kind == "uniform" else interval_moments(min_cps, max_cps)
+    assert statistics.fmean(drawn) == pytest.approx(want_mean, rel=0.01)
+    assert statistics.pstdev(drawn) == pytest.approx(want_std, rel=0.03)
+
+
+@pytest.mark.parametrize("kind", list(DISTRIBUTIONS))
+def test_table_bounds(kind):
+    values = compile_distribution(kind, 10, 15).values
+    assert len(values) == 1 << TABLE_BITS
+    assert min(values) >= MIN_INTERVAL
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Veto - Test del motore di click (ClickEngine senza thread, pompato a mano)
+Author: MyLuxy
+"""
+import sys
+import threading
+
+import veto_engine
+import veto_process_engine
+from veto_backends import NullBackend
+from veto_distributions import compile_distribution
+from veto_process_engine import RING_SIZE, SLOT, SLOTS_OFFSET, TABLE, ControlBlock
+from veto_state import KIND_CLICK, OFF, CLICKING, CMD_ENABLE, CMD_ARM, CMD_PRESS
+
+
+def test_configure_compiles_on_the_caller(monkeypatch):
+    engine = veto_engine.ClickEngine(NullBackend)
+    engine.add_macro(0, KIND_CLICK, "left")
+    engine.configure(0, True, "butterfly", 0, 13, 17)
+    # Sul thread motore (pump) la tabella arriva già compilata con il comando
+    monkeypatch.setattr(veto_engine, "compile_distribution", None)
+    engine.pump()
+    assert engine.runtimes[0].table is compile_distribution("butterfly", 13, 17, True)
+
+
+class FailingBackend(NullBackend):
+    """Backend che fallisce a ogni click (es. display chiuso)"""
+    def click(self, button):
+        raise OSError("display chiuso")
+
+
+def test_backend_errors_reset_macros_and_back_off():
+    transitions = []
+    waits = []
+    engine = veto_engine.ClickEngine(FailingBackend, on_transition=lambda slot, t: transitions.append((slot, t.new)))
+    engine.add_macro(0, KIND_CLICK, "left")
+    engine.add_macro(1, KIND_CLICK, "right")
+    for command in (CMD_ENABLE, CMD_ARM, CMD_PRESS):
+        engine.submit(0, command)
+    engine.submit(1, CMD_ENABLE)
+
+    def waiter(deadline, wakeup):
+        waits.append(None if deadline is None else deadline - engine.clock())
+        if len(waits) == 4:
+            engine._running = False
+        elif engine.machines[0].state == OFF:
+            # L'utente riattiva la macro: il backend fallisce di nuovo
+            for command in (CMD_ARM, CMD_PRESS):
+                engine.submit(0, command)
+
+    engine.waiter = waiter
+    engine._running = True
+    engine._run()
+    # Ogni errore riporta la macro a OFF con una transizione normale; la macro ferma non cambia
+    assert transitions.count((0, CLICKING)) == 4
+    assert transitions[-1] == (0, OFF) and transitions.count((0, OFF)) == 4
+    assert all(slot == 0 for slot, _ in transitions)
+    assert not engine.scheduler.active
+    # Attesa crescente tra un errore e il successivo
+    assert all(wait > 0 for wait in waits)
+    assert waits == sorted(waits) and waits[-1] >= 4 * veto_engine.ERROR_BACKOFF_NS
+
+
+def test_control_block_ships_compiled_tables():
+    block = ControlBlock(2)
+    try:
+        table = compile_distribution("gaussian", 10, 15, True)
+        timing = (10, 15, 5, 8000, 0, 0, 0, 1, 50, 0)
+        block.write_slot(1, 1, 1, 1, 1, 1, 0, *timing, table=table)
+        _, tables = block.snapshot([0, 0])
+        assert list(tables) == [1]
+        gen, mean, std, values = tables[1]
+        assert (mean, std, tuple(values)) == (table.mean, table.std, table.values)
+        # Stessa tabella riscritta: nessuna nuova versione da copiare
+        block.write_slot(1, 1, 1, 0, 1, 1, 0, *timing, table=table)
+        assert block.snapshot([0, gen])[1] == {}
+    finally:
+        block.close(unlink=True)
+
+
+def test_snapshot_never_mixes_two_writes():
+    # Switch frequenti: il lettore cade spesso a metà di una write_slot
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    block = ControlBlock(1)
+    tables = {cps: compile_distribution("uniform", cps, cps + 5, True) for cps in (10, 20)}
+    stop = threading.Event()
+
+    def writer():
+        while not stop.is_set():
+            for cps, table in tables.items():
+                block.write_slot(0, 1, 1, 1, 1, 0, 0, cps, cps + 5, 5, 8000, 0, 0, 0, 1, 50, 0, table=table)
+
+    thread = threading.Thread(target=writer)
+    try:
+        block.write_slot(0, 1, 1, 1, 1, 0, 0, 10, 15, 5, 8000, 0, 0, 0, 1, 50, 0, table=tables[10])
+        thread.start()
+        for _ in range(1000):
+            slots, snapshot_tables = block.snapshot([0])
+            min_cps = SLOT.unpack(slots[0])[6]
+            # Configurazione e tabella della stessa scrittura
+            assert snapshot_tables[0][1] == tables[min_cps].mean
+    finally:
+        stop.set()
+        thread.join()
+        sys.setswitchinterval(interval)
+        block.close(unlink=True)
+
+
+def test_snapshot_waits_for_a_write_in_progress():
+    block = ControlBlock(1)
+    table = compile_distribution("uniform", 20, 25, True)
+    result = []
+    try:
+        # Scrittura a metà: slot nuovo, tabella e versione non ancora scritte
+        seq = block._begin()
+        SLOT.pack_into(block.buf, SLOTS_OFFSET, 1, 1, 1, 1, 0, 0, 20, 25, 5, 8000, 0, 0, 0, 1, 50, 0)
+        reader = threading.Thread(target=lambda: result.append(block.snapshot([0])))
+        reader.start()
+        reader.join(0.05)
+        assert reader.is_alive() and not result
+        TABLE.pack_into(block.buf, block.tables_offset, table.mean, table.std, *table.values)
+        block.gens.pack_into(block.buf, block.gens_offset, 1)
+        block._end(seq)
+        reader.join(1.0)
+        (slots, tables), = result
+        assert SLOT.unpack(slots[0])[6] == 20 and tables[0][:2] == (1, table.mean)
+    finally:
+        block.close(unlink=True)
+
+
+def test_click_ring_wraps():
+    block = ControlBlock(2)
+    try:
+        for i in range(RING_SIZE + 10):
+            block.record_click(i % 2, 1000 + i)
+        assert block.clicks() == ((RING_SIZE + 10) // 2, (RING_SIZE + 10) // 2)
+        # Cursore rimasto indietro di più di un giro: restano solo gli ultimi RING_SIZE click
+        head, clicks = block.clicks_since(0)
+        assert head == RING_SIZE + 10 and len(clicks) == RING_SIZE
+        assert clicks[0] == (1010, 0) and clicks[-1] == (1000 + RING_SIZE + 9, 1)
+        assert block.recent_clicks() == [t for t, _ in clicks]
+        head, clicks = block.clicks_since(RING_SIZE + 5)
+        assert clicks == [(1000 + i, i % 2) for i in range(RING_SIZE + 5, RING_SIZE + 10)]
+        assert block.clicks_since(head) == (head, [])
+    finally:
+        block.close(unlink=True)
+
+
+def test_engine_loop_reconfigures_only_changed_slots(monkeypatch):
+    configured = []
+
+    class Scheduler(veto_engine.Scheduler):
+        def configure(self, runtime, config, table=None):
+            configured.append(runtime.slot)
+            super().configure(runtime, config, table)
+
+    block = ControlBlock(3)
+    timing = (12, 14, 5, 8000, 0, 0, 0, 1, 50, 0)
+    # Un'azione della GUI per ogni giro del loop, poi lo stop
+    actions = [lambda: block.set_running_slot(1, True)] * 5 + [
+        lambda: None,  # campanello senza modifiche
+        lambda: block.write_slot(2, 1, 1, 0, 1, 0, 0, *timing),
+        lambda: block.set_running(False),
+    ]
+    monkeypatch.setattr(veto_process_engine, "Scheduler", Scheduler)
+    monkeypatch.setattr(veto_process_engine, "wait_until", lambda deadline, doorbell: actions.pop(0)())
+    block.set_running(True)
+    try:
+        veto_process_engine.run_engine(block, threading.Event(), [NullBackend()] * 3, ("left", "right", "middle"))
+    finally:
+        block.close(unlink=True)
+    # add() configura i tre slot, il primo giro li riconfigura tutti; poi solo lo slot che cambia
+    # (il running ripetuto non cambia i byte)
+    assert configured == [0, 1, 2] + [0, 1, 2] + [1, 2]
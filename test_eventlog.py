@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Veto - Test del log eventi binario (ring, rotazione dei file e lettura)
+Author: MyLuxy
+"""
+import os
+
+import pytest
+
+from veto_eventlog import (
+    HEADER, MAGIC, RECORD, VERSION, EV_CLICK, EV_PRESS, EV_TRIGGER_DOWN, NO_SLOT, EventLog, LogRing, read_log
+)
+
+
+def log_files(directory):
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory))
+
+
+def test_read_log_round_trip(tmp_path):
+    log = EventLog(str(tmp_path))
+    engine, listener = log.ring("engine"), log.ring("input")
+    engine.append(EV_CLICK, 0, "left", 1_000)
+    engine.append(EV_PRESS, 2, "middle", 3_000)
+    listener.append(EV_TRIGGER_DOWN, NO_SLOT, "x1", 2_000)
+    log.flush()
+    log._file.close()
+    (path,) = log_files(tmp_path)
+    events = list(read_log(path))
+    # Record di ring diversi tornano in ordine di tempo
+    assert [(e["t_ns"], e["event"], e["slot"], e["button"]) for e in events] == [
+        (1_000, "click", 0, "left"), (2_000, "trigger_down", None, "x1"), (3_000, "press", 2, "middle"),
+    ]
+    assert events[2]["wall_ns"] - events[0]["wall_ns"] == 2_000
+    assert log.written == 3 and log.dropped == 0
+
+
+def test_read_log_rejects_other_files(tmp_path):
+    short = tmp_path / "short.vlog"
+    short.write_bytes(MAGIC)
+    assert list(read_log(str(short))) == []
+    other = tmp_path / "other.vlog"
+    other.write_bytes(HEADER.pack(b"OTHERLOG", VERSION, RECORD.size, 0, 0, 0))
+    with pytest.raises(ValueError):
+        list(read_log(str(other)))
+
+
+def test_rotation_keeps_the_newest_files(tmp_path, monkeypatch):
+    # Filesystem con mtime grossolano: tutti i file sembrano scritti nello stesso istante
+    monkeypatch.setattr(os.path, "getmtime", lambda path: 0.0)
+    stale = tmp_path / "clicks-20000101-000000-1.vlog"  # da un'esecuzione precedente
+    stale.write_bytes(HEADER.pack(MAGIC, VERSION, RECORD.size, 0, 0, 0))
+    log = EventLog(str(tmp_path), max_bytes=HEADER.size + 10 * RECORD.size, max_files=3)
+    ring = log.ring("engine")
+    for i in range(50):
+        ring.append(EV_CLICK, 0, "left", i)
+        if i % 10 == 9:
+            log.flush()  # un file pieno per flush
+    log._file.close()
+    files = log_files(tmp_path)
+    assert len(files) == 3 and str(stale) not in files
+    assert [e["t_ns"] for f in files for e in read_log(f)] == list(range(20, 50))
+    assert log.written == 50
+
+
+def test_ring_overflow_counts_dropped_records():
+    ring = LogRing(capacity=8)
+    for i in range(20):
+        ring.append(EV_CLICK, 0, "left", i)
+    data = ring.take()
+    assert [record[0] for record in RECORD.iter_unpack(data)] == list(range(12, 20))
+    assert ring.dropped == 12 and ring.take() == b""
+
+
+def test_flusher_thread_writes_everything_on_stop(tmp_path):
+    log = EventLog(str(tmp_path), flush_interval=0.01)
+    ring = log.ring("engine")
+    log.start()
+    for i in range(1000):
+        ring.append(EV_CLICK, 1, "right", i)
+    log.stop()
+    (path,) = log_files(tmp_path)
+    assert len(list(read_log(path))) == 1000 == log.written
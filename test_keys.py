@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Veto - Test delle macro da tastiera: combinazioni, filtro dell'eco e temporizzazione
+Author: MyLuxy
+"""
+import pytest
+
+import veto_backends
+from veto_backends import InjectedKeys, key_button, key_id, parse_key_combo
+from veto_distributions import compile_distribution
+from veto_macros import DEFAULT_MACROS, MacroSpec, build_registry
+from veto_sim import Simulation
+from veto_state import KIND_CLICK, KIND_HOLD, CMD_ENABLE, CMD_TOGGLE, CMD_PRESS
+
+MS = 1_000_000
+
+
+class KeyCode:
+    """Come pynput.keyboard.KeyCode: confronto per carattere"""
+    def __init__(self, char):
+        self.char = char
+
+
+def test_parse_key_combo():
+    assert parse_key_combo("key:Ctrl + E") == ("ctrl", "e")
+    assert parse_key_combo("key:space") == ("space",)
+    assert parse_key_combo("key:f12+shift") == ("f12", "shift")
+    assert key_button(parse_key_combo("key:Ctrl + E")) == "key:ctrl+e"
+
+
+@pytest.mark.parametrize("button", [
+    "left", "key:", "key:ctrl++", "key:ctrl+ctrl", "key:a+b+c+d+e", "key:foo", "key:ab", "key: ",
+])
+def test_invalid_key_combos_are_rejected(button):
+    with pytest.raises(ValueError):
+        parse_key_combo(button)
+
+
+def test_injected_echo_is_consumed_once_per_key_and_direction():
+    injected = InjectedKeys()
+    injected.add(KeyCode("e"), True)
+    # Un tasto fisico diverso, o la direzione opposta, non è l'eco
+    assert not injected.consume(KeyCode("f"), True)
+    assert not injected.consume(KeyCode("e"), False)
+    assert injected.consume(KeyCode("E"), True)
+    assert not injected.consume(KeyCode("e"), True)
+    assert key_id(KeyCode("E")) == key_id(KeyCode("e"))
+
+
+def test_injected_echo_expires(monkeypatch):
+    clock = [0]
+    monkeypatch.setattr(veto_backends, "now_ns", lambda: clock[0])
+    injected = InjectedKeys(window_ns=50 * MS)
+    injected.add("e", True)
+    injected.add("e", True)
+    clock[0] = 40 * MS
+    assert injected.consume("e", True)
+    # La seconda eco non è mai arrivata: scaduta, il tasto fisico passa
+    clock[0] = 60 * MS
+    assert not injected.consume("e", True)
+    assert not injected.pending[("e", True)]
+
+
+def test_key_macros_share_click_timing_and_switch_output():
+    seconds = 120
+    sim = Simulation(seed=5, slots=((KIND_HOLD, "key:ctrl+e"), (KIND_CLICK, "left")))
+    for slot, commands in ((0, (CMD_ENABLE, CMD_TOGGLE)), (1, (CMD_ENABLE, CMD_TOGGLE, CMD_PRESS))):
+        for command in commands:
+            sim.at(0, sim.engine.submit, slot, command)
+    switch_at = seconds * 10**9 // 2
+    sim.at(switch_at, sim.engine.set_button, 0, "key:f")
+    sim.run(seconds * 10**9)
+    events = sim.backend.events
+    assert all(t < switch_at for t, _, button in events if button == "key:ctrl+e")
+    assert all(t >= switch_at for t, _, button in events if button == "key:f")
+    table = compile_distribution("uniform", 10, 15, True)
+    low, high = min(table.values) - 1e-9, max(table.values) + 1e-9
+    for button in ("key:ctrl+e", "key:f"):
+        times = [t for t, _, b in events if b == button]
+        assert len(times) > 100
+        assert all(low <= (b - a) / 1e9 <= high for a, b in zip(times, times[1:]))
+    assert not sim.backend.errors
+
+
+def test_registry_normalizes_key_outputs():
+    specs = build_registry([
+        {"key": "spam", "kind": "hold", "button": "key:Ctrl + E"},
+        {"key": "bad", "kind": "hold", "button": "key:ctrl++"},
+        {"key": "untriggered", "kind": "click", "button": "key:e"},
+        {"key": "spam2", "kind": "click", "button": "key:space", "trigger": "x2"},
+        # Le macro hold partono solo dalla hotkey: un trigger verrebbe ignorato in silenzio
+        {"key": "held", "kind": "hold", "button": "key:e", "trigger": "x1"},
+    ])
+    extra = specs[len(DEFAULT_MACROS):]
+    assert [(spec.key, spec.button) for spec in extra] == [("spam", "key:ctrl+e"), ("spam2", "key:space")]
+
+
+def test_hold_macros_reject_a_trigger_and_round_trip():
+    with pytest.raises(ValueError):
+        MacroSpec("held", kind=KIND_HOLD, button="key:e", trigger="x1")
+    spec = MacroSpec("held", kind=KIND_HOLD, button="key:e", hotkey="F9")
+    # to_dict scrive "trigger": None, che si ricarica senza errori
+    (reloaded,) = build_registry([spec.to_dict()])[len(DEFAULT_MACROS):]
+    assert (reloaded.kind, reloaded.button, reloaded.trigger) == (KIND_HOLD, "key:e", None)
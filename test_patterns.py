@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Veto - Test dei pattern scriptati (compilazione ed esecuzione su tempo virtuale)
+Author: MyLuxy
+"""
+import pytest
+
+from veto_patterns import OP_CLICK, OP_PRESS, OP_RELEASE, OP_REPEAT, OP_WAIT, compile_pattern, parse_duration
+from veto_sim import Simulation
+from veto_state import CMD_ENABLE, CMD_TOGGLE, CMD_PRESS, CMD_RELEASE
+
+PATTERN = "3 clicks at 12 cps, hold 250 ms, release, wait 80-120 ms, repeat"
+MS = 1_000_000
+
+
+def test_compiled_ops():
+    click = (OP_CLICK, round(1e9 / 12), round(1e9 / 12))
+    assert compile_pattern(PATTERN) == (
+        click * 3 + (OP_PRESS, 250 * MS, 250 * MS, OP_RELEASE, 0, 0, OP_WAIT, 80 * MS, 120 * MS, OP_REPEAT, 0, 0))
+    assert compile_pattern("Click at 10-20 CPS; wait 0.5 s\nrepeat 2 times") == (
+        OP_CLICK, 50 * MS, 100 * MS, OP_WAIT, 500 * MS, 500 * MS, OP_REPEAT, 2, 2)
+    # Un pulsante lasciato premuto viene rilasciato a fine pattern e prima di ogni giro
+    assert compile_pattern("press") == (OP_PRESS, 0, 0, OP_RELEASE, 0, 0)
+    assert compile_pattern("hold 1 s, repeat")[-6:] == (OP_RELEASE, 0, 0, OP_REPEAT, 0, 0)
+
+
+@pytest.mark.parametrize("text", [
+    "", " , ;", "jump", "release", "hold, hold", "hold, click", "0 clicks", "1001 clicks",
+    "click at 0 cps", "click at 20-10 cps", "click at 2000 cps", "wait", "wait 5", "wait 120-80 ms",
+    "wait 61 s", "repeat, click", "click, repeat", "click, wait 1 ms, repeat 0 times",
+])
+def test_invalid_patterns_are_rejected(text):
+    with pytest.raises(ValueError):
+        compile_pattern(text)
+
+
+def test_parse_duration():
+    assert parse_duration("250 ms") == (250 * MS, 250 * MS)
+    assert parse_duration("0.5 s") == (500 * MS, 500 * MS)
+    assert parse_duration("80-120ms") == (80 * MS, 120 * MS)
+
+
+def run_pattern(seconds, release_at=None):
+    sim = Simulation(seed=3)
+    sim.engine.set_pattern(0, compile_pattern(PATTERN))
+    for command in (CMD_ENABLE, CMD_TOGGLE, CMD_PRESS):
+        sim.at(0, sim.engine.submit, 0, command)
+    if release_at is not None:
+        sim.at(release_at, sim.engine.submit, 0, CMD_RELEASE)
+    sim.run(int(seconds * 1e9))
+    return sim
+
+
+def test_pattern_timing_under_simulation():
+    sim = run_pattern(60)
+    events = sim.backend.events
+    # Un giro: click, click, click, press, release (poi l'attesa casuale)
+    cycles = [events[i:i + 5] for i in range(0, len(events) - 4, 5)]
+    assert len(cycles) > 10 and not sim.backend.errors
+    assert all([action for _, action, _ in cycle] == ["click", "click", "click", "press", "release"]
+               for cycle in cycles)
+    assert all(abs(cycle[i + 1][0] - cycle[i][0] - round(1e9 / 12)) <= 1 for cycle in cycles for i in range(3))
+    assert all(cycle[4][0] - cycle[3][0] == 250 * MS for cycle in cycles)
+    assert all(80 * MS <= b[0][0] - a[4][0] <= 120 * MS for a, b in zip(cycles, cycles[1:]))
+
+
+def test_trigger_release_interrupts_the_pattern():
+    release_at = 3 * round(1e9 / 12) + 100 * MS  # dentro l'hold del primo giro
+    sim = run_pattern(2, release_at)
+    # Il release del pulsante arriva nello stesso istante virtuale e non segue altro
+    assert sim.backend.events[-1] == (release_at, "release", "left")
+    assert [action for _, action, _ in sim.backend.events] == ["click", "click", "click", "press", "release"]
+    assert not sim.backend.errors
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Veto - Test di registratore e riproduttore (riproduzione sul motore simulato)
+Author: MyLuxy
+"""
+import veto_recorder
+from veto_recorder import (
+    HEADER, MAGIC, RECORD, VERSION, EV_BUTTON_DOWN, EV_BUTTON_UP, EV_KEY_DOWN, EV_MOVE, EV_SCROLL,
+    MacroPlayer, MacroRecorder, count_records
+)
+from veto_sim import Simulation
+
+MS = 1_000_000
+
+
+def write_recording(path, records):
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, RECORD.size, 0))
+        for record in records:
+            f.write(RECORD.pack(*record))
+
+
+def test_playback_runs_on_the_engine_at_absolute_deadlines(tmp_path):
+    path = tmp_path / "rec.vrec"
+    write_recording(path, [(0, EV_MOVE, 10, 20, 0), (1 * MS, EV_BUTTON_DOWN, 11, 21, 1),
+                           (2 * MS, EV_SCROLL, 0, -1, 0), (5 * MS, EV_BUTTON_UP, 12, 22, 1)])
+    finished = []
+    sim = Simulation()
+    player = MacroPlayer(str(path), sim.engine, on_finish=lambda: finished.append(sim.clock.t))
+    sim.at(1000 * MS, player.start)
+    sim.run(2000 * MS)
+    t0 = 1000 * MS
+    assert sim.backend.events == [
+        (t0, "move", (10, 20)),
+        (t0 + 1 * MS, "move", (11, 21)), (t0 + 1 * MS, "press", "left"),
+        (t0 + 2 * MS, "scroll", (0, -1)),
+        (t0 + 5 * MS, "move", (12, 22)), (t0 + 5 * MS, "release", "left"),
+    ]
+    assert finished == [t0 + 5 * MS] and not player.playing
+    assert sim.engine.playback is None and sim.backend.errors == 0
+
+
+def test_stop_releases_held_inputs_in_reverse_order(tmp_path, monkeypatch):
+    monkeypatch.setattr(veto_recorder, "decode_key", lambda code: f"key{code}")
+    path = tmp_path / "rec.vrec"
+    write_recording(path, [(0, EV_BUTTON_DOWN, 1, 1, 2), (1 * MS, EV_KEY_DOWN, 0, 0, 65),
+                           (10_000 * MS, EV_BUTTON_UP, 1, 1, 2)])
+    sim = Simulation()
+    player = MacroPlayer(str(path), sim.engine)
+    sim.at(0, player.start)
+    sim.at(5 * MS, player.stop)
+    sim.run(20_000 * MS)
+    assert [event[1:] for event in sim.backend.events] == [
+        ("move", (1, 1)), ("press", "right"), ("press", "key65"), ("release", "key65"), ("release", "right"),
+    ]
+    # Nessun evento dopo stop(): i rilasci avvengono all'istante dell'arresto
+    assert sim.backend.events[-1][0] == 5 * MS
+    assert not player.playing and sim.backend.errors == 0
+
+
+def test_recorder_rewrites_files_shorter_than_the_header(tmp_path):
+    path = tmp_path / "rec.vrec"
+    path.write_bytes(b"\x00" * (HEADER.size - 3))
+    recorder = MacroRecorder(str(path))
+    recorder.start()
+    recorder.on_move(3, 4)
+    recorder.stop()
+    data = path.read_bytes()
+    assert HEADER.unpack_from(data)[:3] == (MAGIC, VERSION, RECORD.size)
+    assert count_records(str(path)) == 1
+    assert RECORD.unpack_from(data, HEADER.size)[1:4] == (EV_MOVE, 3, 4)
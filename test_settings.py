@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Veto - Test della validazione di settings.json prima della ricarica
+Author: MyLuxy
+"""
+import json
+import threading
+import time
+
+import pytest
+
+from veto_settings import SettingsWatcher, changed_parts, validate_settings
+
+
+@pytest.mark.parametrize("settings", [
+    {"left_hotkey_str": 5},
+    {"right_hotkey_is_mouse": "yes"},
+    {"hold_distribution": None},
+    {"macros": {"left": {"hotkey_str": ["F6"]}}},
+    {"macros": {"left": {"distribution": {}}}},
+    {"macros": {"left": {"enabled": "false"}}},
+    {"tick_sync": []},
+    {"tick_sync": {"enabled": "no"}},
+    {"tick_sync": {"rate": "fast"}},
+    {"tick_sync": {"rate": 5000}},
+    {"tick_sync": {"per_tick": 0}},
+    {"tick_sync": {"offset_pct": 100}},
+    {"tick_sync": {"phase_ms": "nan"}},
+    {"macros": {"left": {"burst": True}}},
+    {"macros": {"left": {"burst": {"enabled": 1}}}},
+    {"macros": {"left": {"burst": {"count": 0}}}},
+    {"macros": {"left": {"burst": {"spacing_ms": -1}}}},
+    {"macros": {"left": {"burst": {"cooldown_ms": 70000}}}},
+    {"macros": {"hold": {"mode": "double"}}},
+    {"macros": {"hold": {"cps": "0"}}},
+    {"macros": {"hold": {"cps": None}}},
+    {"hold_mode": 1},
+    {"hold_cps": "veloce"},
+])
+def test_rejects_wrong_macro_field_types(settings):
+    with pytest.raises(ValueError):
+        validate_settings(settings)
+
+
+def test_accepts_legacy_and_sectioned_hotkeys():
+    validate_settings({
+        "left_hotkey_str": "F6", "left_hotkey_is_mouse": False, "right_hotkey_str": "None",
+        "macros": {"hold": {"hotkey_str": "Mouse 4", "hotkey_is_mouse": True, "distribution": "gaussian"}},
+    })
+
+
+def test_accepts_values_saved_by_the_gui():
+    # Le StringVar salvano i numeri come stringhe
+    validate_settings({
+        "min_cps": "8", "max_cps": "12", "engine_mode": "process",
+        "tick_sync": {"enabled": False, "rate": "20", "per_tick": "1", "offset_pct": "50", "phase_ms": "-3.5"},
+        "macros": {
+            "left": {"enabled": True, "distribution": "uniform",
+                     "burst": {"enabled": True, "count": 5, "spacing_ms": 8.0, "cooldown_ms": 0}},
+            "hold": {"enabled": False, "mode": "break", "cps": "5"},
+        },
+        "hold_mode": "single", "hold_cps": 3,
+    })
+
+
+def test_polling_watcher_reports_only_changed_parts(tmp_path):
+    path = tmp_path / "settings.json"
+    baseline = {"min_cps": 8, "max_cps": 12, "macros": {"left": {"hotkey_str": "F6", "enabled": True}}}
+    path.write_text(json.dumps(baseline))
+    reloads = []
+    reloaded = threading.Event()
+
+    def on_reload(settings, parts, detected_ns):
+        reloads.append((settings, parts))
+        reloaded.set()
+
+    watcher = SettingsWatcher(str(path), on_reload, ["left"], baseline=baseline,
+                              poll_interval=0.005, settle=0, use_inotify=False)
+    watcher.start()
+    try:
+        assert watcher.mode == "polling"
+
+        def write(settings, timeout=2):
+            reloaded.clear()
+            path.write_text(json.dumps(settings, indent=1))
+            return reloaded.wait(timeout)
+
+        assert write(dict(baseline, max_cps=15))
+        assert reloads[-1][1] == {"timing"}
+        assert write(dict(baseline, max_cps=15, macros={"left": {"hotkey_str": "F7", "enabled": False}}))
+        assert reloads[-1][1] == {"hotkeys", "enabled"}
+        # Un valore non valido non arriva alla GUI e non sostituisce la baseline
+        write(dict(baseline, tick_sync={"enabled": "no"}), timeout=0)
+        deadline = time.monotonic() + 2
+        while not watcher.errors and time.monotonic() < deadline:
+            time.sleep(0.005)
+        assert watcher.errors == 1 and not reloaded.is_set()
+        assert watcher.baseline["macros"]["left"]["hotkey_str"] == "F7"
+    finally:
+        watcher.stop()
+    assert watcher.reloads == 2 == len(reloads)
+
+
+def test_changed_parts_reads_legacy_flat_keys():
+    parts, restart = changed_parts({"hold_mode": "single"}, {"macros": {"hold": {"mode": "break"}},
+                                                             "engine_mode": "process"}, ["hold"])
+    assert parts == {"timing"} and restart == ["engine_mode"]
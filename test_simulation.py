@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Veto - Test del motore su tempo virtuale
+Author: MyLuxy
+
+Un'ora di click e di churn simulati in pochi secondi: deriva, momenti
+degli intervalli, click duplicati e determinismo a parità di seed.
+"""
+import statistics
+
+import pytest
+
+from veto_distributions import compile_distribution
+from veto_sim import SimBackend, Simulation, churn_session, duplicate_clicks
+from veto_state import CMD_ENABLE, CMD_TOGGLE, CMD_PRESS
+
+HOUR_S = 3600
+SEED = 7
+# Impronta della sessione di churn di un'ora con SEED: cambia solo se cambia il comportamento del motore
+CHURN_DIGEST = "09f671a3bf38"
+
+
+@pytest.fixture(scope="module")
+def churn():
+    return churn_session(SEED, HOUR_S)
+
+
+def test_long_run_drift_and_moments():
+    sim = Simulation(SEED)
+    sim.engine.configure(0, True, "uniform", 0, 10, 15)
+    for command in (CMD_ENABLE, CMD_TOGGLE, CMD_PRESS):
+        sim.engine.submit(0, command)
+    sim.run(HOUR_S * 10**9)
+    clicks = [t for t, _, _ in sim.backend.events]
+    intervals = [(b - a) / 1e9 for a, b in zip(clicks, clicks[1:])]
+    table = compile_distribution("uniform", 10, 15)
+    assert len(clicks) == pytest.approx(HOUR_S / table.mean + 1, rel=0.005)
+    assert statistics.fmean(intervals) == pytest.approx(table.mean, rel=0.005)
+    assert statistics.pstdev(intervals) == pytest.approx(table.std, rel=0.03)
+
+
+class StallingBackend(SimBackend):
+    """Backend che ogni secondo resta bloccato 300 ms dopo un click (GC, X server lento)"""
+    STALL_NS, PERIOD_NS = 300_000_000, 1_000_000_000
+
+    def __init__(self, clock):
+        super().__init__(clock)
+        self.next_stall = self.PERIOD_NS
+        self.stalled = set()  # istanti dei click seguiti da un blocco
+
+    def click(self, button):
+        super().click(button)
+        if self.clock.t >= self.next_stall:
+            self.stalled.add(self.clock.t)
+            self.clock.advance(self.clock.t + self.STALL_NS)
+            self.next_stall = self.clock.t + self.PERIOD_NS
+
+
+def test_rate_control_keeps_the_distribution_shape():
+    sim = Simulation(SEED, backend=StallingBackend)
+    sim.engine.configure(0, True, "uniform", 0, 10, 15, rate_control=True)
+    for command in (CMD_ENABLE, CMD_TOGGLE, CMD_PRESS):
+        sim.engine.submit(0, command)
+    sim.run(600 * 10**9)
+    clicks = [t for t, _, _ in sim.backend.events]
+    table = compile_distribution("uniform", 10, 15)
+    low, high = min(table.values), max(table.values)
+    # Il controllo recupera i blocchi accorciando gli intervalli
+    assert sim.engine.runtimes[0].rate_scale < 0.95
+    assert (len(clicks) - 1) / ((clicks[-1] - clicks[0]) / 1e9) == pytest.approx(1 / table.mean, rel=0.005)
+    # Intervalli a regime, esclusi il blocco e il click di recupero che lo segue
+    steady = clicks[len(clicks) // 4:]
+    intervals = [(b - a) / 1e9 for before, a, b in zip(steady, steady[1:], steady[2:])
+                 if before not in sim.backend.stalled and a not in sim.backend.stalled]
+    assert all(low - 1e-9 <= x <= high + 1e-9 for x in intervals)
+    # Niente massa accumulata sui limiti della tabella (con un clamp sarebbe ~7% al minimo)
+    for edge in (low, high):
+        assert sum(abs(x - edge) < 1e-6 for x in intervals) / len(intervals) < 0.002
+
+
+def test_churn_has_no_duplicate_clicks(churn):
+    sim, starts, stray = churn
+    assert duplicate_clicks(sim, starts, stray) == 0
+    assert sim.backend.errors == 0
+
+
+def test_churn_is_deterministic(churn):
+    sim, _, _ = churn
+    assert sim.backend.digest()[:12] == CHURN_DIGEST
+    replay = [churn_session(seed, HOUR_S / 4)[0].backend.digest() for seed in (SEED, SEED, SEED + 1)]
+    assert replay[0] == replay[1]
+    assert replay[0] != replay[2]
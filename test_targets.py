@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Veto - Test delle liste di bersagli (move + click in una chiamata al backend)
+Author: MyLuxy
+"""
+import pytest
+
+from veto_backends import NullBackend
+from veto_engine import DEFAULT_CONFIG, HOLD_BURST, Scheduler
+from veto_macros import parse_target, target_regions
+from veto_patterns import compile_pattern
+
+SECOND = 1_000_000_000
+
+
+class CountingBackend(NullBackend):
+    """NullBackend che conta le chiamate e registra i punti cliccati"""
+    def __init__(self, display=None):
+        super().__init__(display)
+        self.calls = {}
+        self.points = []
+
+    def _count(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def click(self, button):
+        self._count("click")
+        super().click(button)
+
+    def click_batch(self, button, count):
+        self._count("click_batch")
+        super().click_batch(button, count)
+
+    def click_at(self, button, x, y):
+        self._count("click_at")
+        self.points.append((x, y))
+        super().click_at(button, x, y)
+
+    def move(self, x, y):
+        self._count("move")
+        super().move(x, y)
+
+
+def running_scheduler(regions):
+    backend = CountingBackend()
+    scheduler = Scheduler(backend)
+    runtime = scheduler.add(0, "left")
+    scheduler.set_targets(runtime, regions)
+    return scheduler, runtime, backend
+
+
+def test_each_target_is_one_click_at_call_in_turn():
+    regions = [(i * 20, 300, 8, 8) for i in range(5)]
+    scheduler, runtime, backend = running_scheduler(regions)
+    scheduler.set_running(runtime, True)
+    for i in range(12):
+        scheduler.step(i * SECOND)
+    # Move + click in una sola chiamata: nessun click separato, nessun movimento a parte
+    assert backend.calls == {"click_at": 12}
+    for i, (x, y) in enumerate(backend.points):
+        rx, ry, w, h = regions[i % len(regions)]
+        assert rx <= x < rx + w and ry <= y < ry + h
+    assert runtime.clicks == 12
+
+
+def test_batched_burst_visits_targets_without_click_batch():
+    scheduler, runtime, backend = running_scheduler([(0, 0, 1, 1), (10, 10, 1, 1)])
+    # Modalità burst a spaziatura 0: la raffica parte in un solo step
+    config = list(DEFAULT_CONFIG)
+    config[2], config[5], config[6] = HOLD_BURST, 5, 0
+    scheduler.configure(runtime, tuple(config))
+    scheduler.set_running(runtime, True)
+    scheduler.step(0)
+    assert backend.calls == {"click_at": 5}
+    assert backend.points == [(0, 0), (10, 10), (0, 0), (10, 10), (0, 0)]
+
+
+def test_pattern_clicks_use_targets():
+    scheduler, runtime, backend = running_scheduler([(5, 6, 1, 1), (7, 8, 1, 1)])
+    scheduler.set_pattern(runtime, compile_pattern("3 clicks at 10 cps"))
+    scheduler.set_running(runtime, True)
+    for i in range(5):
+        scheduler.step(i * SECOND)
+    assert backend.calls == {"click_at": 3}
+    assert backend.points == [(5, 6), (7, 8), (5, 6)]
+
+
+def test_empty_targets_click_at_the_cursor():
+    scheduler, runtime, backend = running_scheduler([])
+    scheduler.set_running(runtime, True)
+    scheduler.step(0)
+    assert backend.calls == {"click": 1}
+
+
+def test_target_regions():
+    assert parse_target([3, 4]) == (3, 4, 1, 1)
+    assert parse_target(["3", 4, 10, 20]) == (3, 4, 10, 20)
+    assert target_regions([[10, 10], [0, 0, 4, 4]], jitter=2) == [(8, 8, 5, 5), (-2, -2, 8, 8)]
+    for bad in ([1], [1, 2, 3], [1, 2, 0, 5], ["x", 1]):
+        with pytest.raises(ValueError):
+            parse_target(bad)
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Veto - Test della fase dei tick rispetto all'ancora di sync_ticks
+Author: MyLuxy
+"""
+from veto_api import VetoEngine
+from veto_backends import NullBackend
+
+
+def tick_phase_us(engine, macro="left"):
+    return engine.config(macro)[9]
+
+
+def test_phase_is_relative_to_sync_anchor():
+    engine = VetoEngine(NullBackend)
+    engine.set_ticks(20, phase_ms=3.0)
+    engine.sync_ticks(at_ns=1_000_012_345_678)
+    # 1_000_012_345_678 ns = 20000 periodi da 50 ms + 12.345678 ms, più 3 ms di fase
+    assert tick_phase_us(engine) == 15_345
+
+
+def test_sync_moves_only_tick_aligned_macros():
+    engine = VetoEngine(NullBackend)
+    engine.set_ticks(20, phase_ms=0.0, macro="left")
+    engine.sync_ticks(at_ns=7_000_000)
+    assert tick_phase_us(engine, "left") == 7_000
+    assert tick_phase_us(engine, "right") == 0
+    engine.set_ticks(0, macro="left")
+    engine.sync_ticks(at_ns=9_000_000)
+    assert tick_phase_us(engine, "left") == 0
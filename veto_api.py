@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+Veto - API incorporabile del motore di click (asyncio)
+Author: MyLuxy
+
+Permette di pilotare le macro senza creare la finestra VetoClicker:
+
+    async with VetoEngine() as engine:
+        engine.set_cps(12, 16)
+        await engine.arm("left")
+        await engine.burst(20)
+        async for event in engine.events():
+            print(event)
+
+La temporizzazione resta sul thread motore (ClickEngine); gli eventi
+arrivano al loop asyncio tramite code limitate (i più vecchi vengono
+scartati se il consumatore resta indietro). La GUI è un client come gli altri.
+"""
+import asyncio
+
+from veto_backends import BUTTON_NAMES, PynputBackend, is_key, key_button, parse_key_combo
+from veto_diagnostics import ClickRing, DeliveryProbe
+from veto_distributions import DISTRIBUTIONS
+from veto_engine import ClickEngine, HOLD_SINGLE, HOLD_BREAK, HOLD_BURST
+from veto_eventlog import EventLog
+from veto_macros import DEFAULT_MACROS, target_regions
+from veto_patterns import compile_pattern
+from veto_process_engine import EngineHost
+from veto_state import (
+    KIND_CLICK, CMD_ENABLE, CMD_DISABLE, CMD_ARM, CMD_DISARM, CMD_TOGGLE,
+    CMD_PRESS, CMD_RELEASE
+)
+from veto_timing import now_ns
+
+HOLD_MODES = {"single": HOLD_SINGLE, "break": HOLD_BREAK}
+
+EVENT_TRANSITION = "transition"
+EVENT_CLICK = "click"
+EVENT_CONFIG = "config"
+
+EVENT_QUEUE_SIZE = 1024
+
+
+class EngineEvent:
+    """Evento del motore: transizione di stato o click iniettato"""
+    __slots__ = ("kind", "macro", "state", "t_ns", "transition")
+
+    def __init__(self, kind, macro, state, t_ns, transition=None):
+        self.kind = kind
+        self.macro = macro
+        self.state = state
+        self.t_ns = t_ns
+        self.transition = transition
+
+    def __repr__(self):
+        return f"EngineEvent({self.kind!r}, {self.macro!r}, {self.state!r}, t_ns={self.t_ns})"
+
+
+def _resolve(future, result):
+    if not future.done():
+        future.set_result(result)
+
+
+class VetoEngine:
+    """Motore di Veto con API asyncio; i metodi non async sono thread-safe.
+
+    macros è il registro delle macro (veto_macros): ogni voce riceve uno slot
+    dello scheduler condiviso, nell'ordine del registro.
+    """
+    def __init__(self, backend_factory=PynputBackend, tuning=None, macros=DEFAULT_MACROS):
+        self.tuning = tuning
+        self.backend_factory = backend_factory
+        self.specs = {spec.key: spec for spec in macros}
+        self._engine = ClickEngine(backend_factory, tuning, on_transition=self._on_transition,
+                                   on_click=self._on_click)
+        self.machines = {}
+        self.slots = {}
+        self._names = {}
+        self._config = {}
+        for slot, spec in enumerate(self.specs.values()):
+            self.machines[spec.key] = self._engine.add_macro(slot, spec.kind, spec.button, display=spec.display)
+            if spec.targets:
+                self._engine.set_targets(slot, spec.regions())
+            if spec.ops:
+                self._engine.set_pattern(slot, spec.ops)
+            self.slots[spec.key] = slot
+            self._names[slot] = spec.key
+            if spec.kind == KIND_CLICK:
+                self._config[spec.key] = [True, "uniform", HOLD_SINGLE, 10, 15, 5, 8000, 0, 0, 0, 1, 50, False]
+            else:
+                self._config[spec.key] = [False, "uniform", HOLD_SINGLE, 5, 5, 5, 8000, 0, 0, 0, 1, 50, False]
+        self.click_macros = tuple(key for key, spec in self.specs.items() if spec.kind == KIND_CLICK)
+        self._listeners = []
+        self._subscribers = []
+        self.host = None
+        self._host_cursor = 0
+        self.dropped_events = 0
+        # Timestamp recenti dei click per slot (diagnostica); scritto dal thread motore
+        self.timings = ClickRing(len(self.slots))
+        self.event_log = None
+        # Latenza iniezione -> listener per backend (measure_delivery), esportata da stats()
+        self.delivery = {}
+        # Confine di tick indicato dall'utente (sync_ticks); la fase di set_ticks è relativa a questo
+        self.tick_anchor_ns = 0
+        self._tick_phase_ms = {}
+
+    # --- Ciclo di vita ---
+    def start(self):
+        for name in self._config:
+            self._push(name)
+        self._engine.start()
+
+    def close(self):
+        self._engine.stop()
+        self.stop_event_log()
+        if self.host:
+            self.host.stop()
+            self.host = None
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+    # --- Stato ---
+    def state(self, macro):
+        return self.machines[macro].state
+
+    @property
+    def injected_keys(self):
+        """InjectedKeys del display predefinito: il listener delle hotkey ne scarta l'eco"""
+        return self._engine.injected_keys
+
+    @property
+    def injecting(self):
+        """True mentre il motore (locale o isolato) sta iniettando input"""
+        return self._engine.injecting or (self.host is not None and self.host.injecting)
+
+    @property
+    def isolated(self):
+        return self.host is not None
+
+    def config(self, macro):
+        """Configurazione corrente della macro, nell'ordine di veto_engine.DEFAULT_CONFIG"""
+        return tuple(self._config[macro])
+
+    def read_clicks(self, macro, cursor=0):
+        """(nuovo cursore, timestamp dei click di `macro` successivi a cursor)"""
+        host = self.host
+        if host is not None:
+            # Motore isolato: i click arrivano dal ring del blocco condiviso
+            self._host_cursor, entries = host.block.clicks_since(self._host_cursor)
+            for t_ns, slot in entries:
+                self.timings.record(slot, t_ns)
+        return self.timings.read(self.slots[macro], cursor)
+
+    def latency_stats(self, macro):
+        return self._engine.latency_stats(self.slots[macro])
+
+    def stats(self):
+        """Stato, configurazione e click eseguiti per ogni macro"""
+        host_clicks = self.host.block.clicks() if self.host else None
+        macros = {}
+        for name, slot in self.slots.items():
+            machine = self.machines[name]
+            randomize, distribution, mode, min_cps, max_cps = self._config[name][:5]
+            clicks = self._engine.runtimes[slot].clicks
+            if host_clicks:
+                clicks += host_clicks[slot]
+            macros[name] = {
+                "state": machine.state, "enabled": machine.enabled, "clicks": clicks,
+                "min_cps": min_cps, "max_cps": max_cps, "distribution": distribution,
+                "burst": mode == HOLD_BURST, "rate_control": self._config[name][12],
+            }
+        return {"macros": macros, "isolated": self.isolated, "dropped_events": self.dropped_events,
+                "delivery": self.delivery}
+
+    # --- Comandi non bloccanti (qualsiasi thread) ---
+    def post(self, macro, command):
+        """Accoda un comando senza attendere che il motore lo applichi"""
+        self._engine.submit(self.slots[macro], command)
+
+    def enable(self, macro, enabled=True):
+        self.post(macro, CMD_ENABLE if enabled else CMD_DISABLE)
+
+    # --- Comandi async: ritornano lo stato dopo l'applicazione ---
+    async def _command(self, macro, command):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._engine.submit(self.slots[macro], command,
+                            lambda transition: loop.call_soon_threadsafe(_resolve, future, transition))
+        await future
+        return self.machines[macro].state
+
+    async def arm(self, macro):
+        return await self._command(macro, CMD_ARM)
+
+    async def disarm(self, macro):
+        return await self._command(macro, CMD_DISARM)
+
+    async def toggle(self, macro):
+        return await self._command(macro, CMD_TOGGLE)
+
+    async def press(self, macro):
+        return await self._command(macro, CMD_PRESS)
+
+    async def release(self, macro):
+        return await self._command(macro, CMD_RELEASE)
+
+    async def burst(self, count, macro="left"):
+        """Esegue `count` click con la temporizzazione della macro e attende la fine"""
+        if self.host is not None:
+            raise RuntimeError("Le raffiche non sono disponibili con il motore isolato")
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._engine.burst(self.slots[macro], int(count),
+                           lambda: loop.call_soon_threadsafe(_resolve, future, None))
+        await future
+
+    # --- Configurazione ---
+    def _push(self, macro):
+        self._engine.configure(self.slots[macro], *self._config[macro])
+
+    def configure(self, macro, randomize=None, distribution=None, mode=None, min_cps=None, max_cps=None,
+                  burst_count=None, burst_spacing_us=None, burst_cooldown_ms=None,
+                  tick_rate=None, tick_phase_us=None, tick_per_tick=None, tick_offset_pct=None,
+                  rate_control=None):
+        """Aggiorna solo i parametri passati (None = invariato)"""
+        if distribution is not None and distribution not in DISTRIBUTIONS:
+            raise ValueError(f"Distribuzione sconosciuta: {distribution}")
+        changes = (randomize, distribution, mode, min_cps, max_cps, burst_count, burst_spacing_us, burst_cooldown_ms,
+                   tick_rate, tick_phase_us, tick_per_tick, tick_offset_pct, rate_control)
+        config = [old if new is None else new for old, new in zip(self._config[macro], changes)]
+        if config[3] < 1 or config[4] < config[3]:
+            raise ValueError(f"CPS non validi: {config[3]}-{config[4]}")
+        if not (1 <= config[5] <= 0xFFFF and 0 <= config[6] <= 0xFFFFFFFF and 0 <= config[7] <= 0xFFFF):
+            raise ValueError(f"Raffica non valida: {config[5]} click, {config[6]} µs, cooldown {config[7]} ms")
+        if not (0 <= config[8] <= 1000 and 0 <= config[9] <= 0xFFFFFFFF and 1 <= config[10] <= 255
+                and 0 <= config[11] <= 99):
+            raise ValueError(f"Tick non validi: {config[8]} TPS, {config[10]} click per tick, offset {config[11]}%")
+        if config == self._config[macro]:
+            return
+        self._config[macro] = config
+        self._push(macro)
+        self._emit(EngineEvent(EVENT_CONFIG, macro, self.machines[macro].state, now_ns()))
+
+    def set_cps(self, min_cps, max_cps=None, macro=None):
+        """Imposta i CPS di una macro (tutte le macro di click se macro è None)"""
+        max_cps = min_cps if max_cps is None else max_cps
+        for name in (macro,) if macro else self.click_macros:
+            self.configure(name, min_cps=int(min_cps), max_cps=int(max_cps))
+
+    def set_randomize(self, randomize, macro=None):
+        for name in (macro,) if macro else self.click_macros:
+            self.configure(name, randomize=bool(randomize))
+
+    def set_distribution(self, macro, distribution):
+        self.configure(macro, distribution=distribution)
+
+    def set_hold(self, mode="single", cps=5, macro="hold"):
+        self.configure(macro, randomize=False, mode=HOLD_MODES[mode], min_cps=int(cps), max_cps=int(cps))
+
+    def set_burst(self, macro, count=5, spacing_ms=8.0, cooldown_ms=0, enabled=True):
+        """Modalità burst: `count` click distanziati di spacing_ms a ogni attivazione.
+
+        spacing_ms = 0 inietta la raffica in una sola chiamata al backend.
+        """
+        self.configure(macro, mode=HOLD_BURST if enabled else HOLD_SINGLE, burst_count=int(count),
+                       burst_spacing_us=round(spacing_ms * 1000), burst_cooldown_ms=int(cooldown_ms))
+
+    def set_ticks(self, rate=20, phase_ms=0.0, per_tick=1, offset_pct=50, macro=None):
+        """Allinea i click ai tick del gioco (rate = tick al secondo, 0 = disattivato).
+
+        phase_ms è la distanza di un confine di tick dall'ultimo sync_ticks (la
+        correzione fine di un sync fatto a occhio); offset_pct è la posizione
+        del primo click nel tick. Si applica a tutte le macro se macro è None.
+        """
+        rate = int(rate)
+        for name in (macro,) if macro else self.machines:
+            self._tick_phase_ms[name] = phase_ms
+            self.configure(name, tick_rate=rate, tick_phase_us=self._tick_phase_us(rate, phase_ms),
+                           tick_per_tick=int(per_tick), tick_offset_pct=int(offset_pct))
+
+    def sync_ticks(self, at_ns=None):
+        """Prende at_ns (default: adesso) come confine di tick, es. alla pressione di un pulsante o hotkey.
+
+        Finché non viene chiamata la fase parte dall'epoca arbitraria di now_ns.
+        Restituisce l'ancora.
+        """
+        self.tick_anchor_ns = now_ns() if at_ns is None else int(at_ns)
+        for name, phase_ms in self._tick_phase_ms.items():
+            rate = self._config[name][8]
+            if rate:
+                self.configure(name, tick_phase_us=self._tick_phase_us(rate, phase_ms))
+        return self.tick_anchor_ns
+
+    def _tick_phase_us(self, rate, phase_ms):
+        if rate <= 0:
+            return 0
+        # In ns sul periodo del motore: un modulo in µs sbaglierebbe di più a ogni periodo dall'ancora
+        return (self.tick_anchor_ns + round(phase_ms * 1_000_000)) % (1_000_000_000 // rate) // 1000
+
+    def set_rate_control(self, enabled=True, macro=None):
+        """Controllo del rate ad anello chiuso (tutte le macro di click se macro è None).
+
+        Gli intervalli vengono corretti in base ai CPS ottenuti, così la media
+        resta quella impostata anche con il sistema carico.
+        """
+        for name in (macro,) if macro else self.click_macros:
+            self.configure(name, rate_control=bool(enabled))
+
+    def set_targets(self, macro, targets, jitter=0):
+        """Clicca a turno i punti [x, y] o le regioni [x, y, w, h] (lista vuota = posizione del cursore).
+
+        jitter sposta ogni click a caso di al massimo tanti pixel per asse.
+        """
+        self._engine.set_targets(self.slots[macro], target_regions(targets, jitter))
+
+    def set_pattern(self, macro, pattern):
+        """Sostituisce i click della macro con un pattern scriptato (veto_patterns); None = click normali.
+
+        Il testo viene validato subito (ValueError se non è valido); il pattern
+        gira mentre la macro è attiva e si interrompe al rilascio o al disarmo.
+        """
+        self._engine.set_pattern(self.slots[macro], compile_pattern(pattern) if pattern else ())
+
+    def set_output(self, macro, button):
+        """Cambia il tasto ("key:e", "key:ctrl+e") ripetuto da una macro da tastiera.
+
+        Le macro del mouse restano sul mouse e viceversa (ValueError), così il
+        motore isolato, che conosce solo i pulsanti del registro, resta coerente.
+        """
+        if is_key(button) != is_key(self.specs[macro].button):
+            raise ValueError(f"{macro}: uscita {button!r} non compatibile con {self.specs[macro].button!r}")
+        if is_key(button):
+            button = key_button(parse_key_combo(button))
+        elif button not in BUTTON_NAMES:
+            raise ValueError(f"Pulsante sconosciuto: {button}")
+        self._engine.set_button(self.slots[macro], button)
+        return button
+
+    # --- Diagnostica ---
+    def measure_delivery(self, attach, listener="pynput", display=None, **options):
+        """Latenza iniezione -> consegna del backend di un display (bloccante: va chiamata da un thread a parte).
+
+        attach(probe) deve inoltrare i click del listener a probe.on_click e
+        attach(None) lo stacca alla fine. Il backend è un'istanza nuova dello
+        stesso tipo di quello del motore, con una connessione propria, così
+        la misura non condivide il display con il thread motore. options va
+        a DeliveryProbe (button, origin, probes, match_position...). Il
+        risultato resta in stats()["delivery"] sotto "<backend>/<listener>".
+        """
+        backend = self.backend_factory() if display is None else self.backend_factory(display)
+        probe = DeliveryProbe(backend, **options)
+        attach(probe)
+        try:
+            result = probe.run()
+        finally:
+            attach(None)
+        name = f"{type(backend).__name__}{'@' + display if display else ''}/{listener}"
+        self.delivery = {**self.delivery, name: result}
+        return result
+
+    def play(self, player, on_done=None):
+        """Riproduce una registrazione (veto_recorder.MacroPlayer) sul thread motore"""
+        self._engine.play(player, on_done)
+
+    def stop_playback(self):
+        self._engine.stop_playback()
+
+    # --- Eventi ---
+    def add_listener(self, callback):
+        """callback(event) chiamata dal thread motore: deve essere rapida"""
+        self._listeners.append(callback)
+
+    def _emit(self, event):
+        for callback in self._listeners:
+            callback(event)
+        for loop, queue in self._subscribers:
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, event)
+            except RuntimeError:
+                pass  # loop già chiuso
+
+    def _offer(self, queue, event):
+        """Inserisce nella coda limitata scartando l'evento più vecchio se è piena"""
+        if queue.full():
+            queue.get_nowait()
+            self.dropped_events += 1
+        queue.put_nowait(event)
+
+    def _on_transition(self, slot, transition):
+        name = self._names[slot]
+        self._emit(EngineEvent(EVENT_TRANSITION, name, transition.new, transition.applied_ns, transition))
+
+    def _on_click(self, slot, t_ns):
+        self.timings.record(slot, t_ns)
+        if self._subscribers or self._listeners:
+            name = self._names[slot]
+            self._emit(EngineEvent(EVENT_CLICK, name, self.machines[name].state, t_ns))
+
+    async def events(self, maxsize=EVENT_QUEUE_SIZE):
+        """Iteratore asincrono sugli eventi del motore (coda limitata a maxsize)"""
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(maxsize))
+        self._subscribers = self._subscribers + [subscriber]
+        try:
+            while True:
+                yield await subscriber[1].get()
+        finally:
+            self._subscribers = [s for s in self._subscribers if s is not subscriber]
+
+    # --- Log eventi ---
+    def start_event_log(self, directory, **options):
+        """Registra click, press e release sintetici in file .vlog a rotazione (veto_eventlog).
+
+        Altri produttori (es. il listener dei trigger fisici) usano
+        event_log.ring(nome). Con il motore isolato i click li inietta il
+        processo host e non vengono registrati.
+        """
+        self.stop_event_log()
+        log = EventLog(directory, **options)
+        self._engine.scheduler.log = log.ring("engine")
+        log.start()
+        self.event_log = log
+        return log
+
+    def stop_event_log(self):
+        if self.event_log is None:
+            return
+        self._engine.scheduler.log = None
+        self.event_log.stop()
+        self.event_log = None
+
+    # --- Motore isolato ---
+    def set_isolated(self, isolated):
+        """Sposta l'iniezione dei click in un processo separato (o la riporta nel thread motore)"""
+        if isolated == (self.host is not None):
+            return
+        # Disarma tutto prima di cambiare motore
+        for name in self.machines:
+            self.post(name, CMD_DISARM)
+        if isolated:
+            buttons = [spec.button for spec in self.specs.values()]
+            displays = [spec.display for spec in self.specs.values()]
+            host = EngineHost("process", self.backend_factory, self.tuning, buttons, displays)
+            host.start()
+            self._host_cursor = 0
+            self.host = host
+            self._engine.set_host(host)
+        else:
+            # Il motore deve smettere di scrivere nel blocco prima di chiuderlo
+            self._engine.set_host(None).wait(1.0)
+            self.host.stop()
+            self.host = None
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Veto - Backend di iniezione dell'input
+Author: MyLuxy
+
+I pulsanti sono identificati per nome ("left", "right", "middle", "x1", "x2")
+così i backend si possono creare anche in un altro processo.
+
+click_at(button, x, y) sposta il cursore e clicca con una sola operazione
+del sistema dove possibile (XTest con un solo sync su Xorg, un solo
+SendInput su Windows), invece di position + click separati.
+
+Con display (es. ":1") il backend inietta su un altro server X con una
+connessione propria: un solo processo serve così più client di gioco.
+
+Le uscite da tastiera si scrivono "key:<tasto>" o "key:<tasto>+<tasto>"
+("key:e", "key:space", "key:ctrl+e"): keyboard() restituisce il backend
+da tastiera dello stesso display, che preme i tasti della combinazione in
+ordine e li rilascia in ordine inverso.
+
+move, scroll e press_key/release_key (tasti di pynput già decodificati)
+servono alla riproduzione delle registrazioni, che passa dal motore.
+"""
+import ctypes
+import enum
+import sys
+from collections import deque
+
+from veto_timing import now_ns
+
+BUTTON_NAMES = ("left", "right", "middle", "x1", "x2")
+
+KEY_PREFIX = "key:"
+MAX_COMBO_KEYS = 4
+# Tasti speciali (nomi di pynput.keyboard.Key); gli altri tasti sono singoli caratteri
+KEY_NAMES = frozenset((
+    "alt", "alt_l", "alt_r", "alt_gr", "backspace", "caps_lock", "cmd", "cmd_l", "cmd_r", "ctrl", "ctrl_l",
+    "ctrl_r", "delete", "down", "end", "enter", "esc", "home", "left", "page_down", "page_up", "right",
+    "shift", "shift_l", "shift_r", "space", "tab", "up", "insert", "menu", "num_lock", "pause",
+    "print_screen", "scroll_lock", "media_play_pause", "media_volume_mute", "media_volume_down",
+    "media_volume_up", "media_previous", "media_next",
+) + tuple(f"f{i}" for i in range(1, 21)))
+
+# Finestra entro cui il listener deve ricevere l'eco di un tasto iniettato
+INJECTED_ECHO_NS = 250 * 1_000_000
+
+
+def is_key(button):
+    """True per le uscite da tastiera ("key:...")"""
+    return button.startswith(KEY_PREFIX)
+
+
+def parse_key_combo(button):
+    """"key:ctrl+e" -> ("ctrl", "e") (ValueError se la combinazione non è valida)"""
+    names = tuple(name.strip().lower() for name in button[len(KEY_PREFIX):].split("+")) if is_key(button) else ()
+    if (not names or len(names) > MAX_COMBO_KEYS or len(set(names)) != len(names)
+            or not all(name in KEY_NAMES or (len(name) == 1 and name not in "+ ") for name in names)):
+        raise ValueError(f"Tasto non valido: {button!r}")
+    return names
+
+
+def key_button(names):
+    """("ctrl", "e") -> "key:ctrl+e" (forma normalizzata dei pulsanti da tastiera)"""
+    return KEY_PREFIX + "+".join(names)
+
+
+def key_id(key):
+    """Chiave di confronto per tasti e pulsanti di pynput: KeyCode confronta per carattere, non per hash"""
+    char = getattr(key, "char", None)
+    if char:
+        return char.lower()
+    vk = getattr(key, "vk", None)
+    if vk is not None and not isinstance(key, enum.Enum):
+        return ("vk", vk)
+    return key
+
+
+class InjectedKeys:
+    """Tasti iniettati in attesa della loro eco nel listener (filtro per tasto, non un flag globale).
+
+    Su Xorg gli eventi XTest arrivano al listener come quelli fisici: il
+    backend da tastiera registra ogni press/release prima di iniettarlo e il
+    listener scarta la prima eco corrispondente, quindi un tasto fisico premuto
+    nello stesso istante non va perso. Le voci senza eco (altro display,
+    listener evdev) scadono dopo window_ns.
+    """
+    def __init__(self, window_ns=INJECTED_ECHO_NS):
+        self.window_ns = window_ns
+        self.pending = {}  # (key_id, premuto) -> scadenze; scrive il motore, consuma il listener
+
+    def add(self, key, pressed):
+        ident = (key_id(key), pressed)
+        queue = self.pending.get(ident)
+        if queue is None:
+            queue = self.pending.setdefault(ident, deque(maxlen=64))
+        queue.append(now_ns() + self.window_ns)
+
+    def consume(self, key, pressed):
+        """True se l'evento è l'eco di un tasto iniettato (chiamato solo dal thread listener)"""
+        queue = self.pending.get((key_id(key), pressed))
+        if not queue:
+            return False
+        now = now_ns()
+        while queue:
+            if queue.popleft() >= now:
+                return True
+        return False
+
+
+def _xorg_click_at(controller, buttons):
+    """Motion + press + release XTest con un solo sync del display"""
+    import Xlib.X
+    from Xlib.ext.xtest import fake_input
+    from pynput._util.xorg import display_manager
+    display = controller._display
+    codes = {name: button.value for name, button in buttons.items()}
+
+    def click_at(button, x, y):
+        code = codes[button]
+        with display_manager(display) as dm:
+            fake_input(dm, Xlib.X.MotionNotify, x=x, y=y)
+            fake_input(dm, Xlib.X.ButtonPress, code)
+            fake_input(dm, Xlib.X.ButtonRelease, code)
+    return click_at
+
+
+def _win32_click_at(buttons):
+    """Movimento assoluto + press + release in un'unica chiamata a SendInput"""
+    from pynput._util.win32 import INPUT, INPUT_union, MOUSEINPUT, SendInput
+    metrics = ctypes.windll.user32.GetSystemMetrics
+    # Desktop virtuale (tutti i monitor): origine e dimensioni
+    left, top, width, height = metrics(76), metrics(77), metrics(78), metrics(79)
+    move = MOUSEINPUT.MOVE | MOUSEINPUT.ABSOLUTE | 0x4000  # MOUSEEVENTF_VIRTUALDESK
+    flags = {name: button.value for name, button in buttons.items()}
+    events = (INPUT * 3)()
+    for event in events:
+        event.type = INPUT.MOUSE
+
+    def click_at(button, x, y):
+        up, down, data = flags[button]
+        events[0].value = INPUT_union(mi=MOUSEINPUT(
+            dx=(x - left) * 65535 // max(1, width - 1), dy=(y - top) * 65535 // max(1, height - 1), dwFlags=move))
+        events[1].value = INPUT_union(mi=MOUSEINPUT(dwFlags=down, mouseData=data))
+        events[2].value = INPUT_union(mi=MOUSEINPUT(dwFlags=up, mouseData=data))
+        SendInput(3, ctypes.byref(events), ctypes.sizeof(INPUT))
+    return click_at
+
+
+def _bind_display(controller, display):
+    """Lega un controller Xorg di pynput (usa solo _display) a un altro server X"""
+    if display is None:
+        return
+    if not hasattr(controller, "_display"):
+        raise OSError(f"Display {display}: disponibile solo con Xorg")
+    import Xlib.display
+    controller._display.close()
+    controller._display = Xlib.display.Display(display)
+
+
+def display_backends(backend_factory, displays):
+    """Un backend per slot; gli slot dello stesso display condividono l'istanza (None = predefinito)"""
+    backends = {}
+    for display in displays:
+        if display not in backends:
+            backends[display] = backend_factory() if display is None else backend_factory(display)
+    return [backends[display] for display in displays]
+
+
+class PynputBackend:
+    """Iniezione tramite pynput (backend predefinito, multipiattaforma)"""
+    def __init__(self, display=None):
+        from pynput.mouse import Button, Controller as MouseController
+        self.controller = MouseController()
+        self.display = display
+        self._buttons = {name: getattr(Button, name) for name in BUTTON_NAMES}
+        self._keyboard = None
+        _bind_display(self.controller, display)
+        if hasattr(self.controller, "_display"):
+            self.click_at = _xorg_click_at(self.controller, self._buttons)
+        elif sys.platform == "win32":
+            self.click_at = _win32_click_at(self._buttons)
+
+    def click(self, button):
+        self.controller.click(self._buttons[button])
+
+    def click_batch(self, button, count):
+        """`count` click consecutivi in una sola chiamata (raffiche senza spaziatura)"""
+        self.controller.click(self._buttons[button], count)
+
+    def click_at(self, button, x, y):
+        """Sposta il cursore e clicca (ripiego: due operazioni di pynput)"""
+        self.controller.position = (x, y)
+        self.controller.click(self._buttons[button])
+
+    def press(self, button):
+        self.controller.press(self._buttons[button])
+
+    def release(self, button):
+        self.controller.release(self._buttons[button])
+
+    def move(self, x, y):
+        self.controller.position = (x, y)
+
+    def scroll(self, dx, dy):
+        self.controller.scroll(dx, dy)
+
+    def keyboard(self, injected=None):
+        """Backend da tastiera dello stesso display (creato alla prima macro "key:...")"""
+        if self._keyboard is None:
+            self._keyboard = PynputKeyboardBackend(self.display, injected)
+        return self._keyboard
+
+
+class PynputKeyboardBackend:
+    """Tasti e combinazioni tramite pynput; stessi metodi del backend del mouse.
+
+    injected (InjectedKeys) riceve ogni press/release prima dell'iniezione,
+    così il listener delle hotkey può scartarne l'eco.
+    """
+    def __init__(self, display=None, injected=None):
+        from pynput.keyboard import Controller as KeyboardController
+        self.controller = KeyboardController()
+        self.display = display
+        self.injected = injected
+        self._combos = {}
+        _bind_display(self.controller, display)
+
+    def keys(self, button):
+        """"key:ctrl+e" -> tasti di pynput (risolti una volta sola per combinazione)"""
+        keys = self._combos.get(button)
+        if keys is None:
+            from pynput.keyboard import Key, KeyCode
+            keys = []
+            for name in parse_key_combo(button):
+                key = KeyCode.from_char(name) if len(name) == 1 else getattr(Key, name, None)
+                if key is None:
+                    # Tasto che pynput non ha su questa piattaforma (es. insert su macOS)
+                    raise ValueError(f"Tasto non disponibile: {name!r}")
+                keys.append(key)
+            keys = self._combos[button] = tuple(keys)
+        return keys
+
+    def click(self, button):
+        self.press(button)
+        self.release(button)
+
+    def click_batch(self, button, count):
+        for _ in range(count):
+            self.click(button)
+
+    def press(self, button):
+        for key in self.keys(button):
+            self.press_key(key)
+
+    def release(self, button):
+        for key in reversed(self.keys(button)):
+            self.release_key(key)
+
+    def press_key(self, key):
+        if self.injected is not None:
+            self.injected.add(key, True)
+        self.controller.press(key)
+
+    def release_key(self, key):
+        if self.injected is not None:
+            self.injected.add(key, False)
+        self.controller.release(key)
+
+
+class NullBackend:
+    """Non inietta nulla: registra solo gli istanti (benchmark e simulazioni)"""
+    def __init__(self, display=None, maxlen=100_000):
+        self.display = display
+        self.events = deque(maxlen=maxlen)
+        self.position = (0, 0)
+
+    def click(self, button):
+        self.events.append((now_ns(), "click", button))
+
+    def click_batch(self, button, count):
+        t = now_ns()
+        self.events.extend((t, "click", button) for _ in range(count))
+
+    def click_at(self, button, x, y):
+        self.position = (x, y)
+        self.events.append((now_ns(), "click", button))
+
+    def press(self, button):
+        self.events.append((now_ns(), "press", button))
+
+    def release(self, button):
+        self.events.append((now_ns(), "release", button))
+
+    def move(self, x, y):
+        self.position = (x, y)
+        self.events.append((now_ns(), "move", (x, y)))
+
+    def scroll(self, dx, dy):
+        self.events.append((now_ns(), "scroll", (dx, dy)))
+
+    def press_key(self, key):
+        self.events.append((now_ns(), "press", key))
+
+    def release_key(self, key):
+        self.events.append((now_ns(), "release", key))
+
+    def keyboard(self, injected=None):
+        # Registra anche i tasti: stessi eventi, pulsante "key:..."
+        return self
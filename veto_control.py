@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Veto - Server di controllo su socket UNIX (JSON-lines)
+Author: MyLuxy
+
+Script esterni (stream deck, overlay) pilotano le macro senza simulare
+hotkey. Una richiesta per riga, una risposta per riga:
+
+    {"id": 1, "cmd": "arm", "macro": "left"}
+    {"id": 1, "ok": true, "state": "ARMED"}
+
+Comandi: arm, disarm, toggle, set_cps, sync_ticks, profile, stats, ping. I client sono
+serviti da un loop asyncio su un thread dedicato; i comandi passano per la
+stessa coda del motore usata dalle hotkey della GUI.
+"""
+import asyncio
+import json
+import os
+import threading
+
+MAX_LINE = 64 * 1024
+
+
+class ControlServer:
+    """Server JSON-lines per VetoEngine; on_profile(name) gestisce il cambio profilo"""
+    def __init__(self, engine, path, on_profile=None):
+        self.engine = engine
+        self.path = path
+        self.on_profile = on_profile
+        self.clients = 0
+        self._writers = set()
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._error = None
+
+    # --- Ciclo di vita ---
+    def start(self):
+        """Avvia il thread del server; solleva l'errore se il socket non è disponibile"""
+        self._thread = threading.Thread(target=self._run, name="VetoControlServer", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error:
+            raise self._error
+
+    def stop(self):
+        if self._loop is not None and self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join(1.0)
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._server = self._loop.run_until_complete(self._listen())
+        except (OSError, AttributeError, NotImplementedError) as e:
+            # AttributeError: start_unix_server non esiste su Windows
+            self._error = e if isinstance(e, OSError) else OSError(f"socket UNIX non supportati: {e}")
+            self._ready.set()
+            self._loop.close()
+            return
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            # Chiudere i trasporti fa terminare i client con EOF invece di cancellarli
+            self._server.close()
+            for writer in list(self._writers):
+                writer.close()
+            tasks = asyncio.all_tasks(self._loop)
+            if tasks:
+                self._loop.run_until_complete(asyncio.wait(tasks, timeout=1.0))
+            self._loop.close()
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+    async def _listen(self):
+        # Un socket rimasto da un'esecuzione precedente impedirebbe il bind
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        server = await asyncio.start_unix_server(self._client, self.path, limit=MAX_LINE)
+        os.chmod(self.path, 0o600)
+        return server
+
+    # --- Client ---
+    async def _client(self, reader, writer):
+        self.clients += 1
+        self._writers.add(writer)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):
+                    break  # riga troppo lunga o client disconnesso
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                response = await self._dispatch(line)
+                writer.write(json.dumps(response, separators=(",", ":")).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.clients -= 1
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _dispatch(self, line):
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("la richiesta deve essere un oggetto JSON")
+        except ValueError as e:
+            return {"ok": False, "error": f"JSON non valido: {e}"}
+        response = {"id": request["id"]} if "id" in request else {}
+        handler = getattr(self, f"_cmd_{request.get('cmd')}", None)
+        if handler is None:
+            response.update(ok=False, error=f"comando sconosciuto: {request.get('cmd')}")
+            return response
+        try:
+            response.update(await handler(request))
+            response["ok"] = True
+        except (KeyError, TypeError, ValueError, OSError) as e:
+            response.update(ok=False, error=str(e))
+        return response
+
+    def _macro(self, request):
+        macro = request.get("macro", "left")
+        if macro not in self.engine.machines:
+            raise ValueError(f"macro sconosciuta: {macro}")
+        return macro
+
+    # --- Comandi ---
+    async def _cmd_ping(self, request):
+        return {}
+
+    async def _cmd_arm(self, request):
+        return {"state": await self.engine.arm(self._macro(request))}
+
+    async def _cmd_disarm(self, request):
+        return {"state": await self.engine.disarm(self._macro(request))}
+
+    async def _cmd_toggle(self, request):
+        return {"state": await self.engine.toggle(self._macro(request))}
+
+    async def _cmd_set_cps(self, request):
+        macro = request.get("macro")
+        if macro is not None:
+            macro = self._macro(request)
+        self.engine.set_cps(int(request["min"]), int(request.get("max", request["min"])), macro)
+        return {}
+
+    async def _cmd_sync_ticks(self, request):
+        return {"anchor_ns": self.engine.sync_ticks()}
+
+    async def _cmd_profile(self, request):
+        if self.on_profile is None:
+            raise ValueError("profili non supportati da questo client")
+        self.on_profile(str(request["name"]))
+        return {"profile": request["name"]}
+
+    async def _cmd_stats(self, request):
+        stats = self.engine.stats()
+        stats["clients"] = self.clients
+        return stats
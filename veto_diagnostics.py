@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Veto - Diagnostica della temporizzazione dei click
+Author: MyLuxy
+
+Il motore scrive i timestamp dei click in un ring buffer a dimensione fissa
+(un array per slot, nessuna allocazione per click); la GUI legge solo i
+click nuovi a ogni frame e aggiorna in modo incrementale un istogramma
+degli intervalli, CPS reali e jitter p99.
+
+DeliveryProbe misura invece quanto impiega un click iniettato ad arrivare
+al listener (pynput o evdev): la latenza che il backend aggiunge sulla
+macchina corrente, invisibile ai timestamp del motore.
+"""
+import math
+import threading
+from array import array
+from collections import deque
+
+from veto_timing import now_ns
+
+RING_SIZE = 1024
+
+# Misura iniezione -> consegna: click di prova, attesa massima per click e
+# soglia del p99 oltre la quale il backend è segnalato come lento
+DELIVERY_PROBES = 200
+DELIVERY_TIMEOUT_S = 0.25
+DELIVERY_WARN_P99_MS = 5.0
+DELIVERY_TAGS = 8  # posizioni distinte (x0 .. x0 + 7) dei click di prova
+
+# Istogramma a bin logaritmici: 1 ms .. 1 s copre burst, click e hold
+HIST_BINS = 30
+HIST_MIN_MS = 1.0
+HIST_MAX_MS = 1000.0
+HIST_WINDOW = 256  # intervalli considerati
+
+_LOG_MIN = math.log(HIST_MIN_MS)
+_LOG_SPAN = math.log(HIST_MAX_MS) - _LOG_MIN
+
+
+def interval_bin(interval_ms):
+    """Indice del bin (logaritmico) di un intervallo in ms"""
+    if interval_ms <= HIST_MIN_MS:
+        return 0
+    index = int((math.log(interval_ms) - _LOG_MIN) / _LOG_SPAN * HIST_BINS)
+    return min(index, HIST_BINS - 1)
+
+
+class ClickRing:
+    """Timestamp recenti dei click per slot.
+
+    Un solo scrittore (il thread motore); i lettori usano un cursore e
+    ricevono solo i click successivi. Se un lettore resta indietro di più
+    di `size` click, i più vecchi sono persi.
+    """
+    def __init__(self, slot_count, size=RING_SIZE):
+        self.size = size
+        self.rings = [array("q", bytes(8 * size)) for _ in range(slot_count)]
+        self.heads = [0] * slot_count
+
+    def record(self, slot, t_ns):
+        head = self.heads[slot]
+        self.rings[slot][head % self.size] = t_ns
+        # La testa si aggiorna dopo il timestamp: il lettore non vede voci a metà
+        self.heads[slot] = head + 1
+
+    def read(self, slot, cursor):
+        """(nuovo cursore, timestamp dei click dopo cursor)"""
+        head = self.heads[slot]
+        ring, size = self.rings[slot], self.size
+        start = max(cursor, head - size)
+        return head, [ring[i % size] for i in range(start, head)]
+
+
+class TimingStats:
+    """Finestra mobile degli intervalli con istogramma aggiornato in modo incrementale"""
+    def __init__(self, window=HIST_WINDOW):
+        self.intervals = deque(maxlen=window)
+        self.counts = [0] * HIST_BINS
+        self.changed = set()  # bin modificati dall'ultimo disegno
+        self.recent = deque()  # timestamp dell'ultimo secondo (CPS reali)
+        self.last = None
+        self.cursor = 0
+
+    def feed(self, timestamps):
+        intervals, counts, changed = self.intervals, self.counts, self.changed
+        for t in timestamps:
+            if self.last is not None:
+                if len(intervals) == intervals.maxlen:
+                    old = interval_bin(intervals[0])
+                    counts[old] -= 1
+                    changed.add(old)
+                interval = (t - self.last) / 1e6
+                intervals.append(interval)
+                new = interval_bin(interval)
+                counts[new] += 1
+                changed.add(new)
+            self.last = t
+            self.recent.append(t)
+
+    def cps(self, now):
+        recent = self.recent
+        while recent and recent[0] < now - 1_000_000_000:
+            recent.popleft()
+        return len(recent)
+
+    def jitter_p99_ms(self):
+        """p99 dello scarto degli intervalli dalla loro mediana"""
+        if len(self.intervals) < 2:
+            return 0.0
+        ordered = sorted(self.intervals)
+        median = ordered[len(ordered) // 2]
+        deviations = sorted(abs(i - median) for i in ordered)
+        return deviations[min(len(deviations) - 1, int(0.99 * len(deviations)))]
+
+    def take_changed(self):
+        changed, self.changed = self.changed, set()
+        return changed
+
+
+class HistogramBars:
+    """Istogramma di TimingStats su un canvas Tk.
+
+    Una barra per bin, creata una volta sola: a ogni frame si spostano solo
+    le barre dei bin cambiati.
+    """
+    def __init__(self, canvas, width, height, fill):
+        self.canvas = canvas
+        self.width = width
+        self.height = height
+        bar_width = width / HIST_BINS
+        self.bars = [
+            canvas.create_rectangle(i * bar_width + 1, height, (i + 1) * bar_width - 1, height, fill=fill, width=0)
+            for i in range(HIST_BINS)
+        ]
+        self.heights = [0] * HIST_BINS
+        self.scale = None
+
+    def reset(self):
+        """Il prossimo draw ridisegna tutte le barre (es. cambio di macro)"""
+        self.scale = None
+
+    def draw(self, stats):
+        changed = stats.take_changed()
+        # Scala a potenze di due: cambia di rado, quindi di rado serve ridisegnare tutto
+        scale = 1 << max(stats.counts).bit_length()
+        if scale != self.scale:
+            self.scale = scale
+            changed = range(HIST_BINS)
+        bar_width = self.width / HIST_BINS
+        for i in changed:
+            height = round(stats.counts[i] / scale * (self.height - 4))
+            if height != self.heights[i]:
+                self.heights[i] = height
+                self.canvas.coords(self.bars[i], i * bar_width + 1, self.height - height,
+                                   (i + 1) * bar_width - 1, self.height)
+
+
+class DeliveryProbe:
+    """Latenza iniezione -> consegna di un backend, misurata con click marcati.
+
+    I click partono uno alla volta da run() (thread a parte, è bloccante);
+    il listener passa ogni click a on_click, che riconosce quello in attesa
+    da pulsante e posizione (x0 + i % DELIVERY_TAGS, y0) e ne registra
+    l'arrivo. I listener senza posizione (evdev) usano match_position=False.
+    on_click restituisce True per press e release di prova, che il listener
+    deve scartare (niente hotkey, trigger o registrazione).
+    """
+    def __init__(self, backend, button="middle", origin=(0, 0), probes=DELIVERY_PROBES,
+                 timeout=DELIVERY_TIMEOUT_S, match_position=True):
+        self.backend = backend
+        self.button = button
+        self.origin = (int(origin[0]), int(origin[1]))
+        self.probes = probes
+        self.timeout = timeout
+        self.match_position = match_position
+        self.latencies_us = []
+        self.lost = 0
+        self._pending = None  # (x, y, t_sent) del click in attesa della press
+        self._release = None  # (x, y) del click in attesa della release
+        self._pressed = threading.Event()
+        self._released = threading.Event()
+
+    def _matches(self, x, y, button, target):
+        if getattr(button, "name", button) != self.button:
+            return False
+        return not self.match_position or (x, y) == target[:2]
+
+    def on_click(self, x, y, button, pressed):
+        """Chiamata dal thread listener; True se l'evento è un click di prova"""
+        t = now_ns()
+        if pressed:
+            pending = self._pending
+            if pending is None or not self._matches(x, y, button, pending):
+                return False
+            self._pending = None
+            self.latencies_us.append((t - pending[2]) / 1e3)
+            self._pressed.set()
+            return True
+        release = self._release
+        if release is None or not self._matches(x, y, button, release):
+            return False
+        self._release = None
+        self._released.set()
+        return True
+
+    def run(self):
+        """Inietta i click di prova e restituisce la distribuzione delle latenze"""
+        x0, y0 = self.origin
+        for i in range(self.probes):
+            x = x0 + i % DELIVERY_TAGS
+            self._pressed.clear()
+            self._released.clear()
+            self._release = (x, y0)
+            self._pending = (x, y0, now_ns())
+            self.backend.click_at(self.button, x, y0)
+            if not self._pressed.wait(self.timeout):
+                self._pending = None
+                self.lost += 1
+            # La release chiude il click: il prossimo parte a listener libero
+            if not self._released.wait(self.timeout):
+                self._release = None
+        return self.result()
+
+    def result(self):
+        latencies = sorted(self.latencies_us)
+        result = {"probes": self.probes, "delivered": len(latencies), "lost": self.lost}
+        if latencies:
+            def percentile(p):
+                return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))]
+            result.update(p50_us=round(percentile(50)), p99_us=round(percentile(99)),
+                          max_us=round(latencies[-1]))
+        # Segnalato anche se i click non arrivano affatto (es. XTest con listener evdev)
+        result["warning"] = not latencies or self.lost > 0 or result["p99_us"] > DELIVERY_WARN_P99_MS * 1000
+        return result
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Veto - Distribuzioni parametriche degli intervalli tra i click
+Author: MyLuxy
+
+Ogni distribuzione viene compilata una sola volta in una tabella di
+quantili (inverse-CDF quantizzata): nel loop di click basta un indice
+casuale, senza chiamare random.gauss & co. ad ogni click.
+"""
+import math
+import random
+from functools import lru_cache
+from statistics import NormalDist
+
+TABLE_BITS = 12
+TABLE_SIZE = 1 << TABLE_BITS
+
+# Intervallo minimo ammesso (s): evita intervalli nulli o negativi nelle code
+MIN_INTERVAL = 0.001
+
+DISTRIBUTIONS = {
+    "uniform": "Uniform",
+    "gaussian": "Gaussian",
+    "lognormal": "Log-normal",
+    "butterfly": "Butterfly",
+}
+
+
+def interval_moments(min_cps, max_cps):
+    """Media e deviazione standard dell'intervallo (s) ricavate dal range CPS.
+
+    La media è il centro tra 1/max e 1/min; ±2σ coprono l'intero range.
+    """
+    lo, hi = 1.0 / max_cps, 1.0 / min_cps
+    return (lo + hi) / 2, (hi - lo) / 4
+
+
+def _probabilities():
+    # Punti medi dei TABLE_SIZE strati: evita i quantili 0 e 1 (infiniti)
+    return [(i + 0.5) / TABLE_SIZE for i in range(TABLE_SIZE)]
+
+
+def _tabulate_inverse(cdf, lo, hi, steps=1 << 16):
+    """Inverte numericamente una CDF monotona campionandola su una griglia fine"""
+    xs = [lo + (hi - lo) * i / steps for i in range(steps + 1)]
+    fs = [cdf(x) for x in xs]
+    table = []
+    j = 0
+    for p in _probabilities():
+        while j < steps and fs[j + 1] < p:
+            j += 1
+        f0, f1 = fs[j], fs[min(j + 1, steps)]
+        t = (p - f0) / (f1 - f0) if f1 > f0 else 0.0
+        table.append(xs[j] + t * (xs[min(j + 1, steps)] - xs[j]))
+    return table
+
+
+def _uniform_table(min_cps, max_cps):
+    """Distribuzione storica: cps ~ U(min, max) e ritardo * U(0.85, 1.15)"""
+    strata = 16
+    values = sorted(
+        (0.85 + 0.30 * (j + 0.5) / strata) / (min_cps + (max_cps - min_cps) * (i + 0.5) / TABLE_SIZE)
+        for i in range(TABLE_SIZE) for j in range(strata)
+    )
+    return values[strata // 2::strata]
+
+
+def _gaussian_table(mean, std):
+    dist = NormalDist(mean, std)
+    return [dist.inv_cdf(p) for p in _probabilities()]
+
+
+def _lognormal_table(mean, std):
+    sigma2 = math.log(1 + (std / mean) ** 2)
+    dist = NormalDist(math.log(mean) - sigma2 / 2, math.sqrt(sigma2))
+    return [math.exp(dist.inv_cdf(p)) for p in _probabilities()]
+
+
+def _butterfly_table(mean, std):
+    """Bimodale: raffiche di click ravvicinati alternate a pause più lunghe.
+
+    Miscela 50/50 di due gaussiane a mean ± d con d² + s² = std².
+    """
+    d, s = 0.8 * std, 0.6 * std
+    short, long = NormalDist(mean - d, s), NormalDist(mean + d, s)
+    return _tabulate_inverse(
+        lambda x: 0.5 * (short.cdf(x) + long.cdf(x)),
+        mean - d - 6 * s, mean + d + 6 * s
+    )
+
+
+class IntervalTable:
+    """Tabella inverse-CDF compilata: sample() costa un solo indice casuale"""
+    __slots__ = ("kind", "values", "mean", "std")
+
+    def __init__(self, kind, values):
+        self.kind = kind
+        # Tupla di float già allocati: il campionamento non crea oggetti
+        self.values = tuple(max(MIN_INTERVAL, v) for v in values)
+        self.mean = sum(self.values) / TABLE_SIZE
+        self.std = math.sqrt(sum((v - self.mean) ** 2 for v in self.values) / TABLE_SIZE)
+
+    @classmethod
+    def restore(cls, kind, values, mean, std):
+        """Tabella compilata altrove (es. dal processo GUI): niente ricalcolo dei momenti"""
+        table = cls.__new__(cls)
+        table.kind, table.values, table.mean, table.std = kind, tuple(values), mean, std
+        return table
+
+    def sample(self, _bits=random.getrandbits):
+        return self.values[_bits(TABLE_BITS)]
+
+
+@lru_cache(maxsize=64)
+def compile_distribution(kind, min_cps, max_cps, randomize=True):
+    """Compila (con cache) la tabella degli intervalli per una macro"""
+    min_cps, max_cps = sorted((max(1, min_cps), max(1, max_cps)))
+    mean, std = interval_moments(min_cps, max_cps)
+    if not randomize:
+        # Comportamento storico: CPS medio fisso
+        return IntervalTable(kind, [2.0 / (min_cps + max_cps)] * TABLE_SIZE)
+    if kind == "uniform":
+        return IntervalTable(kind, _uniform_table(min_cps, max_cps))
+    if std <= 0:
+        return IntervalTable(kind, [mean] * TABLE_SIZE)
+    if kind == "gaussian":
+        return IntervalTable(kind, _gaussian_table(mean, std))
+    if kind == "lognormal":
+        return IntervalTable(kind, _lognormal_table(mean, std))
+    if kind == "butterfly":
+        return IntervalTable(kind, _butterfly_table(mean, std))
+    raise ValueError(f"Distribuzione sconosciuta: {kind}")
@@ -0,0 +1,738 @@
+#!/usr/bin/env python3
+"""
+Veto - Motore di click: scheduler a deadline e thread motore unico
+Author: MyLuxy
+
+Tutte le macro sono servite da un solo thread (ClickEngine) che consuma
+la coda dei comandi, applica le transizioni di stato e inietta i click
+alle deadline calcolate dallo Scheduler. Lo stesso Scheduler gira anche
+nel processo motore isolato (veto_process_engine).
+"""
+import random
+import threading
+from bisect import bisect_left, bisect_right
+
+from veto_backends import InjectedKeys, PynputBackend, is_key
+from veto_distributions import TABLE_BITS, compile_distribution
+from veto_eventlog import EV_CLICK, EV_PRESS, EV_RELEASE
+from veto_patterns import OP_CLICK, OP_PRESS, OP_RELEASE, OP_REPEAT, OP_SIZE
+from veto_sched import apply_engine_tuning
+from veto_state import CommandQueue, MacroStateMachine, CMD_CONFIGURE, CMD_BURST, CMD_DISARM
+from veto_timing import now_ns, wait_until
+
+# Modalità di esecuzione di uno slot
+HOLD_SINGLE = 0  # click ripetuti alle deadline
+HOLD_BREAK = 1   # tasto tenuto premuto finché lo slot è in esecuzione
+HOLD_BURST = 2   # N click a spaziatura fissa a ogni attivazione, poi cooldown
+
+# Comando interno: cambio di host del motore (thread locale <-> processo isolato)
+CMD_HOST = "host"
+# Comando interno: lista di bersagli (coordinate) di uno slot
+CMD_TARGETS = "targets"
+# Comando interno: pattern compilato (veto_patterns) di uno slot
+CMD_PATTERN = "pattern"
+# Comando interno: cambio del pulsante o tasto iniettato da uno slot
+CMD_BUTTON = "button"
+# Comando interno: avvio (player) o arresto (None) della riproduzione di una registrazione
+CMD_PLAY = "play"
+
+# (randomize, distribution, mode, min_cps, max_cps, burst_count, burst_spacing_us, burst_cooldown_ms,
+#  tick_rate, tick_phase_us, tick_per_tick, tick_offset_pct, rate_control)
+DEFAULT_CONFIG = (True, "uniform", HOLD_SINGLE, 10, 15, 5, 8000, 0, 0, 0, 1, 50, False)
+
+# Controllo del rate ad anello chiuso: finestra dei click misurati, esponente
+# di correzione per click e limiti del fattore applicato agli intervalli
+RATE_WINDOW = 32
+RATE_GAIN = 0.03
+RATE_SCALE_MIN = 0.5
+RATE_SCALE_MAX = 1.5
+
+# Errori consecutivi del motore: attesa prima di riprovare, raddoppiata a ogni errore fino al massimo
+ERROR_BACKOFF_NS = 10_000_000
+ERROR_BACKOFF_MAX_NS = 1_000_000_000
+
+
+class SlotRuntime:
+    """Stato di esecuzione di uno slot: cosa deve fare il motore e quando"""
+    __slots__ = ("slot", "button", "backend", "running", "config", "mode", "table", "deadline", "pressed", "clicks",
+                 "burst", "spacing", "batch", "burst_count", "burst_spacing", "burst_cooldown", "cooldown_until",
+                 "nominal", "tick_period", "tick_phase", "tick_per_tick", "tick_offset", "tick", "tick_clicks",
+                 "rate_control", "rate_scale", "rate_window", "rate_count", "interval_min", "interval_max",
+                 "targets", "target_index", "pattern", "pc", "pattern_runs")
+
+    def __init__(self, slot, button, backend=None):
+        self.slot = slot
+        self.button = button
+        self.backend = backend  # backend del display dello slot
+        self.running = False
+        self.config = None
+        self.mode = HOLD_SINGLE
+        self.table = None
+        self.deadline = None
+        self.pressed = False
+        self.clicks = 0
+        self.burst = 0  # click di raffica ancora da eseguire (anche se la macro non è attiva)
+        self.spacing = 0  # ns tra i click della raffica corrente (0 = tabella della distribuzione)
+        self.batch = False  # raffica iniettata in una sola chiamata al backend
+        self.burst_count = 0
+        self.burst_spacing = 0
+        self.burst_cooldown = 0
+        self.cooldown_until = 0
+        # Allineamento ai tick del gioco (tick_period 0 = disattivato)
+        self.nominal = None  # deadline prima dell'allineamento: conserva i CPS medi
+        self.tick_period = 0
+        self.tick_phase = 0
+        self.tick_per_tick = 1
+        self.tick_offset = 0
+        self.tick = -1  # tick dell'ultimo click pianificato
+        self.tick_clicks = 0  # click già pianificati in quel tick
+        # Controllo del rate: fattore sugli intervalli e timestamp degli ultimi click
+        self.rate_control = False
+        self.rate_scale = 1.0
+        self.rate_window = [0] * RATE_WINDOW
+        self.rate_count = 0
+        self.interval_min = 0.0  # limiti (s) degli intervalli corretti: quelli della tabella
+        self.interval_max = 0.0
+        # Bersagli (x, y, larghezza, altezza) visitati a turno; vuoto = click dove si trova il cursore
+        self.targets = ()
+        self.target_index = 0
+        # Pattern compilato: terne (azione, min ns, max ns); pc = indice della prossima, -1 = finito
+        self.pattern = ()
+        self.pc = 0
+        self.pattern_runs = 0
+
+    @property
+    def local(self):
+        """Lo slot richiede lo scheduler locale (bersagli, pattern e tasti non passano dal blocco condiviso)"""
+        return bool(self.targets or self.pattern) or is_key(self.button)
+
+
+class Playback:
+    """Riproduzione in corso sul thread motore: passi (t_ns, azione, argomenti) a deadline base + t_ns"""
+    __slots__ = ("player", "steps", "step", "base", "on_done")
+
+    def __init__(self, player, steps, on_done):
+        self.player = player
+        self.steps = steps
+        self.step = None  # prossimo passo da eseguire (None = finita)
+        self.base = None  # istante corrispondente a t_ns = 0, fissato dal primo passo
+        self.on_done = on_done
+
+
+class Scheduler:
+    """Scheduler a deadline assolute condiviso da tutti gli slot.
+
+    step() visita solo gli slot attivi, quindi le macro registrate ma ferme
+    non costano nulla per iterazione.
+    """
+    def __init__(self, backend, on_inject=None, on_click=None, on_burst_done=None, clock=now_ns,
+                 bits=random.getrandbits):
+        self.backend = backend
+        # Orologio e sorgente casuale iniettabili (veto_sim: tempo virtuale e seed)
+        self.clock = clock
+        self.bits = bits
+        self.on_inject = on_inject
+        self.on_click = on_click
+        self.on_burst_done = on_burst_done
+        self.log = None  # LogRing di veto_eventlog (None: log disattivato)
+        self.slots = []
+        self.active = []
+
+    def add(self, slot, button, backend=None):
+        """Registra uno slot; backend None = quello dello scheduler (display predefinito)"""
+        runtime = SlotRuntime(slot, button, backend or self.backend)
+        self.configure(runtime, DEFAULT_CONFIG)
+        self.slots.append(runtime)
+        return runtime
+
+    def _refresh(self):
+        self.active = [rt for rt in self.slots if rt.running or rt.burst or rt.pressed]
+
+    def set_running(self, runtime, running):
+        if runtime.running != running:
+            runtime.running = running
+            if not running and not runtime.burst:
+                runtime.deadline = None
+            elif running and runtime.pattern:
+                # Ogni attivazione riparte dall'inizio del pattern, a pulsante rilasciato
+                if runtime.pressed:
+                    self._set_pressed(runtime, False, self.clock())
+                runtime.pc = 0
+                runtime.pattern_runs = 0
+            elif running and runtime.mode == HOLD_BURST:
+                self._trigger_burst(runtime)
+            self._refresh()
+
+    def _trigger_burst(self, runtime):
+        """Modalità burst: ogni attivazione avvia una raffica, se il cooldown è scaduto"""
+        if runtime.burst or self.clock() < runtime.cooldown_until:
+            return
+        runtime.burst = runtime.burst_count
+        runtime.spacing = runtime.burst_spacing
+        runtime.batch = runtime.burst_spacing == 0
+        runtime.deadline = None
+
+    def set_targets(self, runtime, targets):
+        """Regioni (x, y, w, h) da cliccare a turno; il punto è casuale dentro la regione"""
+        runtime.targets = tuple((int(x), int(y), max(1, int(w)), max(1, int(h))) for x, y, w, h in targets)
+        runtime.target_index = 0
+
+    def set_pattern(self, runtime, pattern):
+        """Pattern compilato da veto_patterns.compile_pattern (tupla vuota = click normali)"""
+        if runtime.pressed:
+            self._set_pressed(runtime, False, self.clock())
+        runtime.pattern = tuple(pattern)
+        runtime.pc = 0
+        runtime.pattern_runs = 0
+        runtime.deadline = None
+
+    def set_button(self, runtime, button, backend):
+        """Cambia pulsante/tasto iniettato e backend; un pulsante tenuto viene prima rilasciato"""
+        if runtime.pressed:
+            self._set_pressed(runtime, False, self.clock())
+        runtime.button = button
+        runtime.backend = backend
+
+    def add_burst(self, runtime, count):
+        runtime.burst += count
+        self._refresh()
+
+    def configure(self, runtime, config, table=None):
+        """config come DEFAULT_CONFIG; spaziatura burst in µs, cooldown in ms.
+
+        table è la tabella degli intervalli già compilata da chi ha accodato il
+        comando: compilarne una nuova sul thread motore fermerebbe tutte le macro.
+        """
+        if config == runtime.config:
+            return
+        (randomize, distribution, mode, min_cps, max_cps, burst_count, burst_spacing_us, burst_cooldown_ms,
+         tick_rate, tick_phase_us, tick_per_tick, tick_offset_pct, rate_control) = config
+        runtime.config = config
+        runtime.table = table or compile_distribution(distribution, min_cps, max_cps, bool(randomize))
+        runtime.interval_min = min(runtime.table.values)
+        runtime.interval_max = max(runtime.table.values)
+        runtime.rate_control = bool(rate_control)
+        runtime.rate_scale = 1.0
+        runtime.rate_count = 0
+        runtime.burst_count = burst_count
+        runtime.burst_spacing = burst_spacing_us * 1000
+        runtime.burst_cooldown = burst_cooldown_ms * 1_000_000
+        runtime.tick_period = 1_000_000_000 // tick_rate if tick_rate else 0
+        if runtime.tick_period:
+            runtime.tick_phase = tick_phase_us * 1000 % runtime.tick_period
+            runtime.tick_per_tick = max(1, tick_per_tick)
+            runtime.tick_offset = runtime.tick_period * min(tick_offset_pct, 99) // 100
+        if runtime.pressed and mode != HOLD_BREAK:
+            self._set_pressed(runtime, False, self.clock())
+        runtime.mode = mode
+
+    def _inject(self, action, *args):
+        if self.on_inject:
+            self.on_inject(True)
+        action(*args)
+        if self.on_inject:
+            self.on_inject(False)
+
+    def _set_pressed(self, rt, pressed, t):
+        """Press/release sintetico dello slot (registrato nel log eventi se attivo)"""
+        self._inject(rt.backend.press if pressed else rt.backend.release, rt.button)
+        rt.pressed = pressed
+        if self.log:
+            self.log.append(EV_PRESS if pressed else EV_RELEASE, rt.slot, rt.button, t)
+
+    @staticmethod
+    def _click_batch(backend, button, count):
+        click_batch = getattr(backend, "click_batch", None)
+        if click_batch is not None:
+            click_batch(button, count)
+        else:
+            for _ in range(count):
+                backend.click(button)
+
+    def _click_targets(self, rt, count, bits):
+        """Move + click sui prossimi `count` bersagli, una chiamata al backend per bersaglio"""
+        targets, click_at = rt.targets, rt.backend.click_at
+        for _ in range(count):
+            x, y, w, h = targets[rt.target_index]
+            rt.target_index = (rt.target_index + 1) % len(targets)
+            click_at(rt.button, x + (bits(16) * w >> 16), y + (bits(16) * h >> 16))
+
+    def step(self, now):
+        """Esegue le azioni scadute e restituisce la prossima deadline (None se inattivo)"""
+        _bits = self.bits
+        next_deadline = None
+        idle = False
+        for rt in self.active:
+            if rt.pattern:
+                if not rt.running:
+                    # Rilascio o disarmo: il pattern si interrompe subito
+                    if rt.pressed:
+                        self._set_pressed(rt, False, now)
+                    idle = True
+                    continue
+                if rt.pc < 0:
+                    continue  # pattern finito: riparte alla prossima attivazione
+                if rt.deadline is None:
+                    rt.deadline = now
+                self._step_pattern(rt, now, _bits)
+                if rt.pc >= 0 and (next_deadline is None or rt.deadline < next_deadline):
+                    next_deadline = rt.deadline
+                continue
+            if rt.mode == HOLD_BREAK:
+                if rt.running != rt.pressed:
+                    self._set_pressed(rt, rt.running, now)
+                idle = idle or not rt.running
+                continue
+            if not ((rt.running and rt.mode != HOLD_BURST) or rt.burst):
+                rt.deadline = None
+                idle = True
+                continue
+            if rt.deadline is None:
+                rt.nominal = rt.deadline = now
+                rt.rate_count = 0
+                if rt.tick_period and not (rt.spacing or rt.batch):
+                    rt.deadline = self._align(rt, now, now, _bits)
+            if now >= rt.deadline:
+                t_click = self.clock()
+                count = rt.burst if rt.batch else 1
+                if rt.targets:
+                    self._inject(self._click_targets, rt, count, _bits)
+                elif count > 1:
+                    self._inject(self._click_batch, rt.backend, rt.button, count)
+                else:
+                    self._inject(rt.backend.click, rt.button)
+                rt.clicks += count
+                if self.on_click:
+                    for _ in range(count):
+                        self.on_click(rt.slot, t_click)
+                if self.log:
+                    for _ in range(count):
+                        self.log.append(EV_CLICK, rt.slot, rt.button, t_click)
+                if rt.burst:
+                    rt.burst -= count
+                    if not rt.burst and self._burst_finished(rt, t_click):
+                        idle = True
+                        continue
+                if rt.burst and rt.spacing:
+                    # Spaziatura fissa: la deadline assoluta resta esatta anche in ritardo
+                    rt.deadline += rt.spacing
+                else:
+                    if rt.rate_control:
+                        interval = self._regulate(rt, t_click, _bits(TABLE_BITS))
+                    else:
+                        interval = rt.table.values[_bits(TABLE_BITS)]
+                    if rt.tick_period:
+                        rt.nominal = max(rt.nominal + int(interval * 1e9), now)
+                        rt.deadline = self._align(rt, rt.nominal, now, _bits)
+                    else:
+                        # Deadline assolute: niente deriva; se siamo in ritardo non recuperiamo a raffica
+                        rt.deadline = max(rt.deadline + int(interval * 1e9), now)
+            if next_deadline is None or rt.deadline < next_deadline:
+                next_deadline = rt.deadline
+        if idle:
+            self._refresh()
+        return next_deadline
+
+    def _step_pattern(self, rt, now, bits):
+        """Esegue le operazioni scadute del pattern e fissa la deadline della successiva"""
+        ops = rt.pattern
+        while rt.pc >= 0 and now >= rt.deadline:
+            pc = rt.pc
+            op, low, high = ops[pc], ops[pc + 1], ops[pc + 2]
+            pc += OP_SIZE
+            if op == OP_REPEAT:
+                rt.pattern_runs += 1
+                rt.pc = -1 if low and rt.pattern_runs >= low else 0
+                continue
+            if op == OP_CLICK:
+                t = self.clock()
+                if rt.targets:
+                    self._inject(self._click_targets, rt, 1, bits)
+                else:
+                    self._inject(rt.backend.click, rt.button)
+                rt.clicks += 1
+                if self.on_click:
+                    self.on_click(rt.slot, t)
+                if self.log:
+                    self.log.append(EV_CLICK, rt.slot, rt.button, t)
+            elif op == OP_PRESS or op == OP_RELEASE:
+                self._set_pressed(rt, op == OP_PRESS, now)
+            # Deadline assolute come per i click normali: in ritardo non si recupera a raffica
+            duration = low if low == high else low + (bits(16) * (high - low) >> 16)
+            rt.deadline = max(rt.deadline + duration, now)
+            rt.pc = pc if pc < len(ops) else -1
+
+    @staticmethod
+    def _regulate(rt, t_click, index):
+        """Intervallo corretto in base ai CPS ottenuti sugli ultimi RATE_WINDOW click.
+
+        Tutti gli intervalli sono moltiplicati per lo stesso fattore, quindi la
+        forma della distribuzione resta quella scelta; il fattore si adatta a
+        piccoli passi finché l'intervallo medio misurato coincide con la media
+        della tabella (nessun errore a regime). index (TABLE_BITS bit casuali)
+        sceglie solo tra i valori che, scalati, restano tra gli intervalli
+        minimo e massimo della tabella: la distribuzione viene troncata invece
+        di accumularsi sui bordi come farebbe un clamp.
+        """
+        window = rt.rate_window
+        slot = rt.rate_count % RATE_WINDOW
+        oldest = window[slot]
+        window[slot] = t_click
+        rt.rate_count += 1
+        if rt.rate_count > RATE_WINDOW:
+            achieved = (t_click - oldest) / (RATE_WINDOW * 1e9)
+            scale = rt.rate_scale * (rt.table.mean / achieved) ** RATE_GAIN
+            rt.rate_scale = min(max(scale, RATE_SCALE_MIN), RATE_SCALE_MAX)
+        values, scale = rt.table.values, rt.rate_scale
+        # Tabella inverse-CDF ordinata: i valori ammessi sono un intervallo di indici
+        low = bisect_left(values, rt.interval_min / scale)
+        high = bisect_right(values, rt.interval_max / scale)
+        if low < high:
+            index = low + (index * (high - low) >> TABLE_BITS)
+        # Il clamp copre solo gli arrotondamenti (e le tabelle costanti, senza randomize)
+        return min(max(values[index] * scale, rt.interval_min), rt.interval_max)
+
+    @staticmethod
+    def _align(rt, nominal, now, bits):
+        """Sposta una deadline nominale nella finestra di un tick, con al massimo tick_per_tick click per tick.
+
+        Il tick lo sceglie la deadline nominale (quindi la distribuzione); dentro il
+        tick il k-esimo click cade a offset + k * gap più un jitter casuale che non
+        supera il 20% di gap, lontano dai bordi del tick. Se quella posizione è già
+        passata il click va al tick successivo invece di cadere vicino al bordo.
+        """
+        period = rt.tick_period
+        gap = (period - rt.tick_offset) // rt.tick_per_tick
+        tick = (nominal - rt.tick_phase) // period
+        if tick <= rt.tick:
+            tick = rt.tick
+            if rt.tick_clicks >= rt.tick_per_tick:
+                tick += 1
+        while True:
+            if tick != rt.tick:
+                rt.tick = tick
+                rt.tick_clicks = 0
+            deadline = rt.tick_phase + tick * period + rt.tick_offset + rt.tick_clicks * gap
+            if deadline >= now:
+                break
+            tick += 1
+        rt.tick_clicks += 1
+        return deadline + bits(16) * gap // (5 << 16)
+
+    def _burst_finished(self, rt, t_click):
+        """Fine raffica; True se era una raffica della modalità burst (lo slot resta fermo)"""
+        if self.on_burst_done:
+            self.on_burst_done(rt.slot)
+        if rt.mode != HOLD_BURST:
+            return False
+        rt.cooldown_until = t_click + rt.burst_cooldown
+        rt.spacing = 0
+        rt.batch = False
+        rt.deadline = None
+        return True
+
+    def release_all(self):
+        for rt in self.slots:
+            rt.running = False
+            rt.deadline = None
+            if rt.burst:
+                rt.burst = 0
+                if self.on_burst_done:
+                    self.on_burst_done(rt.slot)
+            if rt.pressed:
+                self._set_pressed(rt, False, self.clock())
+        self._refresh()
+
+
+class ClickEngine:
+    """Thread motore unico: coda comandi -> macchine a stati -> scheduler.
+
+    Le transizioni avvengono solo qui, quindi non possono esistere due loop
+    di click per la stessa macro. Con un host isolato (EngineHost) lo stato
+    viene pubblicato nel blocco condiviso e i click li esegue l'host, tranne
+    che per gli slot con bersagli, pattern o tasti, che restano sul thread motore
+    insieme alla riproduzione delle registrazioni.
+    """
+    def __init__(self, backend_factory=PynputBackend, tuning=None, on_transition=None, on_click=None,
+                 clock=now_ns, waiter=wait_until, bits=random.getrandbits):
+        self.clock = clock
+        self.waiter = waiter  # waiter(deadline, event): attesa della prossima deadline o di un comando
+        self.commands = CommandQueue(clock)
+        self.machines = {}
+        self.runtimes = {}
+        self.backend_factory = backend_factory
+        self.backend = backend_factory()
+        self.backends = {None: self.backend}  # display -> backend
+        self.displays = {}  # slot -> display
+        # Tasti iniettati sul display predefinito: il listener delle hotkey ne scarta l'eco
+        self.injected_keys = InjectedKeys()
+        self.scheduler = Scheduler(self.backend, on_inject=self._set_injecting, on_click=on_click,
+                                   on_burst_done=self._burst_done, clock=clock, bits=bits)
+        self.tuning = tuning
+        self.on_transition = on_transition
+        self._burst_waiters = {}
+        self.host = None
+        self.playback = None
+        self.injecting = False
+        self._running = False
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _set_injecting(self, injecting):
+        self.injecting = injecting
+
+    def _burst_done(self, slot):
+        for callback in self._burst_waiters.pop(slot, ()):
+            callback()
+
+    def add_macro(self, slot, kind, button, machine=None, display=None):
+        """Registra una macro; va chiamato prima di start().
+
+        display (es. ":1") lega la macro a un altro server X: gli slot dello
+        stesso display condividono un backend, tutti condividono lo scheduler.
+        button "key:..." usa il backend da tastiera dello stesso display.
+        """
+        machine = machine or MacroStateMachine(kind)
+        self.machines[slot] = machine
+        self.displays[slot] = display
+        self.runtimes[slot] = self.scheduler.add(slot, button, self._backend(display, button))
+        return machine
+
+    def _backend(self, display, button):
+        if display not in self.backends:
+            self.backends[display] = self.backend_factory(display)
+        backend = self.backends[display]
+        if is_key(button):
+            backend = backend.keyboard(self.injected_keys if display is None else None)
+            keys = getattr(backend, "keys", None)
+            if keys is not None:
+                keys(button)  # ValueError qui, non sul thread motore
+        return backend
+
+    # --- API thread-safe (qualsiasi thread) ---
+    def submit(self, slot, command, on_applied=None):
+        """Accoda un comando di stato; on_applied(transition o None) viene chiamata dal motore"""
+        self.commands.put(slot, command, on_applied)
+
+    def burst(self, slot, count, on_done=None):
+        """Esegue `count` click con la temporizzazione dello slot, anche se la macro non è attiva"""
+        self.commands.put(slot, CMD_BURST, (count, on_done))
+
+    def configure(self, slot, randomize=True, distribution="uniform", mode=HOLD_SINGLE, min_cps=10, max_cps=15,
+                  burst_count=5, burst_spacing_us=8000, burst_cooldown_ms=0,
+                  tick_rate=0, tick_phase_us=0, tick_per_tick=1, tick_offset_pct=50, rate_control=False):
+        config = (bool(randomize), distribution, mode, min_cps, max_cps, burst_count, burst_spacing_us,
+                  burst_cooldown_ms, tick_rate, tick_phase_us, tick_per_tick, tick_offset_pct, bool(rate_control))
+        # La tabella si compila qui, sul thread chiamante (ValueError inclusi), non sul thread motore
+        table = compile_distribution(distribution, min_cps, max_cps, bool(randomize))
+        self.commands.put(slot, CMD_CONFIGURE, (config, table))
+
+    def set_targets(self, slot, targets):
+        """Bersagli (x, y, w, h) dello slot; lista vuota = click alla posizione del cursore"""
+        self.commands.put(slot, CMD_TARGETS, tuple(targets))
+
+    def set_pattern(self, slot, pattern):
+        """Pattern compilato (veto_patterns.compile_pattern) eseguito mentre lo slot è attivo"""
+        self.commands.put(slot, CMD_PATTERN, tuple(pattern))
+
+    def set_button(self, slot, button):
+        """Cambia il pulsante o il tasto ("key:...") iniettato dallo slot (ValueError se non è disponibile)"""
+        self.commands.put(slot, CMD_BUTTON, (button, self._backend(self.displays[slot], button)))
+
+    def play(self, player, on_done=None):
+        """Riproduce una registrazione (veto_recorder.MacroPlayer) sul thread motore.
+
+        Ogni passo di player.steps(backend, keyboard) viene iniettato alla sua
+        deadline assoluta come i click delle macro; alla fine o con
+        stop_playback() il motore inietta player.releases() e chiama on_done().
+        """
+        self.commands.put(None, CMD_PLAY, (player, on_done))
+
+    def stop_playback(self):
+        self.commands.put(None, CMD_PLAY, None)
+
+    def set_host(self, host):
+        """Sposta l'esecuzione dei click su un EngineHost (None = thread locale).
+
+        Restituisce un Event che viene impostato quando il motore ha applicato il cambio.
+        """
+        applied = threading.Event()
+        self.commands.put(None, CMD_HOST, (host, applied))
+        return applied
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="VetoClickEngine", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=1.0):
+        self._running = False
+        self.commands.ready.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def latency_stats(self, slot):
+        """(min, mediana, max) in ns tra accodamento e applicazione dei comandi"""
+        latencies = sorted(t.latency_ns for t in self.machines[slot].transitions)
+        if not latencies:
+            return None
+        return latencies[0], latencies[len(latencies) // 2], latencies[-1]
+
+    # --- Thread motore ---
+    def _publish(self, slot):
+        machine, runtime = self.machines[slot], self.runtimes[slot]
+        running = machine.running and not runtime.local
+        self.host.update_slot(slot, machine.enabled, machine.armed, running, *runtime.config, table=runtime.table)
+
+    def _local(self, runtime):
+        """Lo slot gira sullo scheduler locale: sempre senza host, e per bersagli, pattern e tasti"""
+        return self.host is None or runtime.local
+
+    def _handle(self, enqueued_ns, slot, command, payload):
+        if command == CMD_HOST:
+            host, applied = payload
+            self.scheduler.release_all()
+            self.host = host
+            for s, runtime in self.runtimes.items():
+                self.scheduler.set_running(runtime, self.machines[s].running and self._local(runtime))
+                if host is not None:
+                    self._publish(s)
+            applied.set()
+            return
+        if command == CMD_PLAY:
+            self._end_playback()
+            if payload is not None:
+                player, on_done = payload
+                keyboard = self.backend.keyboard(self.injected_keys)
+                self.playback = Playback(player, player.steps(self.backend, keyboard), on_done)
+                self._next_step(self.playback, self.clock())
+            return
+        runtime = self.runtimes.get(slot)
+        if runtime is None:
+            return
+        if command == CMD_CONFIGURE:
+            self.scheduler.configure(runtime, *payload)
+        elif command == CMD_TARGETS or command == CMD_PATTERN or command == CMD_BUTTON:
+            if command == CMD_TARGETS:
+                self.scheduler.set_targets(runtime, payload)
+            elif command == CMD_PATTERN:
+                self.scheduler.set_pattern(runtime, payload)
+            else:
+                self.scheduler.set_button(runtime, *payload)
+            self.scheduler.set_running(runtime, self.machines[slot].running and self._local(runtime))
+        elif command == CMD_BURST:
+            count, on_done = payload
+            if on_done:
+                self._burst_waiters.setdefault(slot, []).append(on_done)
+            if not self._local(runtime) or count <= 0:
+                # Le raffiche richiedono lo scheduler locale
+                self._burst_done(slot)
+            else:
+                self.scheduler.add_burst(runtime, count)
+        else:
+            machine = self.machines[slot]
+            transition = machine.apply(command, enqueued_ns, self.clock())
+            self.scheduler.set_running(runtime, machine.running and self._local(runtime))
+            if transition and self.on_transition:
+                self.on_transition(slot, transition)
+            if payload:
+                payload(transition)
+        if self.host is not None:
+            self._publish(slot)
+
+    def _run(self):
+        if self.tuning:
+            report = apply_engine_tuning(self.tuning)
+            if report:
+                print(f"Tuning motore: {report}")
+        failures = 0
+        while self._running:
+            try:
+                deadline = self.pump()
+            except Exception as e:
+                # Un errore (backend, callback) non deve fermare il thread: le macro tornano
+                # OFF e si riprova dopo un'attesa crescente, così un backend che fallisce
+                # sempre non fa girare il loop a vuoto; i comandi in coda restano al prossimo giro
+                print(f"Errore nel motore: {e!r}")
+                self._reset_after_error()
+                failures += 1
+                backoff = min(ERROR_BACKOFF_NS << min(failures - 1, 16), ERROR_BACKOFF_MAX_NS)
+                self.waiter(self.clock() + backoff, self.commands.ready)
+                continue
+            failures = 0
+            self.waiter(deadline, self.commands.ready)
+        self._release_all()
+
+    def _reset_after_error(self):
+        """Rilascia tutto e riporta a OFF le macro armate, con transizioni normali (GUI ed eventi)"""
+        self._release_all()
+        now = self.clock()
+        for slot, machine in self.machines.items():
+            transition = machine.apply(CMD_DISARM, now, now)
+            if transition is None:
+                continue
+            try:
+                if self.host is not None:
+                    self._publish(slot)
+                if self.on_transition:
+                    self.on_transition(slot, transition)
+            except Exception as e:
+                print(f"Errore nel ripristino della macro {slot}: {e!r}")
+
+    def _release_all(self):
+        try:
+            self.scheduler.release_all()
+        except Exception as e:
+            print(f"Errore nel rilascio dei pulsanti: {e!r}")
+        self._end_playback()
+
+    def _next_step(self, playback, now):
+        playback.step = next(playback.steps, None)
+        if playback.step is not None and playback.base is None:
+            # La riproduzione parte subito dal primo evento
+            playback.base = now - playback.step[0]
+
+    def _step_playback(self, now):
+        """Inietta i passi scaduti della riproduzione; restituisce la prossima deadline"""
+        playback = self.playback
+        while playback.step is not None and now >= playback.base + playback.step[0]:
+            _, action, args = playback.step
+            self.scheduler._inject(action, *args)
+            self._next_step(playback, now)
+        if playback.step is None:
+            self._end_playback()
+            return None
+        return playback.base + playback.step[0]
+
+    def _end_playback(self):
+        """Chiude la riproduzione in corso rilasciando pulsanti e tasti rimasti premuti"""
+        playback, self.playback = self.playback, None
+        if playback is None:
+            return
+        for action, args in playback.player.releases():
+            try:
+                self.scheduler._inject(action, *args)
+            except Exception as e:
+                print(f"Errore nel rilascio a fine riproduzione: {e!r}")
+        playback.steps.close()
+        if playback.on_done:
+            playback.on_done()
+
+    def pump(self):
+        """Un giro del motore: applica i comandi in coda e fa avanzare lo scheduler.
+
+        Restituisce la prossima deadline (None se inattivo). _run la chiama in
+        loop; veto_sim la chiama direttamente per simulare senza thread.
+        """
+        for item in self.commands.drain():
+            self._handle(*item)
+        # Con un host isolato lo scheduler locale serve solo gli slot con bersagli, pattern o tasti
+        deadline = self.scheduler.step(self.clock())
+        if self.playback is not None:
+            step = self._step_playback(self.clock())
+            if step is not None and (deadline is None or step < deadline):
+                deadline = step
+        return deadline
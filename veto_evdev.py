@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Veto - Listener di input a bassa latenza basato su evdev (solo Linux)
+Author: MyLuxy
+
+Legge direttamente /dev/input/event*: niente estensione XRecord e
+funziona anche sotto Wayland. Tutti i dispositivi sono multiplexati su un
+solo thread con select.epoll e gli input_event vengono decodificati in
+blocco ad ogni read. Serve l'accesso in lettura ai device (gruppo "input").
+"""
+import fcntl
+import glob
+import os
+import select
+import struct
+import threading
+
+# struct input_event { struct timeval time; __u16 type; __u16 code; __s32 value; }
+INPUT_EVENT = struct.Struct("llHHi")
+READ_EVENTS = 64
+
+EV_SYN = 0x00
+EV_KEY = 0x01
+
+BTN_LEFT = 0x110
+BTN_RIGHT = 0x111
+BTN_MIDDLE = 0x112
+BTN_SIDE = 0x113   # Mouse 4
+BTN_EXTRA = 0x114  # Mouse 5
+
+MOUSE_BUTTONS = {
+    BTN_LEFT: "left",
+    BTN_RIGHT: "right",
+    BTN_MIDDLE: "middle",
+    BTN_SIDE: "x1",
+    BTN_EXTRA: "x2",
+}
+
+# Codici KEY_* -> nome pynput.keyboard.Key
+SPECIAL_KEYS = {
+    1: "esc", 14: "backspace", 15: "tab", 28: "enter", 29: "ctrl_l", 42: "shift",
+    54: "shift_r", 56: "alt_l", 57: "space", 58: "caps_lock", 69: "num_lock",
+    70: "scroll_lock", 97: "ctrl_r", 100: "alt_r", 102: "home", 103: "up",
+    104: "page_up", 105: "left", 106: "right", 107: "end", 108: "down",
+    109: "page_down", 110: "insert", 111: "delete", 119: "pause", 125: "cmd",
+    126: "cmd_r", 87: "f11", 88: "f12",
+}
+SPECIAL_KEYS.update({59 + i: f"f{i + 1}" for i in range(10)})
+SPECIAL_KEYS.update({183 + i: f"f{i + 13}" for i in range(12)})
+
+# Codici KEY_* -> carattere (layout US)
+CHAR_KEYS = {}
+for _start, _chars in ((2, "1234567890-="), (16, "qwertyuiop[]"), (30, "asdfghjkl;'`"),
+                       (43, "\\zxcvbnm,./")):
+    CHAR_KEYS.update({_start + i: c for i, c in enumerate(_chars)})
+
+# Valori di EV_KEY
+KEY_UP = 0
+KEY_DOWN = 1
+KEY_REPEAT = 2
+
+
+def _ioc(direction, kind, number, size):
+    return (direction << 30) | (size << 16) | (ord(kind) << 8) | number
+
+
+def EVIOCGBIT(ev, length):
+    return _ioc(2, "E", 0x20 + ev, length)
+
+
+def has_key_events(fd):
+    """True se il device dichiara eventi EV_KEY (tastiere, mouse)"""
+    buf = bytearray(4)
+    try:
+        fcntl.ioctl(fd, EVIOCGBIT(0, len(buf)), buf)
+    except OSError:
+        return False
+    return bool(int.from_bytes(buf, "little") & (1 << EV_KEY))
+
+
+def to_pynput_key(code):
+    """Converte un codice KEY_* nell'oggetto pynput usato dalle hotkey (None se ignoto)"""
+    from pynput.keyboard import Key, KeyCode
+    name = SPECIAL_KEYS.get(code)
+    if name is not None:
+        return getattr(Key, name, None)
+    char = CHAR_KEYS.get(code)
+    return KeyCode.from_char(char) if char else None
+
+
+def to_pynput_button(code):
+    from pynput.mouse import Button
+    return getattr(Button, MOUSE_BUTTONS[code])
+
+
+class EvdevListener:
+    """Listener unico per tastiere e mouse con la stessa firma dei callback pynput.
+
+    on_press(key) / on_release(key) e on_click(x, y, button, pressed): la
+    posizione non è nota a livello evdev, quindi x e y valgono sempre 0.
+    """
+    def __init__(self, on_press=None, on_release=None, on_click=None, on_raw=None,
+                 paths=None, key_factory=to_pynput_key, button_factory=to_pynput_button):
+        self.on_press = on_press
+        self.on_release = on_release
+        self.on_click = on_click
+        # on_raw(sec, usec, type, code, value): usato da benchmark e test
+        self.on_raw = on_raw
+        self.key_factory = key_factory
+        self.button_factory = button_factory
+        self.paths = paths
+        self.devices = {}
+        self._epoll = None
+        self._wake_r, self._wake_w = None, None
+        self._thread = None
+        self._keys = {}
+        self._buttons = {}
+
+    def open_devices(self):
+        paths = self.paths if self.paths is not None else sorted(glob.glob("/dev/input/event*"))
+        errors = []
+        for path in paths:
+            try:
+                fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+            except OSError as e:
+                errors.append(e)
+                continue
+            if has_key_events(fd):
+                self.devices[fd] = path
+            else:
+                os.close(fd)
+        if not self.devices:
+            if errors:
+                raise errors[0]
+            raise OSError("Nessun dispositivo di input evdev disponibile")
+
+    def start(self):
+        self.open_devices()
+        self._epoll = select.epoll()
+        for fd in self.devices:
+            self._epoll.register(fd, select.EPOLLIN)
+        self._wake_r, self._wake_w = os.pipe()
+        self._epoll.register(self._wake_r, select.EPOLLIN)
+        self._thread = threading.Thread(target=self._run, name="VetoEvdevListener", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._wake_w is not None:
+            os.write(self._wake_w, b"x")
+        if self._thread is not None:
+            self._thread.join(1.0)
+
+    def _close(self):
+        for fd in self.devices:
+            os.close(fd)
+        self.devices.clear()
+        self._epoll.close()
+        os.close(self._wake_r)
+        os.close(self._wake_w)
+        self._wake_w = None
+
+    def _drop(self, fd):
+        """Dispositivo scollegato: lo rimuove dal multiplexing"""
+        self._epoll.unregister(fd)
+        self.devices.pop(fd, None)
+        os.close(fd)
+
+    def _dispatch(self, data):
+        on_raw = self.on_raw
+        for sec, usec, ev_type, code, value in INPUT_EVENT.iter_unpack(data):
+            if on_raw:
+                on_raw(sec, usec, ev_type, code, value)
+            if ev_type != EV_KEY or value == KEY_REPEAT:
+                continue
+            pressed = value == KEY_DOWN
+            if code in MOUSE_BUTTONS:
+                if self.on_click:
+                    button = self._buttons.get(code)
+                    if button is None:
+                        button = self._buttons[code] = self.button_factory(code)
+                    self.on_click(0, 0, button, pressed)
+                continue
+            if code not in self._keys:
+                self._keys[code] = self.key_factory(code)
+            key = self._keys[code]
+            if key is None:
+                continue
+            callback = self.on_press if pressed else self.on_release
+            if callback:
+                callback(key)
+
+    def _run(self):
+        size = INPUT_EVENT.size * READ_EVENTS
+        try:
+            while True:
+                for fd, mask in self._epoll.poll():
+                    if fd == self._wake_r:
+                        return
+                    if mask & (select.EPOLLERR | select.EPOLLHUP):
+                        self._drop(fd)
+                        continue
+                    try:
+                        data = os.read(fd, size)
+                    except BlockingIOError:
+                        continue
+                    except OSError:
+                        self._drop(fd)
+                        continue
+                    self._dispatch(data)
+        finally:
+            self._close()
+
+
+# --- Dispositivi virtuali uinput (test e benchmark) ---
+UI_SET_EVBIT = _ioc(1, "U", 100, 4)
+UI_SET_KEYBIT = _ioc(1, "U", 101, 4)
+UI_DEV_CREATE = _ioc(0, "U", 1, 0)
+UI_DEV_DESTROY = _ioc(0, "U", 2, 0)
+# struct uinput_setup { struct input_id id; char name[80]; __u32 ff_effects_max; }
+UINPUT_SETUP = struct.Struct("HHHH80sI")
+UI_DEV_SETUP = _ioc(1, "U", 3, UINPUT_SETUP.size)
+BUS_VIRTUAL = 0x06
+
+
+class VirtualInputDevice:
+    """Dispositivo virtuale creato via /dev/uinput che emette tasti e pulsanti"""
+    def __init__(self, name="Veto virtual input", codes=tuple(MOUSE_BUTTONS) + tuple(SPECIAL_KEYS)):
+        self.fd = os.open("/dev/uinput", os.O_WRONLY | os.O_NONBLOCK)
+        try:
+            fcntl.ioctl(self.fd, UI_SET_EVBIT, EV_KEY)
+            for code in codes:
+                fcntl.ioctl(self.fd, UI_SET_KEYBIT, code)
+            fcntl.ioctl(self.fd, UI_DEV_SETUP,
+                        UINPUT_SETUP.pack(BUS_VIRTUAL, 0x1234, 0x5678, 1, name.encode()[:79], 0))
+            fcntl.ioctl(self.fd, UI_DEV_CREATE)
+        except OSError:
+            os.close(self.fd)
+            raise
+        self.path = self._find_node(name)
+
+    @staticmethod
+    def _find_node(name):
+        for sys_dir in glob.glob("/sys/class/input/event*"):
+            try:
+                with open(os.path.join(sys_dir, "device", "name")) as f:
+                    if f.read().strip() == name:
+                        return os.path.join("/dev/input", os.path.basename(sys_dir))
+            except OSError:
+                continue
+        return None
+
+    def emit(self, code, value):
+        """Scrive un EV_KEY seguito da SYN_REPORT in una sola write"""
+        os.write(self.fd, INPUT_EVENT.pack(0, 0, EV_KEY, code, value) + INPUT_EVENT.pack(0, 0, EV_SYN, 0, 0))
+
+    def close(self):
+        fcntl.ioctl(self.fd, UI_DEV_DESTROY)
+        os.close(self.fd)
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Veto - Log binario degli eventi di click per l'analisi post-partita
+Author: MyLuxy
+
+Il motore e i listener scrivono record a lunghezza fissa in ring buffer
+preallocati (un ring per thread produttore, nessuna allocazione e nessun
+lock per evento); un thread in background li scarica su file binari a
+rotazione. I file si convertono in CSV o JSON con:
+
+    python veto_eventlog.py logs/clicks-*.vlog [--json]
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import struct
+import sys
+import threading
+import time
+
+from veto_recorder import BUTTON_CODES, BUTTON_NAMES
+from veto_timing import now_ns
+
+MAGIC = b"VETOLOG\x00"
+VERSION = 1
+
+# magic, versione, dimensione record, riservato, ora di sistema e now_ns all'apertura del file
+HEADER = struct.Struct("<8sHHIqq")
+# t_ns (now_ns), tipo, slot, pulsante
+RECORD = struct.Struct("<QBBB5x")
+
+# Tipi di evento
+EV_CLICK = 1         # click sintetico
+EV_PRESS = 2         # pressione sintetica (hold "Break")
+EV_RELEASE = 3       # rilascio sintetico
+EV_TRIGGER_DOWN = 4  # pulsante fisico premuto
+EV_TRIGGER_UP = 5    # pulsante fisico rilasciato
+
+EVENT_NAMES = {
+    EV_CLICK: "click", EV_PRESS: "press", EV_RELEASE: "release",
+    EV_TRIGGER_DOWN: "trigger_down", EV_TRIGGER_UP: "trigger_up",
+}
+
+NO_SLOT = 255
+
+RING_RECORDS = 16384
+FLUSH_INTERVAL_S = 0.5
+MAX_FILE_BYTES = 8 * 1024 * 1024
+MAX_FILES = 8
+
+
+class LogRing:
+    """Ring preallocato con un solo scrittore; il flusher legge fino alla testa"""
+    def __init__(self, capacity=RING_RECORDS):
+        self.capacity = capacity
+        self.buffer = bytearray(RECORD.size * capacity)
+        self.head = 0  # record scritti
+        self.tail = 0  # record già scaricati (solo il flusher lo modifica)
+        self.dropped = 0
+
+    def append(self, kind, slot, button, t_ns):
+        head = self.head
+        RECORD.pack_into(self.buffer, (head % self.capacity) * RECORD.size,
+                         t_ns, kind, slot, BUTTON_CODES.get(button, 0))
+        # La testa avanza dopo il record: il flusher non vede record a metà
+        self.head = head + 1
+
+    def take(self):
+        """Copia i record non ancora scaricati (chiamato solo dal flusher)"""
+        head = self.head
+        start = max(self.tail, head - self.capacity)
+        self.dropped += start - self.tail
+        size, capacity = RECORD.size, self.capacity
+        a, b = start % capacity, head % capacity
+        if head - start == 0:
+            data = b""
+        elif a < b:
+            data = bytes(self.buffer[a * size:b * size])
+        else:
+            data = bytes(self.buffer[a * size:]) + bytes(self.buffer[:b * size])
+        # Record sovrascritti dallo scrittore durante la copia: scartati
+        lapped = self.head - capacity - start
+        if lapped > 0:
+            data = data[lapped * size:]
+            self.dropped += lapped
+        self.tail = head
+        return data
+
+
+class EventLog:
+    """Ring per produttore + thread che scarica su file a rotazione in `directory`"""
+    def __init__(self, directory, max_bytes=MAX_FILE_BYTES, max_files=MAX_FILES,
+                 flush_interval=FLUSH_INTERVAL_S, capacity=RING_RECORDS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.flush_interval = flush_interval
+        self.capacity = capacity
+        self.rings = {}
+        self.written = 0
+        self._file = None
+        self._file_bytes = 0
+        self._sequence = 0
+        self._files = {}  # file aperti da questo log -> sequenza
+        self._stop = threading.Event()
+        self._thread = None
+
+    def ring(self, name):
+        """Ring dedicato a un thread produttore (motore, listener...)"""
+        if name not in self.rings:
+            self.rings = {**self.rings, name: LogRing(self.capacity)}
+        return self.rings[name]
+
+    @property
+    def dropped(self):
+        return sum(ring.dropped for ring in self.rings.values())
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="VetoEventLog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(2.0)
+            self._thread = None
+
+    def _run(self):
+        try:
+            while not self._stop.wait(self.flush_interval):
+                self.flush()
+            self.flush()
+        finally:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def flush(self):
+        """Scarica tutti i ring su disco (thread del flusher)"""
+        for ring in list(self.rings.values()):
+            data = ring.take()
+            if data:
+                self._write(data)
+
+    def _write(self, data):
+        if self._file is None or self._file_bytes >= self.max_bytes:
+            self._rotate()
+        self._file.write(data)
+        self._file.flush()
+        self._file_bytes += len(data)
+        self.written += len(data) // RECORD.size
+
+    def _rotate(self):
+        if self._file:
+            self._file.close()
+        self._sequence += 1
+        name = time.strftime("clicks-%Y%m%d-%H%M%S") + f"-{self._sequence}.vlog"
+        path = os.path.join(self.directory, name)
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, VERSION, RECORD.size, 0, time.time_ns(), now_ns()))
+        self._file_bytes = HEADER.size
+        self._files[path] = self._sequence
+        # Tiene solo gli ultimi max_files file: quelli di esecuzioni precedenti per mtime, poi i
+        # propri per sequenza (l'mtime ha risoluzione grossolana e non distingue rotazioni rapide)
+        files = sorted(glob.glob(os.path.join(self.directory, "clicks-*.vlog")),
+                       key=lambda f: (self._files.get(f, 0), os.path.getmtime(f)))
+        for old in files[:-self.max_files]:
+            self._files.pop(old, None)
+            try:
+                os.unlink(old)
+            except OSError:
+                pass
+
+
+def read_log(path):
+    """Generatore di dict (evento) da un file .vlog, in ordine di tempo"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        return
+    magic, version, record_size, _, wall_ns, mono_ns = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+        raise ValueError(f"File di log non valido: {path}")
+    n = (len(data) - HEADER.size) // RECORD.size
+    records = sorted(RECORD.iter_unpack(memoryview(data)[HEADER.size:HEADER.size + n * RECORD.size]))
+    for t_ns, kind, slot, button in records:
+        yield {
+            "t_ns": t_ns,
+            "wall_ns": wall_ns + t_ns - mono_ns,
+            "event": EVENT_NAMES.get(kind, str(kind)),
+            "slot": None if slot == NO_SLOT else slot,
+            "button": BUTTON_NAMES.get(button, ""),
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Converte i log .vlog di Veto in CSV o JSON")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--json", action="store_true", help="una riga JSON per evento invece del CSV")
+    args = parser.parse_args(argv)
+    fields = ("t_ns", "wall_ns", "event", "slot", "button")
+    writer = None if args.json else csv.DictWriter(sys.stdout, fieldnames=fields)
+    if writer:
+        writer.writeheader()
+    for path in args.paths:
+        for event in read_log(path):
+            if writer:
+                writer.writerow(event)
+            else:
+                print(json.dumps(event))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Veto - Registro delle macro
+Author: MyLuxy
+
+Ogni macro è descritta da un MacroSpec: il motore assegna uno slot a
+ciascuna voce (nell'ordine del registro) e la GUI genera la sezione
+corrispondente. Le macro aggiuntive si definiscono in settings.json:
+
+    "macro_definitions": [
+        {"key": "middle", "label": "Middle", "kind": "click", "button": "middle"},
+        {"key": "side", "label": "Side", "kind": "hold", "button": "x1"},
+        {"key": "targets", "kind": "click", "button": "left", "trigger": "x2",
+         "targets": [[640, 360], [800, 360, 40, 20]], "jitter": 3}
+    ]
+
+Una macro di click con "targets" clicca a turno i punti [x, y] o le
+regioni [x, y, larghezza, altezza] invece della posizione del cursore;
+"jitter" sposta ogni punto a caso di al massimo tanti pixel.
+
+"pattern" sostituisce i click a ritmo costante con una sequenza scriptata
+(veto_patterns), compilata qui una volta sola:
+
+    {"key": "combo", "trigger": "x1", "hotkey": "F8",
+     "pattern": "3 clicks at 12 cps, hold 250 ms, release, wait 80-120 ms, repeat"}
+
+Con "button": "key:<tasto>" la macro ripete un tasto o una combinazione
+("key:e", "key:ctrl+e") con la stessa temporizzazione dei click: le
+macro di click lo ripetono mentre il "trigger" (obbligatorio) è tenuto,
+quelle hold finché sono armate.
+
+    {"key": "spam", "label": "Spam E", "kind": "hold", "button": "key:e", "hotkey": "F9"}
+
+"display" (es. ":1") lega la macro a un altro server X (o Xvfb): le macro
+di più client di gioco girano nello stesso processo e nello stesso
+scheduler, ciascun display con la propria connessione di iniezione.
+"""
+from veto_backends import BUTTON_NAMES, is_key, key_button, parse_key_combo
+from veto_patterns import compile_pattern
+from veto_state import KIND_CLICK, KIND_HOLD
+
+
+class MacroSpec:
+    """Definizione di una macro: pulsante iniettato, pulsante fisico che la attiva e tipo.
+
+    Per le macro di click `trigger` è il pulsante che, tenuto premuto, fa
+    partire i click (di default lo stesso pulsante iniettato, obbligatorio se
+    button è un tasto "key:..."); le macro hold si attivano solo tramite hotkey
+    e non accettano un trigger.
+    """
+    __slots__ = ("key", "label", "kind", "button", "trigger", "hotkey", "optional", "targets", "jitter", "display",
+                 "pattern", "ops")
+
+    def __init__(self, key, label=None, kind=KIND_CLICK, button="left", trigger=None,
+                 hotkey="None", optional=True, targets=(), jitter=0, display=None,
+                 pattern=None):
+        if kind not in (KIND_CLICK, KIND_HOLD):
+            raise ValueError(f"Tipo di macro sconosciuto: {kind}")
+        if is_key(button):
+            button = key_button(parse_key_combo(button))  # ValueError se la sintassi non è valida
+        elif button not in BUTTON_NAMES:
+            raise ValueError(f"Pulsante sconosciuto: {button}")
+        if kind == KIND_CLICK:
+            trigger = trigger or button
+            if trigger not in BUTTON_NAMES:
+                raise ValueError(f"Pulsante di attivazione sconosciuto: {trigger}")
+        elif trigger:
+            raise ValueError("Le macro hold si attivano solo tramite hotkey: trigger non ammesso")
+        if (targets or pattern) and kind != KIND_CLICK:
+            raise ValueError("Solo le macro di click hanno bersagli e pattern")
+        if targets and is_key(button):
+            raise ValueError("Le macro da tastiera non hanno bersagli")
+        self.targets = tuple(parse_target(target) for target in targets)
+        self.jitter = max(0, int(jitter))
+        self.display = str(display) if display else None  # None = display della GUI
+        self.pattern = pattern or None
+        self.ops = compile_pattern(pattern) if pattern else ()  # ValueError se il testo non è valido
+        self.key = key
+        self.label = label or key.capitalize()
+        self.kind = kind
+        self.button = button
+        self.trigger = trigger
+        self.hotkey = hotkey  # hotkey predefinita (stringa come in settings.json)
+        self.optional = optional  # False = sempre abilitata, senza checkbox
+
+    def regions(self):
+        """Bersagli come regioni (x, y, w, h) per lo scheduler, con il jitter già applicato"""
+        return target_regions(self.targets, self.jitter)
+
+    def to_dict(self):
+        data = {"key": self.key, "label": self.label, "kind": self.kind,
+                "button": self.button, "trigger": self.trigger}
+        if self.targets:
+            data["targets"] = [list(t[:2]) if t[2:] == (1, 1) else list(t) for t in self.targets]
+            data["jitter"] = self.jitter
+        if self.display:
+            data["display"] = self.display
+        if self.pattern:
+            data["pattern"] = self.pattern
+        return data
+
+
+def parse_target(target):
+    """[x, y] (punto) o [x, y, larghezza, altezza] (regione) -> (x, y, w, h)"""
+    values = tuple(int(v) for v in target)
+    if len(values) == 2:
+        return values + (1, 1)
+    if len(values) == 4 and values[2] > 0 and values[3] > 0:
+        return values
+    raise ValueError(f"Bersaglio non valido: {target!r}")
+
+
+def target_regions(targets, jitter=0):
+    """Bersagli -> regioni (x, y, w, h) allargate di `jitter` pixel per lato"""
+    j = max(0, int(jitter))
+    return [(x - j, y - j, w + 2 * j, h + 2 * j) for x, y, w, h in map(parse_target, targets)]
+
+
+DEFAULT_MACROS = (
+    MacroSpec("left", "Left", KIND_CLICK, "left", hotkey="F6", optional=False),
+    MacroSpec("right", "Right", KIND_CLICK, "right"),
+    MacroSpec("hold", "Hold", KIND_HOLD, "left"),
+)
+
+
+def build_registry(definitions=()):
+    """Macro predefinite seguite da quelle definite dall'utente (le voci non valide sono ignorate)"""
+    specs = list(DEFAULT_MACROS)
+    keys = {spec.key for spec in specs}
+    for entry in definitions or ():
+        try:
+            spec = MacroSpec(
+                str(entry["key"]), entry.get("label"), entry.get("kind", KIND_CLICK),
+                entry.get("button", "left"), entry.get("trigger"), entry.get("hotkey", "None"),
+                targets=entry.get("targets", ()), jitter=entry.get("jitter", 0), display=entry.get("display"),
+                pattern=entry.get("pattern")
+            )
+        except (KeyError, TypeError, AttributeError, ValueError) as e:
+            print(f"Macro non valida {entry!r}: {e}")
+            continue
+        if spec.key in keys:
+            print(f"Macro duplicata ignorata: {spec.key}")
+            continue
+        keys.add(spec.key)
+        specs.append(spec)
+    return specs
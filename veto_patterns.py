@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Veto - Pattern di click scriptati (mini linguaggio)
+Author: MyLuxy
+
+Un pattern è una sequenza di istruzioni separate da virgola, punto e
+virgola o a capo:
+
+    3 clicks at 12 cps, hold 250 ms, release, wait 80-120 ms, repeat
+
+    click | N clicks [at C cps | at A-B cps]   click (con attesa 1/CPS dopo ognuno)
+    press | hold [durata]                      preme il pulsante e attende
+    release                                    rilascia il pulsante
+    wait durata                                attende
+    repeat [N times]                           ricomincia (sempre, o N esecuzioni in tutto)
+
+Le durate sono "250 ms", "0.5 s" o intervalli casuali "80-120 ms". Il
+testo viene validato e compilato una sola volta in una tupla piatta di
+terne (azione, durata minima ns, durata massima ns) che lo scheduler
+scorre senza interpretare testo.
+"""
+import re
+
+OP_CLICK = 1
+OP_PRESS = 2
+OP_RELEASE = 3
+OP_WAIT = 4
+OP_REPEAT = 5  # durata minima = esecuzioni totali (0 = per sempre)
+
+OP_SIZE = 3
+
+MAX_DURATION_NS = 60 * 10**9
+MAX_CLICKS = 1000
+MAX_CPS = 1000
+
+_NUMBER = r"(\d+(?:\.\d+)?)"
+_DURATION = re.compile(rf"^{_NUMBER}\s*(?:[-–]\s*{_NUMBER})?\s*(ms|s)$")
+_CLICKS = re.compile(rf"^(?:(\d+)\s+)?clicks?(?:\s+at\s+{_NUMBER}\s*(?:[-–]\s*{_NUMBER})?\s*cps)?$")
+_REPEAT = re.compile(r"^repeat(?:\s+(\d+)\s+times?)?$")
+_SEPARATORS = re.compile(r"[,;\n]")
+
+
+def parse_duration(text):
+    """"250 ms", "0.5 s", "80-120 ms" -> (minimo, massimo) in ns"""
+    match = _DURATION.match(text.strip())
+    if not match:
+        raise ValueError(f"Durata non valida: {text!r}")
+    low, high, unit = match.groups()
+    scale = 10**6 if unit == "ms" else 10**9
+    low_ns = round(float(low) * scale)
+    high_ns = round(float(high) * scale) if high else low_ns
+    if high_ns < low_ns or high_ns > MAX_DURATION_NS:
+        raise ValueError(f"Durata non valida: {text!r}")
+    return low_ns, high_ns
+
+
+def compile_pattern(text):
+    """Valida e compila un pattern nella tupla piatta di terne (azione, min ns, max ns)"""
+    ops = []
+    pressed = False
+    statements = [s.strip().lower() for s in _SEPARATORS.split(text) if s.strip()]
+    if not statements:
+        raise ValueError("Pattern vuoto")
+    for index, statement in enumerate(statements):
+        word, _, rest = statement.partition(" ")
+        clicks = _CLICKS.match(statement)
+        repeat = _REPEAT.match(statement)
+        if clicks:
+            count, low_cps, high_cps = clicks.groups()
+            count = int(count or 1)
+            if not 1 <= count <= MAX_CLICKS:
+                raise ValueError(f"Numero di click non valido: {statement!r}")
+            if pressed:
+                raise ValueError(f"Click con il pulsante tenuto premuto: {statement!r}")
+            low, high = 0, 0
+            if low_cps:
+                low_cps = float(low_cps)
+                high_cps = float(high_cps) if high_cps else low_cps
+                if not 0 < low_cps <= high_cps <= MAX_CPS:
+                    raise ValueError(f"CPS non validi: {statement!r}")
+                low, high = round(1e9 / high_cps), round(1e9 / low_cps)
+            ops.extend((OP_CLICK, low, high) * count)
+        elif word in ("press", "hold"):
+            if pressed:
+                raise ValueError(f"Pulsante già premuto: {statement!r}")
+            ops.extend((OP_PRESS,) + (parse_duration(rest) if rest else (0, 0)))
+            pressed = True
+        elif statement == "release":
+            if not pressed:
+                raise ValueError("release senza press/hold")
+            ops.extend((OP_RELEASE, 0, 0))
+            pressed = False
+        elif word == "wait":
+            ops.extend((OP_WAIT,) + parse_duration(rest))
+        elif repeat:
+            if index != len(statements) - 1:
+                raise ValueError("repeat deve essere l'ultima istruzione")
+            runs = int(repeat.group(1) or 0)
+            if repeat.group(1) and runs < 1:
+                raise ValueError(f"Ripetizioni non valide: {statement!r}")
+            if not runs and not any(ops[i + 2] for i in range(0, len(ops), OP_SIZE)):
+                raise ValueError("Un pattern ripetuto per sempre deve contenere almeno un'attesa")
+            if pressed:
+                # Ogni giro ricomincia con il pulsante rilasciato
+                ops.extend((OP_RELEASE, 0, 0))
+                pressed = False
+            ops.extend((OP_REPEAT, runs, runs))
+        else:
+            raise ValueError(f"Istruzione sconosciuta: {statement!r}")
+    if pressed:
+        ops.extend((OP_RELEASE, 0, 0))
+    return tuple(ops)
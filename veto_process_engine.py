@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Veto - Motore di click isolato in un processo separato
+Author: MyLuxy
+
+La GUI e i listener controllano il motore tramite un piccolo blocco in
+memoria condivisa (flag armed/held e configurazione per slot) protetto da
+un contatore di versione in stile seqlock. Il processo motore non condivide
+il GIL con Tk, customtkinter e i listener pynput.
+"""
+import multiprocessing as mp
+import struct
+import threading
+import time
+from multiprocessing.shared_memory import SharedMemory
+
+from veto_backends import PynputBackend, display_backends
+from veto_distributions import DISTRIBUTIONS, TABLE_SIZE, IntervalTable
+from veto_engine import Scheduler, HOLD_SINGLE
+from veto_macros import DEFAULT_MACROS
+from veto_sched import apply_engine_tuning
+from veto_timing import now_ns, wait_until
+
+DISTRIBUTION_KEYS = tuple(DISTRIBUTIONS)
+
+# seq (seqlock), running, injecting
+HEADER = struct.Struct("<IBB2x")
+# enabled, armed, running, randomize, distribution, mode, min_cps, max_cps,
+# burst_count, burst_spacing_us, burst_cooldown_ms, tick_rate, tick_phase_us, tick_per_tick, tick_offset_pct,
+# rate_control
+SLOT = struct.Struct("<6B2xHHHIHHIBBB")
+RING_SIZE = 1024
+# timestamp del click, slot
+RING = struct.Struct("<QI4x")
+# media, deviazione standard e valori della tabella degli intervalli compilata dalla GUI
+TABLE = struct.Struct(f"<dd{TABLE_SIZE}d")
+
+SLOTS_OFFSET = HEADER.size
+
+
+class ControlBlock:
+    """Blocco di controllo in memoria condivisa.
+
+    La GUI è l'unico scrittore della configurazione (seq dispari = scrittura
+    in corso), il motore è l'unico scrittore di statistiche e ring. Con la
+    configurazione la GUI scrive anche la tabella degli intervalli già
+    compilata, con una versione per slot: il motore la copia invece di
+    ricompilarla nel proprio loop.
+    """
+    def __init__(self, slot_count, name=None):
+        self.slot_count = slot_count
+        # click totali per slot + testa del ring dei timestamp
+        self.stats = struct.Struct(f"<{slot_count}QQ")
+        self.stats_offset = SLOTS_OFFSET + SLOT.size * slot_count
+        self.ring_offset = self.stats_offset + self.stats.size
+        # versione della tabella di ogni slot, poi le tabelle
+        self.gens = struct.Struct(f"<{slot_count}I")
+        self.gens_offset = self.ring_offset + RING.size * RING_SIZE
+        self.tables_offset = self.gens_offset + self.gens.size
+        size = self.tables_offset + TABLE.size * slot_count
+        if name is None:
+            self.shm = SharedMemory(create=True, size=size)
+            self.shm.buf[:size] = bytes(size)
+        else:
+            # Il figlio (spawn) condivide il resource tracker della GUI, che resta proprietaria
+            self.shm = SharedMemory(name=name)
+        self.name = self.shm.name
+        self.buf = self.shm.buf
+        self._write_lock = threading.Lock()
+        self._tables = [None] * slot_count  # ultima tabella scritta per slot (lato GUI)
+
+    def close(self, unlink=False):
+        self.buf = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+    # --- Lato GUI (scrittore) ---
+    def _begin(self):
+        seq = HEADER.unpack_from(self.buf)[0]
+        struct.pack_into("<I", self.buf, 0, (seq + 1) & 0xFFFFFFFF)
+        return seq
+
+    def _end(self, seq):
+        struct.pack_into("<I", self.buf, 0, (seq + 2) & 0xFFFFFFFF)
+
+    def write_slot(self, slot, enabled, armed, running, randomize, distribution, mode, *timing, table=None):
+        """timing: min_cps, max_cps, parametri burst e tick nell'ordine di SLOT; table la IntervalTable compilata"""
+        with self._write_lock:
+            seq = self._begin()
+            SLOT.pack_into(self.buf, SLOTS_OFFSET + slot * SLOT.size,
+                           enabled, armed, running, randomize, distribution, mode, *timing)
+            if table is not None and table is not self._tables[slot]:
+                self._tables[slot] = table
+                TABLE.pack_into(self.buf, self.tables_offset + slot * TABLE.size, table.mean, table.std, *table.values)
+                gens = list(self.gens.unpack_from(self.buf, self.gens_offset))
+                gens[slot] = (gens[slot] + 1) & 0xFFFFFFFF
+                self.gens.pack_into(self.buf, self.gens_offset, *gens)
+            self._end(seq)
+
+    def set_running_slot(self, slot, running):
+        """Percorso caldo: aggiorna un solo byte"""
+        with self._write_lock:
+            seq = self._begin()
+            self.buf[SLOTS_OFFSET + slot * SLOT.size + 2] = 1 if running else 0
+            self._end(seq)
+
+    def set_running(self, running):
+        self.buf[4] = 1 if running else 0
+
+    # --- Lato motore (lettore) ---
+    @property
+    def running(self):
+        return self.buf[4] == 1
+
+    @property
+    def injecting(self):
+        return self.buf[5] == 1
+
+    def set_injecting(self, injecting):
+        self.buf[5] = 1 if injecting else 0
+
+    def snapshot(self, known):
+        """Copia coerente di tutti gli slot (ritenta se lo scrittore era a metà).
+
+        known sono le versioni delle tabelle già lette: restituisce (byte
+        impacchettati di ogni slot, {slot: (versione, media, std, valori)})
+        con le sole tabelle nuove.
+        """
+        buf = self.buf
+        while True:
+            seq = HEADER.unpack_from(buf)[0]
+            if seq & 1:
+                # Scrittura in corso: cede la CPU (e il GIL, con il motore in un thread) allo scrittore
+                time.sleep(0)
+                continue
+            slots = [bytes(buf[SLOTS_OFFSET + i * SLOT.size:SLOTS_OFFSET + (i + 1) * SLOT.size])
+                     for i in range(self.slot_count)]
+            tables = {}
+            for i, gen in enumerate(self.gens.unpack_from(buf, self.gens_offset)):
+                if gen != known[i]:
+                    mean, std, *values = TABLE.unpack_from(buf, self.tables_offset + i * TABLE.size)
+                    tables[i] = (gen, mean, std, values)
+            if HEADER.unpack_from(buf)[0] == seq:
+                return slots, tables
+
+    def record_click(self, slot, t_ns):
+        stats = list(self.stats.unpack_from(self.buf, self.stats_offset))
+        stats[slot] += 1
+        head = stats[-1]
+        RING.pack_into(self.buf, self.ring_offset + (head % RING_SIZE) * RING.size, t_ns, slot)
+        stats[-1] = head + 1
+        self.stats.pack_into(self.buf, self.stats_offset, *stats)
+
+    def clicks(self):
+        return self.stats.unpack_from(self.buf, self.stats_offset)[:-1]
+
+    def recent_clicks(self):
+        """Timestamp (ns) degli ultimi click, dal più vecchio al più recente"""
+        head = self.stats.unpack_from(self.buf, self.stats_offset)[-1]
+        start = max(0, head - RING_SIZE)
+        return [RING.unpack_from(self.buf, self.ring_offset + (i % RING_SIZE) * RING.size)[0]
+                for i in range(start, head)]
+
+    def clicks_since(self, cursor):
+        """(nuovo cursore, [(timestamp, slot), ...]) dei click successivi a cursor"""
+        head = self.stats.unpack_from(self.buf, self.stats_offset)[-1]
+        start = max(cursor, head - RING_SIZE)
+        return head, [RING.unpack_from(self.buf, self.ring_offset + (i % RING_SIZE) * RING.size)
+                      for i in range(start, head)]
+
+
+def run_engine(block, doorbell, backends, buttons):
+    """Loop del processo motore: rilegge il blocco condiviso e fa avanzare lo Scheduler.
+
+    buttons e backends contengono pulsante e backend di ogni slot, nell'ordine del registro.
+    """
+    scheduler = Scheduler(backends[0], on_inject=block.set_injecting, on_click=block.record_click)
+    runtimes = [scheduler.add(i, buttons[i], backends[i]) for i in range(block.slot_count)]
+    gens = [0] * block.slot_count
+    packed = [None] * block.slot_count  # byte di ogni slot già applicati
+    while block.running:
+        doorbell.clear()
+        slots, tables = block.snapshot(gens)
+        for i, (runtime, data) in enumerate(zip(runtimes, slots)):
+            # Il campanello suona per qualunque slot: si toccano solo quelli cambiati
+            if data == packed[i] and i not in tables:
+                continue
+            packed[i] = data
+            enabled, armed, running, randomize, dist, mode, *timing = SLOT.unpack(data)
+            table = None
+            if i in tables:
+                gens[i], mean, std, values = tables[i]
+                table = IntervalTable.restore(DISTRIBUTION_KEYS[dist], values, mean, std)
+            # Senza tabella dalla GUI (update_slot senza table) lo Scheduler la compila da sé
+            scheduler.configure(runtime, (bool(randomize), DISTRIBUTION_KEYS[dist], mode, *timing), table)
+            scheduler.set_running(runtime, bool(enabled and armed and running))
+        wait_until(scheduler.step(now_ns()), doorbell)
+    scheduler.release_all()
+
+
+def tuned_engine(block, doorbell, backends, buttons, tuning=None):
+    """Applica affinità/priorità/timer slack al thread motore, poi esegue il loop"""
+    if tuning:
+        report = apply_engine_tuning(tuning)
+        if report:
+            print(f"Tuning motore: {report}")
+    run_engine(block, doorbell, backends, buttons)
+
+
+def engine_main(block_name, doorbell, buttons, backend_factory=PynputBackend, tuning=None, displays=None):
+    """Entry point del processo motore"""
+    block = ControlBlock(len(buttons), block_name)
+    try:
+        backends = display_backends(backend_factory, displays or (None,) * len(buttons))
+        tuned_engine(block, doorbell, backends, buttons, tuning)
+    finally:
+        block.close()
+
+
+class EngineHost:
+    """Avvia il motore in un processo separato ("process") o in un thread ("thread").
+
+    buttons elenca il pulsante di ogni slot, nell'ordine del registro delle
+    macro (None = le macro predefinite); displays il display X di ogni slot
+    (None = predefinito).
+    """
+    def __init__(self, host="process", backend_factory=PynputBackend, tuning=None, buttons=None,
+                 displays=None):
+        self.host = host
+        buttons = tuple(buttons or (spec.button for spec in DEFAULT_MACROS))
+        displays = tuple(displays or (None,) * len(buttons))
+        self.block = ControlBlock(len(buttons))
+        self.block.set_running(True)
+        if host == "process":
+            # spawn: niente fork di Tk e delle connessioni X del processo GUI
+            ctx = mp.get_context("spawn")
+            self.doorbell = ctx.Event()
+            self.worker = ctx.Process(
+                target=engine_main, args=(self.block.name, self.doorbell, buttons, backend_factory, tuning, displays),
+                name="VetoEngine", daemon=True
+            )
+        else:
+            self.doorbell = threading.Event()
+            self.backends = display_backends(backend_factory, displays)
+            self.worker = threading.Thread(
+                target=tuned_engine, args=(self.block, self.doorbell, self.backends, buttons, tuning),
+                name="VetoEngine", daemon=True
+            )
+
+    def start(self):
+        self.worker.start()
+
+    def stop(self):
+        self.block.set_running(False)
+        self.doorbell.set()
+        self.worker.join(1.0)
+        if self.host == "process" and self.worker.is_alive():
+            self.worker.terminate()
+        self.block.close(unlink=True)
+
+    def update_slot(self, slot, enabled, armed, running, randomize=True, distribution="uniform",
+                    mode=HOLD_SINGLE, min_cps=10, max_cps=15, burst_count=5, burst_spacing_us=8000,
+                    burst_cooldown_ms=0, tick_rate=0, tick_phase_us=0, tick_per_tick=1, tick_offset_pct=50,
+                    rate_control=False, table=None):
+        """table: IntervalTable già compilata per questa configurazione (None = la compila il motore)"""
+        self.block.write_slot(slot, int(enabled), int(armed), int(running), int(randomize),
+                              DISTRIBUTION_KEYS.index(distribution), mode, min_cps, max_cps,
+                              burst_count, burst_spacing_us, burst_cooldown_ms,
+                              tick_rate, tick_phase_us, tick_per_tick, tick_offset_pct, int(rate_control),
+                              table=table)
+        self.doorbell.set()
+
+    def set_running(self, slot, running):
+        self.block.set_running_slot(slot, running)
+        self.doorbell.set()
+
+    @property
+    def injecting(self):
+        return self.block.injecting
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Veto - Registratore e riproduttore di macro di input
+Author: MyLuxy
+
+Formato file (.vrec): header fisso seguito da record a lunghezza fissa,
+quindi un file si può estendere in append e leggere in streaming via mmap.
+"""
+import mmap
+import os
+import struct
+import threading
+
+from veto_timing import now_ns
+
+MAGIC = b"VETOREC\x00"
+VERSION = 1
+
+# magic, versione, dimensione record, riservato
+HEADER = struct.Struct("<8sHHI")
+# t_ns (relativo all'inizio della registrazione), tipo, x, y, codice
+RECORD = struct.Struct("<QB3xiiI")
+
+# Tipi di evento
+EV_MOVE = 1
+EV_BUTTON_DOWN = 2
+EV_BUTTON_UP = 3
+EV_KEY_DOWN = 4
+EV_KEY_UP = 5
+EV_SCROLL = 6  # x, y = dx, dy
+
+# Codifica dei tasti: carattere (unicode) oppure virtual key code
+KEY_CHAR_FLAG = 0x80000000
+
+BUTTON_CODES = {"left": 1, "right": 2, "middle": 3, "x1": 4, "x2": 5}
+BUTTON_NAMES = {code: name for name, code in BUTTON_CODES.items()}
+
+# Numero di record accumulati in memoria prima di scrivere su disco
+FLUSH_RECORDS = 4096
+
+
+def encode_button(button):
+    return BUTTON_CODES.get(getattr(button, "name", ""), 0)
+
+
+def encode_key(key):
+    """Converte un tasto pynput (Key o KeyCode) in un intero a 32 bit"""
+    char = getattr(key, "char", None)
+    if char:
+        return KEY_CHAR_FLAG | ord(char[0])
+    # Key speciale (enum) -> KeyCode associato
+    keycode = getattr(key, "value", key)
+    return getattr(keycode, "vk", None) or 0
+
+
+_special_keys = None
+
+
+def decode_key(code):
+    global _special_keys
+    from pynput.keyboard import Key, KeyCode
+    if code & KEY_CHAR_FLAG:
+        return KeyCode.from_char(chr(code & ~KEY_CHAR_FLAG))
+    if _special_keys is None:
+        _special_keys = {k.value.vk: k for k in Key if getattr(k.value, "vk", None) is not None}
+    return _special_keys.get(code) or KeyCode.from_vk(code)
+
+
+def _check_header(data):
+    magic, version, record_size, _ = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+        raise ValueError("File di registrazione non valido")
+
+
+def count_records(path):
+    return max(0, (os.path.getsize(path) - HEADER.size) // RECORD.size)
+
+
+class MacroRecorder:
+    """Registra eventi di mouse e tastiera in formato binario a record fissi"""
+    def __init__(self, path):
+        self.path = path
+        self.recording = False
+        self.count = 0
+        self._lock = threading.Lock()
+        self._buffer = bytearray(RECORD.size * FLUSH_RECORDS)
+        self._pending = 0
+        self._file = None
+        self._start_ns = 0
+        self._offset_ns = 0
+
+    def start(self):
+        """Apre il file in append; una nuova sessione prosegue dopo l'ultimo evento"""
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        exists = size >= HEADER.size
+        self._offset_ns = 0
+        if exists:
+            with open(self.path, "rb") as f:
+                _check_header(f.read(HEADER.size))
+                n = count_records(self.path)
+                if n:
+                    f.seek(HEADER.size + (n - 1) * RECORD.size)
+                    self._offset_ns = RECORD.unpack(f.read(RECORD.size))[0]
+            # Tronca eventuali record parziali lasciati da una chiusura brusca
+            with open(self.path, "r+b") as f:
+                f.truncate(HEADER.size + n * RECORD.size)
+        # Un file più corto dell'header (creazione interrotta) si riscrive da capo
+        self._file = open(self.path, "ab" if exists else "wb")
+        if not exists:
+            self._file.write(HEADER.pack(MAGIC, VERSION, RECORD.size, 0))
+        self.count = 0
+        self._pending = 0
+        self._start_ns = now_ns()
+        self.recording = True
+
+    def stop(self):
+        with self._lock:
+            self.recording = False
+            self._flush()
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def _flush(self):
+        if self._pending and self._file:
+            self._file.write(memoryview(self._buffer)[:self._pending * RECORD.size])
+            self._pending = 0
+
+    def _append(self, kind, x, y, code):
+        if not self.recording:
+            return
+        with self._lock:
+            if not self.recording:
+                return
+            t = self._offset_ns + now_ns() - self._start_ns
+            RECORD.pack_into(self._buffer, self._pending * RECORD.size, t, kind, int(x), int(y), code)
+            self._pending += 1
+            self.count += 1
+            if self._pending == FLUSH_RECORDS:
+                self._flush()
+
+    # --- Callback da collegare ai listener pynput ---
+    def on_move(self, x, y):
+        self._append(EV_MOVE, x, y, 0)
+
+    def on_click(self, x, y, button, pressed):
+        self._append(EV_BUTTON_DOWN if pressed else EV_BUTTON_UP, x, y, encode_button(button))
+
+    def on_scroll(self, x, y, dx, dy):
+        self._append(EV_SCROLL, dx, dy, 0)
+
+    def on_key_press(self, key):
+        self._append(EV_KEY_DOWN, 0, 0, encode_key(key))
+
+    def on_key_release(self, key):
+        self._append(EV_KEY_UP, 0, 0, encode_key(key))
+
+
+class MacroPlayer:
+    """Riproduce una registrazione tramite il motore di click.
+
+    Il thread motore consuma il file mappato in memoria record per record
+    (memoria costante qualunque sia la durata) e inietta ogni evento alla sua
+    deadline assoluta con i backend del motore, come i click delle macro:
+    l'eco passa dagli stessi filtri (engine.injecting e tasti iniettati).
+    """
+    def __init__(self, path, engine, on_finish=None):
+        self.path = path
+        self.engine = engine
+        self.on_finish = on_finish
+        self.playing = False
+        # Pulsanti e tasti premuti dalla riproduzione: (tipo di rilascio, codice) -> (azione, argomenti)
+        self._held = {}
+
+    def start(self):
+        if self.playing:
+            return
+        self.playing = True
+        self.engine.play(self, self._finished)
+
+    def stop(self):
+        if self.playing:
+            self.engine.stop_playback()
+
+    def _finished(self):
+        self.playing = False
+        if self.on_finish:
+            self.on_finish()
+
+    def events(self):
+        """Generatore (t_ns, tipo, x, y, codice) in streaming dal file mappato"""
+        with open(self.path, "rb") as f:
+            if os.fstat(f.fileno()).st_size <= HEADER.size:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                _check_header(mm)
+                n = (len(mm) - HEADER.size) // RECORD.size
+                view = memoryview(mm)[HEADER.size:HEADER.size + n * RECORD.size]
+                try:
+                    yield from RECORD.iter_unpack(view)
+                finally:
+                    view.release()
+
+    def steps(self, backend, keyboard):
+        """Passi (t_ns, azione, argomenti) per il motore (chiamato dal thread motore).
+
+        Il generatore riprende solo dopo che il motore ha iniettato il passo,
+        quindi i tasti tenuti si aggiornano a iniezione avvenuta.
+        """
+        self._held.clear()
+        for t_ns, kind, x, y, code in self.events():
+            if kind == EV_MOVE:
+                yield t_ns, backend.move, (x, y)
+            elif kind == EV_SCROLL:
+                yield t_ns, backend.scroll, (x, y)
+            elif kind == EV_BUTTON_DOWN or kind == EV_BUTTON_UP:
+                button = BUTTON_NAMES.get(code, "left")
+                yield t_ns, backend.move, (x, y)
+                if kind == EV_BUTTON_DOWN:
+                    yield t_ns, backend.press, (button,)
+                    self._held[(EV_BUTTON_UP, code)] = (backend.release, (button,))
+                else:
+                    yield t_ns, backend.release, (button,)
+                    self._held.pop((EV_BUTTON_UP, code), None)
+            elif kind == EV_KEY_DOWN:
+                key = decode_key(code)
+                yield t_ns, keyboard.press_key, (key,)
+                self._held[(EV_KEY_UP, code)] = (keyboard.release_key, (key,))
+            elif kind == EV_KEY_UP:
+                yield t_ns, keyboard.release_key, (decode_key(code),)
+                self._held.pop((kind, code), None)
+
+    def releases(self):
+        """Rilasci (azione, argomenti), in ordine inverso, di ciò che la riproduzione ha lasciato premuto"""
+        releases = list(reversed(self._held.values()))
+        self._held.clear()
+        return releases
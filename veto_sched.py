@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Veto - Affinità CPU, priorità e timer slack del thread motore (Linux)
+Author: MyLuxy
+
+Tutte le chiamate agiscono sul thread chiamante. Se il sistema le nega
+(permessi, piattaforma) il motore prosegue: ogni impostazione riporta
+semplicemente il proprio esito.
+"""
+import ctypes
+import ctypes.util
+import os
+import sys
+import threading
+
+PR_SET_TIMERSLACK = 29
+PR_GET_TIMERSLACK = 30
+
+POLICIES = {
+    "other": getattr(os, "SCHED_OTHER", None),
+    "fifo": getattr(os, "SCHED_FIFO", None),
+    "rr": getattr(os, "SCHED_RR", None),
+}
+
+# Chiavi in settings.json e valori predefiniti (None = non toccare)
+DEFAULT_TUNING = {
+    "engine_cpus": [],
+    "engine_nice": None,
+    "engine_policy": "other",
+    "engine_rt_priority": 10,
+    "engine_timer_slack_ns": None,
+}
+
+_libc = None
+
+
+def _prctl(option, value):
+    global _libc
+    if _libc is None:
+        _libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    result = _libc.prctl(option, ctypes.c_ulong(value), 0, 0, 0)
+    if result < 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno))
+    return result
+
+
+def get_timer_slack_ns():
+    """Timer slack corrente del thread chiamante (per verificare quello applicato)"""
+    return _prctl(PR_GET_TIMERSLACK, 0)
+
+
+def _apply(report, name, func):
+    try:
+        func()
+        report[name] = "ok"
+    except AttributeError:
+        report[name] = "unsupported"
+    except OSError as e:
+        report[name] = f"denied ({e.strerror or e})"
+    except ValueError as e:
+        report[name] = f"invalid ({e})"
+
+
+def apply_engine_tuning(tuning):
+    """Applica le impostazioni al thread corrente e restituisce l'esito per ciascuna"""
+    report = {}
+    if not sys.platform.startswith("linux"):
+        requested = [key for key in DEFAULT_TUNING if tuning.get(key) != DEFAULT_TUNING[key]]
+        return {key: "unsupported" for key in requested if key != "engine_rt_priority"}
+
+    cpus = tuning.get("engine_cpus")
+    if cpus:
+        _apply(report, "engine_cpus", lambda: os.sched_setaffinity(0, set(cpus)))
+
+    nice = tuning.get("engine_nice")
+    if nice is not None:
+        # Su Linux PRIO_PROCESS con un TID agisce sul singolo thread
+        _apply(report, "engine_nice",
+               lambda: os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), int(nice)))
+
+    policy_name = tuning.get("engine_policy") or "other"
+    if policy_name != "other":
+        def set_policy():
+            policy = POLICIES.get(policy_name)
+            if policy is None:
+                raise ValueError(f"policy sconosciuta: {policy_name}")
+            os.sched_setscheduler(0, policy, os.sched_param(int(tuning.get("engine_rt_priority", 10))))
+        _apply(report, "engine_policy", set_policy)
+
+    slack = tuning.get("engine_timer_slack_ns")
+    if slack is not None:
+        _apply(report, "engine_timer_slack_ns", lambda: _prctl(PR_SET_TIMERSLACK, int(slack)))
+
+    return report
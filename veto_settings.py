@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Veto - Ricaricamento a caldo di settings.json
+Author: MyLuxy
+
+SettingsWatcher osserva settings.json su un thread proprio (inotify sulla
+cartella in Linux, altrimenti polling di mtime e dimensione): a ogni
+modifica rilegge e valida il file fuori dal thread di Tk e consegna solo
+le parti cambiate (RELOAD_PARTS). Le voci lette solo all'avvio
+(RESTART_KEYS) vengono segnalate ma non applicate.
+"""
+import ctypes
+import json
+import math
+import os
+import select
+import struct
+import threading
+import time
+
+from veto_timing import now_ns
+
+POLL_INTERVAL_S = 0.5
+SETTLE_S = 0.02  # gli editor possono scrivere a più riprese: si attende che il file si assesti
+
+# Parti ricaricabili: (chiavi globali, chiavi della sezione "macros")
+RELOAD_PARTS = {
+    "timing": (("min_cps", "max_cps", "randomize", "rate_control", "tick_sync"),
+               ("distribution", "burst", "mode", "cps")),
+    "hotkeys": (("hotkey_debounce_ms",), ("hotkey_str", "hotkey_is_mouse")),
+    "enabled": ((), ("enabled",)),
+}
+# Voci lette solo all'avvio (oltre al tuning del motore)
+RESTART_KEYS = ("macro_definitions", "engine_mode", "input_backend", "control_socket", "event_log")
+# Campi di macro che la GUI usa come stringhe o chiavi: con un altro tipo la ricarica fallirebbe
+MACRO_FIELD_TYPES = {"hotkey_str": str, "hotkey_is_mouse": bool, "distribution": str, "enabled": bool}
+HOLD_MODES = ("single", "break")
+# Intervalli accettati da VetoEngine.configure; i numeri possono arrivare come stringhe (StringVar della GUI)
+TICK_SYNC_FIELDS = {"rate": (int, 0, 1000), "per_tick": (int, 1, 255), "offset_pct": (int, 0, 99),
+                    "phase_ms": (float, -math.inf, math.inf)}
+BURST_FIELDS = {"count": (int, 1, 0xFFFF), "spacing_ms": (float, 0, 0xFFFFFFFF / 1000),
+                "cooldown_ms": (int, 0, 0xFFFF)}
+HOLD_CPS = (int, 1, math.inf)
+
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+# struct inotify_event { int wd; uint32_t mask, cookie, len; char name[]; }
+INOTIFY_EVENT = struct.Struct("iIII")
+
+
+def macro_setting(settings, key, name, default):
+    """Impostazione `name` della macro `key`; ricade sulle chiavi piatte delle versioni precedenti (es. "hold_mode")"""
+    section = settings.get("macros", {}).get(key, {})
+    if name in section:
+        return section[name]
+    return settings.get(f"{key}_{name}", default)
+
+
+def validate_settings(settings):
+    """ValueError se i campi ricaricabili non hanno la forma di settings.json"""
+    if not isinstance(settings, dict):
+        raise ValueError("settings.json deve contenere un oggetto")
+    try:
+        min_cps = int(settings.get("min_cps", 1))
+        max_cps = int(settings.get("max_cps", min_cps))
+        int(settings.get("hotkey_debounce_ms", 0))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Valore numerico non valido: {e}")
+    if not 1 <= min_cps <= max_cps:
+        raise ValueError(f"CPS non validi: {min_cps}-{max_cps}")
+    _check_fields(settings.get("tick_sync", {}), "tick_sync", TICK_SYNC_FIELDS)
+    macros = settings.get("macros", {})
+    if not isinstance(macros, dict) or not all(isinstance(section, dict) for section in macros.values()):
+        raise ValueError("macros deve associare a ogni macro un oggetto")
+    for key, section in macros.items():
+        for field, value in section.items():
+            _check_macro_field(field, value, f"{field} di {key}")
+    # Chiavi piatte delle versioni precedenti (es. "left_hotkey_str", "hold_mode"), lette da macro_setting
+    global_keys = {key for keys, _ in RELOAD_PARTS.values() for key in keys}.union(RESTART_KEYS)
+    for name, value in settings.items():
+        if name in global_keys:
+            continue  # es. "min_cps" ed "engine_mode" non sono campi di una macro
+        for field in (*MACRO_FIELD_TYPES, "burst", "mode", "cps"):
+            if name.endswith(f"_{field}"):
+                _check_macro_field(field, value, name)
+
+
+def _check_macro_field(field, value, name):
+    """ValueError se il campo di macro `field` ha un valore che la GUI non saprebbe applicare"""
+    if field in MACRO_FIELD_TYPES and not isinstance(value, MACRO_FIELD_TYPES[field]):
+        raise ValueError(f"{name} non valido")
+    if field == "burst":
+        _check_fields(value, name, BURST_FIELDS)
+    elif field == "mode" and value not in HOLD_MODES:
+        raise ValueError(f"{name} non valido: {value!r} (ammessi: {', '.join(HOLD_MODES)})")
+    elif field == "cps":
+        _check_number(value, name, *HOLD_CPS)
+
+
+def _check_fields(section, name, fields):
+    """Oggetto con "enabled" booleano e campi numerici negli intervalli di `fields`"""
+    if not isinstance(section, dict):
+        raise ValueError(f"{name} deve essere un oggetto")
+    # bool("no") sarebbe True: niente conversioni per l'interruttore
+    if "enabled" in section and not isinstance(section["enabled"], bool):
+        raise ValueError(f"{name}.enabled deve essere true o false")
+    for field, (kind, low, high) in fields.items():
+        if field in section:
+            _check_number(section[field], f"{name}.{field}", kind, low, high)
+
+
+def _check_number(value, name, kind, low, high):
+    try:
+        number = kind(value)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"{name} non valido: {value!r}")
+    if isinstance(value, bool) or not math.isfinite(number) or not low <= number <= high:
+        raise ValueError(f"{name} fuori intervallo: {value!r}")
+
+
+def changed_parts(old, new, macro_keys, restart_keys=RESTART_KEYS):
+    """(parti di RELOAD_PARTS cambiate, voci cambiate che richiedono un riavvio)"""
+    parts = set()
+    for part, (keys, fields) in RELOAD_PARTS.items():
+        if (any(old.get(key) != new.get(key) for key in keys)
+                or any(macro_setting(old, macro, field, None) != macro_setting(new, macro, field, None)
+                       for macro in macro_keys for field in fields)):
+            parts.add(part)
+    return parts, [key for key in restart_keys if old.get(key) != new.get(key)]
+
+
+def _inotify(directory):
+    """fd inotify sulla cartella (gli editor spesso sostituiscono il file con un rename); None se non disponibile"""
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError, TypeError):
+        return None  # non Linux
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+class SettingsWatcher:
+    """Thread che osserva settings.json e chiama on_reload(settings, parti, rilevato_ns).
+
+    baseline sono le impostazioni già applicate: una modifica che non cambia
+    nessuna parte ricaricabile non produce chiamate. on_reload gira sul
+    thread del watcher (la GUI la rimanda al thread di Tk); rilevato_ns è
+    l'istante now_ns in cui è stata vista la modifica, per misurare la
+    latenza fino all'applicazione.
+    """
+    def __init__(self, path, on_reload, macro_keys, baseline=None, restart_keys=RESTART_KEYS,
+                 poll_interval=POLL_INTERVAL_S, settle=SETTLE_S, use_inotify=True):
+        self.path = os.path.abspath(path)
+        self.on_reload = on_reload
+        self.macro_keys = tuple(macro_keys)
+        self.baseline = baseline or {}
+        self.restart_keys = restart_keys
+        self.poll_interval = poll_interval
+        self.settle = settle
+        self.use_inotify = use_inotify
+        self.mode = None  # "inotify" o "polling" dopo start()
+        self.reloads = 0
+        self.errors = 0
+        self._fd = None
+        self._last_stat = None
+        self._wake_r, self._wake_w = None, None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._fd = _inotify(os.path.dirname(self.path)) if self.use_inotify else None
+        self.mode = "polling" if self._fd is None else "inotify"
+        # Stato iniziale prima del thread: una scrittura subito dopo start() non va persa
+        self._last_stat = self._stat()
+        self._wake_r, self._wake_w = os.pipe()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="VetoSettingsWatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        os.write(self._wake_w, b"x")
+        self._thread.join(1.0)
+        self._thread = None
+        os.close(self._wake_r)
+        os.close(self._wake_w)
+
+    def _run(self):
+        try:
+            if self._fd is None:
+                self._poll()
+            else:
+                self._watch()
+        finally:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def _watch(self):
+        name = os.fsencode(os.path.basename(self.path))
+        while True:
+            ready, _, _ = select.select([self._fd, self._wake_r], [], [])
+            if self._wake_r in ready:
+                return
+            detected = now_ns()
+            if not self._drain(name):
+                continue
+            # Scritture ravvicinate (editor, json.dump a blocchi): una sola ricarica
+            time.sleep(self.settle)
+            self._drain(name)
+            self._reload(detected)
+
+    def _drain(self, name):
+        """Legge gli eventi inotify in coda; True se uno riguarda il file osservato"""
+        found = False
+        while True:
+            try:
+                data = os.read(self._fd, 4096)
+            except BlockingIOError:
+                return found
+            offset = 0
+            while offset < len(data):
+                _, _, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+                offset += INOTIFY_EVENT.size
+                found = found or data[offset:offset + length].rstrip(b"\0") == name
+                offset += length
+
+    def _poll(self):
+        last = self._last_stat
+        while not self._stop.wait(self.poll_interval):
+            current = self._stat()
+            if current != last:
+                detected = now_ns()
+                time.sleep(self.settle)
+                last = self._stat()
+                self._reload(detected)
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _reload(self, detected):
+        try:
+            with open(self.path, "r") as f:
+                settings = json.load(f)
+            validate_settings(settings)
+        except (OSError, ValueError) as e:
+            self.errors += 1
+            print(f"settings.json non ricaricato: {e}")
+            return
+        parts, restart = changed_parts(self.baseline, settings, self.macro_keys, self.restart_keys)
+        self.baseline = settings
+        if restart:
+            print(f"settings.json: riavvio necessario per {', '.join(restart)}")
+        if parts:
+            self.reloads += 1
+            self.on_reload(settings, parts, detected)
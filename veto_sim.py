@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Veto - Simulazione del motore su tempo virtuale
+Author: MyLuxy
+
+ClickEngine e Scheduler ricevono orologio, attesa e sorgente casuale
+iniettabili: qui l'orologio è virtuale e salta direttamente alla prossima
+deadline, quindi ore di click, churn di arm/disarm e cambi di CPS si
+riproducono in pochi secondi e, a parità di seed, in modo identico.
+
+    sim = Simulation(seed=1)
+    sim.at(0, sim.engine.submit, 0, CMD_ENABLE)
+    sim.at(0, sim.engine.submit, 0, CMD_ARM)
+    sim.at(1_000_000, sim.engine.submit, 0, CMD_PRESS)
+    sim.run(3600 * 10**9)
+    print(len(sim.backend.events))
+"""
+import hashlib
+import heapq
+import random
+
+from veto_distributions import DISTRIBUTIONS, MIN_INTERVAL
+from veto_engine import ClickEngine, HOLD_BREAK
+from veto_state import KIND_CLICK, KIND_HOLD, CMD_ENABLE, CMD_TOGGLE, CMD_PRESS, CMD_RELEASE
+from veto_timing import IDLE_WAIT_S
+
+
+class VirtualClock:
+    """Orologio in ns che avanza solo quando lo si sposta (callable come now_ns)"""
+    def __init__(self, start_ns=0):
+        self.t = start_ns
+
+    def __call__(self):
+        return self.t
+
+    def advance(self, t_ns):
+        if t_ns > self.t:
+            self.t = t_ns
+
+    def wait(self, deadline_ns, wakeup):
+        """Sostituto di wait_until per un ClickEngine con thread: salta alla deadline invece di dormire"""
+        if deadline_ns is None:
+            wakeup.wait(IDLE_WAIT_S)
+        elif not wakeup.is_set():
+            self.advance(deadline_ns)
+
+
+class SimBackend:
+    """Backend simulato: registra le azioni sul tempo virtuale e conta quelle incoerenti"""
+    def __init__(self, clock):
+        self.clock = clock
+        self.events = []
+        self.pressed = set()
+        self.position = (0, 0)
+        self.errors = 0  # click su un pulsante tenuto, press doppie, release senza press
+
+    def click(self, button):
+        if button in self.pressed:
+            self.errors += 1
+        self.events.append((self.clock(), "click", button))
+
+    def click_batch(self, button, count):
+        for _ in range(count):
+            self.click(button)
+
+    def click_at(self, button, x, y):
+        self.position = (x, y)
+        self.click(button)
+
+    def press(self, button):
+        if button in self.pressed:
+            self.errors += 1
+        self.pressed.add(button)
+        self.events.append((self.clock(), "press", button))
+
+    def release(self, button):
+        if button not in self.pressed:
+            self.errors += 1
+        self.pressed.discard(button)
+        self.events.append((self.clock(), "release", button))
+
+    def move(self, x, y):
+        self.position = (x, y)
+        self.events.append((self.clock(), "move", (x, y)))
+
+    def scroll(self, dx, dy):
+        self.events.append((self.clock(), "scroll", (dx, dy)))
+
+    # Tasti delle registrazioni: stesse verifiche dei pulsanti
+    press_key = press
+    release_key = release
+
+    def keyboard(self, injected=None):
+        return self
+
+    def digest(self):
+        """Impronta della sequenza di azioni: uguale per esecuzioni con lo stesso seed"""
+        h = hashlib.sha256()
+        for t, action, button in self.events:
+            h.update(f"{t}:{action}:{button};".encode())
+        return h.hexdigest()
+
+
+class Simulation:
+    """ClickEngine senza thread pilotato da azioni pianificate sul tempo virtuale.
+
+    slots elenca (tipo, pulsante) di ogni macro; tutta la casualità (scheduler
+    incluso) viene da random.Random(seed), esposto come `rng` per generare
+    sessioni riproducibili. on_transition/on_click sono passate al ClickEngine;
+    backend è la classe del backend, costruita con l'orologio virtuale.
+    """
+    def __init__(self, seed=0, slots=((KIND_CLICK, "left"),), on_transition=None, on_click=None,
+                 backend=SimBackend):
+        self.rng = random.Random(seed)
+        self.clock = VirtualClock()
+        self.backend = backend(self.clock)
+        self.engine = ClickEngine(lambda: self.backend, on_transition=on_transition, on_click=on_click,
+                                  clock=self.clock, waiter=self.clock.wait,
+                                  bits=random.Random(self.rng.getrandbits(64)).getrandbits)
+        for slot, (kind, button) in enumerate(slots):
+            self.engine.add_macro(slot, kind, button)
+        self._plan = []
+        self._seq = 0
+
+    def at(self, t_ns, action, *args):
+        """Pianifica action(*args) all'istante virtuale t_ns"""
+        heapq.heappush(self._plan, (t_ns, self._seq, action, args))
+        self._seq += 1
+
+    def run(self, until_ns):
+        """Avanza fino a until_ns eseguendo azioni e click nell'ordine del tempo virtuale"""
+        engine, plan, clock = self.engine, self._plan, self.clock
+        while True:
+            deadline = engine.pump()
+            t_next = plan[0][0] if plan else None
+            if deadline is None or (t_next is not None and t_next < deadline):
+                deadline = t_next
+            if deadline is None or deadline > until_ns:
+                clock.advance(until_ns)
+                return
+            clock.advance(deadline)
+            while plan and plan[0][0] <= clock.t:
+                _, _, action, args = heapq.heappop(plan)
+                action(*args)
+
+
+def churn_session(seed, seconds, max_cps=20):
+    """Sessione simulata: arm/disarm, pressioni e cambi di CPS/distribuzione in ordine casuale.
+
+    Restituisce la simulazione, gli istanti dei comandi e i click eseguiti con
+    la macro ferma (che solo un motore duplicato potrebbe produrre).
+    """
+    stray = []
+
+    def on_click(slot, t_ns):
+        if not sim.engine.machines[slot].running:
+            stray.append((slot, t_ns))
+
+    sim = Simulation(seed, slots=((KIND_CLICK, "left"), (KIND_CLICK, "right"), (KIND_HOLD, "middle")),
+                     on_click=on_click)
+    engine, rng = sim.engine, sim.rng
+    engine.configure(2, False, "uniform", HOLD_BREAK, 5, 5)
+    for slot in range(3):
+        engine.submit(slot, CMD_ENABLE)
+    starts = set()  # istanti in cui un click può legittimamente seguire da vicino il precedente
+    t = 0
+    while t < seconds * 1e9:
+        t += int(rng.uniform(0.05, 3.0) * 1e9)
+        slot = rng.randrange(3)
+        roll = rng.random()
+        if roll < 0.15 and slot < 2:
+            low = rng.randint(3, max_cps - 5)
+            sim.at(t, engine.configure, slot, rng.random() < 0.8, rng.choice(list(DISTRIBUTIONS)), 0,
+                   low, rng.randint(low, max_cps))
+        else:
+            command = rng.choice((CMD_TOGGLE, CMD_PRESS, CMD_RELEASE, CMD_PRESS, CMD_RELEASE))
+            sim.at(t, engine.submit, slot, command)
+            starts.add(t)
+    sim.run(int(seconds * 1e9))
+    return sim, starts, stray
+
+
+def duplicate_clicks(sim, starts, stray):
+    """Click che solo un motore duplicato produrrebbe: a macro ferma (stray) o sotto MIN_INTERVAL dal precedente"""
+    by_button = {}
+    for t, action, button in sim.backend.events:
+        if action == "click":
+            by_button.setdefault(button, []).append(t)
+    # Sotto l'intervallo minimo delle tabelle si scende solo subito dopo un (ri)avvio
+    bound = MIN_INTERVAL * 1e9
+    return len(stray) + sum(1 for ts in by_button.values() for a, b in zip(ts, ts[1:])
+                            if b - a < bound and b not in starts)
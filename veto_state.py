@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Veto - Macchina a stati delle macro e coda dei comandi del motore
+Author: MyLuxy
+
+Listener, callback Tk e server esterni non toccano più lo stato delle
+macro: accodano comandi che il thread motore applica in ordine.
+"""
+import threading
+from collections import deque
+
+from veto_timing import now_ns
+
+# Stati (coincidono con le etichette mostrate nella GUI)
+OFF = "OFF"
+ARMED = "ARMED"
+CLICKING = "CLICKING"
+ACTIVE = "ACTIVE"
+
+# Tipi di macro
+KIND_CLICK = "click"
+KIND_HOLD = "hold"
+
+# Comandi
+CMD_ENABLE = "enable"
+CMD_DISABLE = "disable"
+CMD_ARM = "arm"
+CMD_DISARM = "disarm"
+CMD_TOGGLE = "toggle"
+CMD_PRESS = "press"
+CMD_RELEASE = "release"
+CMD_CONFIGURE = "configure"
+CMD_BURST = "burst"
+
+TRANSITION_HISTORY = 256
+
+
+class Transition:
+    """Transizione applicata, con i timestamp per le metriche di latenza"""
+    __slots__ = ("command", "old", "new", "enqueued_ns", "applied_ns")
+
+    def __init__(self, command, old, new, enqueued_ns, applied_ns):
+        self.command = command
+        self.old = old
+        self.new = new
+        self.enqueued_ns = enqueued_ns
+        self.applied_ns = applied_ns
+
+    @property
+    def latency_ns(self):
+        return self.applied_ns - self.enqueued_ns
+
+
+class MacroStateMachine:
+    """OFF -> ARMED -> CLICKING per le macro di click, OFF -> ACTIVE per la hold.
+
+    Scritta solo dal thread motore; gli altri thread leggono `state`,
+    `enabled` e `held`, che vengono sostituiti in modo atomico.
+    """
+    def __init__(self, kind=KIND_CLICK):
+        self.kind = kind
+        self.state = OFF
+        self.enabled = False
+        self.held = False
+        self.transitions = deque(maxlen=TRANSITION_HISTORY)
+
+    def _target(self, command):
+        state = self.state
+        if command == CMD_TOGGLE:
+            command = CMD_ARM if state == OFF else CMD_DISARM
+        if command == CMD_ENABLE:
+            self.enabled = True
+        elif command == CMD_DISABLE:
+            self.enabled = False
+            return OFF
+        elif command == CMD_PRESS:
+            self.held = True
+            if state == ARMED and self.kind == KIND_CLICK:
+                return CLICKING
+        elif command == CMD_RELEASE:
+            self.held = False
+            if state == CLICKING:
+                return ARMED
+        elif command == CMD_ARM:
+            if self.enabled and state == OFF:
+                return ACTIVE if self.kind == KIND_HOLD else ARMED
+        elif command == CMD_DISARM:
+            return OFF
+        return state
+
+    def apply(self, command, enqueued_ns, applied_ns):
+        """Applica un comando; restituisce la Transition se lo stato è cambiato"""
+        new = self._target(command)
+        if new == self.state:
+            return None
+        transition = Transition(command, self.state, new, enqueued_ns, applied_ns)
+        self.state = new
+        self.transitions.append(transition)
+        return transition
+
+    @property
+    def armed(self):
+        return self.state != OFF
+
+    @property
+    def running(self):
+        """True se il motore deve eseguire la macro (click o hold attivi)"""
+        return self.state == CLICKING or self.state == ACTIVE
+
+
+class CommandQueue:
+    """Coda multi-produttore / singolo consumatore.
+
+    deque.append/popleft sono atomiche in CPython: i produttori non prendono
+    lock, l'Event serve solo a svegliare il motore.
+    """
+    def __init__(self, clock=now_ns):
+        self._items = deque()
+        self.ready = threading.Event()
+        self.clock = clock
+
+    def put(self, slot, command, payload=None):
+        self._items.append((self.clock(), slot, command, payload))
+        self.ready.set()
+
+    def drain(self):
+        """Estrae tutti i comandi in attesa, nell'ordine di arrivo"""
+        self.ready.clear()
+        items = self._items
+        while items:
+            yield items.popleft()
+
+    def wait(self, timeout=None):
+        return self.ready.wait(timeout)
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Veto - Primitive di temporizzazione ad alta precisione
+Author: MyLuxy
+"""
+import time
+
+# Sotto questa soglia (ns) si smette di dormire e si fa busy-wait,
+# perché time.sleep su Linux/Windows può sforare di oltre 1 ms
+SPIN_THRESHOLD_NS = 1_500_000
+
+
+def now_ns():
+    """Orologio monotono ad alta risoluzione usato da tutto il motore"""
+    return time.perf_counter_ns()
+
+
+def sleep_until(deadline_ns):
+    """Attende fino alla deadline (in ns di perf_counter): sleep grossolano + spin finale"""
+    while True:
+        remaining = deadline_ns - time.perf_counter_ns()
+        if remaining <= 0:
+            return
+        if remaining > SPIN_THRESHOLD_NS:
+            time.sleep((remaining - SPIN_THRESHOLD_NS) / 1e9)
+
+
+# Attesa massima quando nessuna macro è in esecuzione
+IDLE_WAIT_S = 0.1
+
+
+def wait_until(deadline_ns, wakeup):
+    """Attende la prossima deadline (None = nessuna) o un risveglio sull'Event"""
+    if deadline_ns is None:
+        wakeup.wait(IDLE_WAIT_S)
+        return
+    remaining = deadline_ns - time.perf_counter_ns()
+    if remaining > SPIN_THRESHOLD_NS:
+        wakeup.wait((remaining - SPIN_THRESHOLD_NS) / 1e9)
+    else:
+        sleep_until(deadline_ns)